@@ -0,0 +1,160 @@
+"""
+Micro-benchmark de l'extraction des champs d'un RIB (hors lecture du PDF et OCR).
+
+Compare, sur des textes de RIB synthétiques, le coût par document de l'extraction avec le
+utils.py de deux révisions git, lus à l'exécution par `git show` (rien n'est recopié) :
+    - « avant » : la révision d'avant le registre de motifs précompilés (substitutions regex
+      écrites en ligne, compactage par re.sub puis upper())
+    - « après » : la révision qui introduit le registre et les tables de `bytes.translate`
+Par défaut, ce sont le parent du premier commit '[user-012]' et ce commit : seul l'effet de ce
+changement est mesuré. `--apres HEAD` mesure l'arbre actuel.
+Puis le coût de la validation d'un IBAN : python-stdnum contre le calcul mod 97 en flux de utils.py.
+
+Utilisation :
+    uv run python benchmarks/bench_extraction.py [--documents 200] [--pages 3] [--repetitions 5]
+                                                 [--avant REV] [--apres REV]
+"""
+
+import os
+import sys
+import time
+import types
+import random
+import argparse
+import subprocess
+
+from stdnum import iban as iban_lib
+
+RACINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(RACINE, "src", "app"))
+import utils
+
+# Premier commit du registre de motifs précompilés (révisions par défaut : son parent et lui)
+SUJET_REGISTRE = "[user-012]"
+
+
+# ---------------------------------------------------------------------------
+# Versions de utils.py lues dans l'historique git
+# ---------------------------------------------------------------------------
+
+def git(*arguments) -> str:
+    """Sortie d'une commande git lancée à la racine du dépôt."""
+    return subprocess.run(["git", *arguments], cwd=RACINE, capture_output=True, text=True, check=True).stdout
+
+def commit_registre() -> str:
+    """Plus ancien commit dont le sujet commence par SUJET_REGISTRE."""
+    commits = git("log", "--format=%H %s").splitlines()
+    registre = [c.split(" ", 1)[0] for c in commits if c.split(" ", 1)[1].startswith(SUJET_REGISTRE)]
+    if not registre:
+        sys.exit(f"aucun commit '{SUJET_REGISTRE}' dans l'historique : indiquer --avant et --apres")
+    return registre[-1]
+
+def utils_revision(revision: str) -> types.ModuleType:
+    """Module utils.py tel qu'à `revision` (ses imports voisins sont ceux de l'arbre actuel)."""
+    module = types.ModuleType(f"utils_{revision}")
+    module.__file__ = os.path.join(RACINE, "src", "app", "utils.py")
+    exec(compile(git("show", f"{revision}:src/app/utils.py"), f"{revision}:src/app/utils.py", "exec"), module.__dict__)
+    return module
+
+
+# ---------------------------------------------------------------------------
+# Corpus synthétique
+# ---------------------------------------------------------------------------
+
+TITULAIRES = ["M. JEAN DUPONT", "MME MARIE CURIE", "SARL LES JARDINS", "SAS ACME"]
+BICS = ["BNPAFRPPXXX", "AGRIFRPP882", "CCBP FRPP MTG", "sogefrpp"]
+BRUIT = ["Conditions générales de banque", "Page 1/2", "Tél. 01 23 45 67 89", "Date : 12/03/2024", ""]
+
+
+def texte_rib(alea: random.Random) -> str:
+    """Une page de RIB : libellés, grille des codes, IBAN espacé et bruit de mise en page."""
+    cb, cg, nc = f"{alea.randint(10000, 99999)}", f"{alea.randint(0, 99999):05d}", f"{alea.randint(0, 10**11 - 1):011d}"
+    cle = utils.calculer_cle_rib(cb, cg, nc)
+    iban = utils.construire_iban_fr(cb, cg, nc, cle)
+    lignes = [
+        "RELEVE D'IDENTITE BANCAIRE",
+        f"Titulaire du compte : {alea.choice(TITULAIRES)}",
+        "Domiciliation : AGENCE  PARIS OPERA\n12 rue de la Paix 75002 PARIS",
+        "Code banque\tCode guichet\tNuméro de compte\tClé RIB",
+        f"{cb}   {cg}   {nc}   {cle}",
+        f"IBAN : {iban}",
+        f"BIC : {alea.choice(BICS)}",
+    ]
+    lignes += [alea.choice(BRUIT) for _ in range(alea.randrange(20, 40))]
+    return "\r\n".join(lignes)
+
+
+def extraire_document(module, texte: str) -> tuple:
+    """Extraction complète d'un document avec les fonctions de `module` (une révision de utils.py)."""
+    t = module.nettoyer(texte)
+    return (module.extraire_iban_valide(t), module.extraire_bic_valide(t), module.extraire_par_libelles(t))
+
+
+def mesurer(module, documents: list, repetitions: int) -> float:
+    """Meilleur temps moyen par document (ms) ; le balayage mémorisé est vidé à chaque passe."""
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        for texte in documents:
+            module.balayer.cache_clear()
+            extraire_document(module, texte)
+        meilleur = min(meilleur, (time.perf_counter() - debut) / len(documents))
+    return meilleur * 1000
+
+
+def mesurer_validation(ibans: list, repetitions: int) -> tuple:
+    """Meilleur temps moyen de validation d'un IBAN (µs) : python-stdnum, puis calcul mod 97 en flux."""
+    temps = []
+    for valider in (iban_lib.is_valid, utils.iban_fr_valide):
+        assert [valider(i) for i in ibans] == [iban_lib.is_valid(i) for i in ibans]
+        meilleur = float("inf")
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            for iban in ibans:
+                valider(iban)
+            meilleur = min(meilleur, (time.perf_counter() - debut) / len(ibans))
+        temps.append(meilleur * 1e6)
+    return tuple(temps)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark de l'extraction des champs RIB.")
+    parser.add_argument("--documents", type=int, default=200, help="Nombre de documents synthétiques.")
+    parser.add_argument("--pages", type=int, default=3, help="Pages par document.")
+    parser.add_argument("--repetitions", type=int, default=5, help="Passes mesurées (on garde la meilleure).")
+    parser.add_argument("--avant", help="Révision de référence (défaut : parent du premier commit du registre).")
+    parser.add_argument("--apres", help="Révision mesurée (défaut : premier commit du registre).")
+    args = parser.parse_args()
+
+    if not (args.avant and args.apres):
+        registre = commit_registre()
+        args.avant, args.apres = args.avant or f"{registre}^", args.apres or registre
+    module_avant, module_apres = utils_revision(args.avant), utils_revision(args.apres)
+
+    alea = random.Random(0)
+    documents = ["\n\f".join(texte_rib(alea) for _ in range(args.pages)) for _ in range(args.documents)]
+
+    # Les deux versions doivent extraire exactement les mêmes champs
+    resultats_avant = [extraire_document(module_avant, t) for t in documents]
+    resultats_apres = [extraire_document(module_apres, t) for t in documents]
+    assert resultats_avant == resultats_apres, "résultats différents entre les deux versions"
+
+    avant = mesurer(module_avant, documents, args.repetitions)
+    apres = mesurer(module_apres, documents, args.repetitions)
+
+    print(f"{args.documents} documents de {args.pages} page(s)")
+    court = {r: git("rev-parse", "--short", r).strip() for r in (args.avant, args.apres)}
+    print(f"avant ({court[args.avant]:<9})        : {avant:.3f} ms / document")
+    print(f"après ({court[args.apres]:<9})        : {apres:.3f} ms / document")
+    print(f"gain                     : {(1 - apres / avant) * 100:.1f} %")
+
+    # IBAN valides et IBAN dont la fin a été altérée (cas d'une lecture OCR erronée)
+    ibans = [utils.PAT_IBAN_FR_COMPACT.search(utils.compacter_majuscules(t)).group() for t in documents]
+    ibans += [i[:alea.randrange(4, 27)].ljust(27, "7") for i in ibans]
+    stdnum, flux = mesurer_validation(ibans, args.repetitions)
+    print(f"validation IBAN stdnum   : {stdnum:.2f} µs")
+    print(f"validation IBAN mod 97   : {flux:.2f} µs (x{stdnum / flux:.0f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Annuaire hors ligne des banques françaises : code banque -> nom et BIC connus.
+
+Sert à valider un code banque lu sur un RIB, à écarter les faux BIC (mots de 8 lettres
+dont les 5e et 6e sont 'FR') et à vérifier que le BIC appartient bien à la banque de
+l'IBAN. La source est un CSV livré avec l'application (`donnees/annuaire_banques.csv`,
+colonnes code_banque;nom;bic, une ligne par BIC), facile à compléter à la main.
+
+Le CSV est compilé une fois en un index binaire, projeté en mémoire (mmap) par chaque
+processus : une table d'adressage direct de 100 000 positions (une par code banque
+possible) donne en O(1) la position de la fiche de la banque. L'ouverture ne décode
+rien (seule l'empreinte du petit CSV est vérifiée) ; les pages de l'index sont partagées
+par tous les processus d'analyse via le cache du système. L'index est reconstruit automatiquement quand le CSV change.
+"""
+
+import os
+import csv
+import mmap
+import struct
+import hashlib
+import tempfile
+from collections import namedtuple
+from functools import lru_cache, cached_property
+
+# Source livrée avec l'application et index compilé (à côté du cache OCR)
+CHEMIN_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "donnees", "annuaire_banques.csv")
+CHEMIN_INDEX_DEFAUT = os.path.join(os.path.expanduser("~"), ".cache", "rib-extractor", "annuaire_banques.bin")
+
+# Format de l'index : signature, empreinte du CSV source, table des positions, puis les fiches
+# 'nom\tBIC1,BIC2\n' en UTF-8. Position 0 = code banque absent de l'annuaire.
+SIGNATURE = b"RIBANN01"
+TAILLE_EMPREINTE = 16
+NB_CODES = 100_000
+DEBUT_TABLE = len(SIGNATURE) + TAILLE_EMPREINTE
+DEBUT_FICHES = DEBUT_TABLE + 4 * NB_CODES
+
+# Fiche d'une banque : code banque (5 chiffres), nom, BIC connus (8 caractères, sans agence)
+Banque = namedtuple("Banque", "code nom bics")
+
+
+def empreinte_source(donnees: bytes) -> bytes:
+    """Empreinte du CSV source, recopiée dans l'index pour détecter un index périmé."""
+    return hashlib.sha256(donnees).digest()[:TAILLE_EMPREINTE]
+
+
+def compiler_annuaire(donnees: bytes) -> bytes:
+    """Compile le CSV source (contenu brut) en index binaire."""
+    fiches = {}
+    for ligne in csv.DictReader(donnees.decode("utf-8").splitlines(), delimiter=";"):
+        code, bic = ligne["code_banque"].strip(), ligne["bic"].strip().upper()[:8]
+        if len(code) != 5 or not code.isdigit():
+            continue
+        nom, bics = fiches.setdefault(code, (ligne["nom"].strip(), []))
+        if bic and bic not in bics:
+            bics.append(bic)
+
+    table = [0] * NB_CODES
+    corps = bytearray()
+    for code, (nom, bics) in sorted(fiches.items()):
+        table[int(code)] = DEBUT_FICHES + len(corps)
+        corps += f"{nom}\t{','.join(bics)}\n".encode("utf-8")
+    return SIGNATURE + empreinte_source(donnees) + struct.pack(f"<{NB_CODES}I", *table) + bytes(corps)
+
+
+class AnnuaireBanques:
+    """
+    Index de l'annuaire, lu directement dans un tampon (mmap de l'index compilé, ou octets
+    en mémoire si l'index n'a pas pu être écrit). Les recherches ne décodent que la fiche demandée.
+    """
+
+    def __init__(self, tampon):
+        self._tampon = tampon
+
+    def banque(self, code: str) -> Banque | None:
+        """Fiche de la banque d'un code banque (5 chiffres), None si le code est inconnu."""
+        if len(code) != 5 or not code.isdigit():
+            return None
+        position, = struct.unpack_from("<I", self._tampon, DEBUT_TABLE + 4 * int(code))
+        if not position:
+            return None
+        fin = self._tampon.find(b"\n", position)
+        nom, bics = bytes(self._tampon[position:fin]).decode("utf-8").split("\t")
+        return Banque(code, nom, tuple(bics.split(",")) if bics else ())
+
+    def connu(self, code: str) -> bool:
+        """Vrai si le code banque figure dans l'annuaire."""
+        return self.banque(code) is not None
+
+    @cached_property
+    def prefixes_bic(self) -> frozenset:
+        """Codes banque des BIC connus (4 premières lettres), lus une seule fois au premier usage."""
+        fiches = bytes(self._tampon[DEBUT_FICHES:]).decode("utf-8").splitlines()
+        return frozenset(bic[:4] for fiche in fiches for bic in fiche.split("\t")[1].split(",") if bic)
+
+    def bic_connu(self, bic: str) -> bool:
+        """Vrai si le BIC appartient à une banque de l'annuaire (ses 4 premières lettres)."""
+        return bic[:4] in self.prefixes_bic
+
+    def bic_coherent(self, bic: str, code_banque: str) -> bool | None:
+        """
+        Vrai si le BIC est celui de la banque `code_banque`, faux s'il appartient à une autre
+        banque ; None quand l'annuaire ne permet pas de conclure (code banque inconnu ou sans BIC).
+        """
+        banque = self.banque(code_banque)
+        if banque is None or not banque.bics or not bic:
+            return None
+        return any(bic[:4] == connu[:4] for connu in banque.bics)
+
+
+def ecrire_index(index: bytes, chemin: str):
+    """Écrit l'index de façon atomique : plusieurs processus peuvent le reconstruire en même temps."""
+    dossier = os.path.dirname(chemin)
+    os.makedirs(dossier, exist_ok=True)
+    descripteur, temporaire = tempfile.mkstemp(dir=dossier, suffix=".tmp")
+    try:
+        with os.fdopen(descripteur, "wb") as f:
+            f.write(index)
+        os.replace(temporaire, chemin)
+    except BaseException:
+        os.unlink(temporaire)
+        raise
+
+
+def projeter(chemin: str) -> mmap.mmap:
+    """Projette un fichier en mémoire, en lecture seule."""
+    with open(chemin, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def ouvrir_annuaire(source: str = CHEMIN_SOURCE, chemin_index: str = CHEMIN_INDEX_DEFAUT) -> AnnuaireBanques:
+    """
+    Ouvre l'index compilé de `source` par mmap, après l'avoir (re)construit s'il est absent ou
+    périmé. Si l'index ne peut pas être écrit (dossier en lecture seule), il reste en mémoire.
+    """
+    with open(source, "rb") as f:
+        donnees = f.read()
+    attendu = SIGNATURE + empreinte_source(donnees)
+
+    try:
+        tampon = projeter(chemin_index)
+        if tampon[:DEBUT_TABLE] == attendu:
+            return AnnuaireBanques(tampon)
+        tampon.close()
+    except (OSError, ValueError):
+        pass
+
+    index = compiler_annuaire(donnees)
+    try:
+        ecrire_index(index, chemin_index)
+        return AnnuaireBanques(projeter(chemin_index))
+    except (OSError, ValueError):
+        return AnnuaireBanques(index)
+
+
+def empreinte_annuaire(source: str = CHEMIN_SOURCE) -> str:
+    """
+    Empreinte (hexadécimale) du CSV source, pour invalider les résultats enregistrés quand
+    l'annuaire est complété ('absent' si le CSV n'existe pas).
+    """
+    try:
+        with open(source, "rb") as f:
+            return empreinte_source(f.read()).hex()
+    except OSError:
+        return "absent"
+
+
+@lru_cache(maxsize=1)
+def annuaire_banques() -> AnnuaireBanques | None:
+    """Annuaire partagé par le processus, ouvert au premier usage (None si le CSV source est absent)."""
+    try:
+        return ouvrir_annuaire()
+    except OSError:
+        return None
@@ -1,18 +1,8 @@
 import streamlit as st
 import pandas as pd
-import tempfile
-import os
 import traceback
-from utils import (
-    extraire_texte_ocr,
-    nettoyer,
-    extraire_par_libelles,
-    extraire_iban_valide,
-    extraire_bic_valide,
-    decomposer_iban_fr,
-    calculer_cle_rib,
-    construire_iban_fr,
-)
+from utils import nettoyer, diagnostic_ocr
+from extracteur import ExtracteurRib, COLONNES_EXPORT, resumer_lecture, ligne_resultat
 
 # streamlit run app_with_ocr.py --server.port 8502
 
@@ -33,10 +23,14 @@ Cet outil extrait automatiquement les informations d'un **RIB PDF** grâce à l'
 Téléversez un ou plusieurs fichiers PDF ci-dessous pour démarrer l'analyse.
 """)
 
+# --- État du moteur OCR (langues sondées une seule fois au démarrage) ---
+with st.expander("⚙️ Diagnostic OCR"):
+    st.json(diagnostic_ocr())
+
 # --- Zone d'upload ---
 uploaded_files = st.file_uploader(
-    "📁 Sélectionnez un ou plusieurs fichiers PDF :",
-    type=["pdf"],
+    "📁 Sélectionnez un ou plusieurs fichiers PDF ou images :",
+    type=["pdf", "png", "jpg", "jpeg", "tif", "tiff"],
     accept_multiple_files=True
 )
 
@@ -52,65 +46,36 @@ total = len(uploaded_files) # Nombre total de fichiers
 
 
 
-# Petite fonction utilitaire : remplace "" par "MANQUANT"
-def nz(v):  
-    return v if (v is not None and str(v).strip() != "") else "MANQUANT"
+# Moteur d'extraction partagé par toutes les sessions, préparé une seule fois (langue OCR,
+# annuaire des banques) ; son cache OCR relit sans OCR un RIB déjà téléversé
+@st.cache_resource
+def extracteur_rib():
+    extracteur = ExtracteurRib()
+    extracteur.preparer()
+    return extracteur
+
+extracteur = extracteur_rib()
 
 # Boucle principale : traitement de chaque fichier PDF uploadé
 for idx, file in enumerate(uploaded_files):
-    tmp_path = None
     try:
-        # 1) Sauvegarde temporaire du PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            tmp.write(file.read()) # Écriture du contenu dans un fichier local
-            tmp_path = tmp.name # Stockage du chemin vers le fichier temp
+        # 1) Lecture du PDF en mémoire (aucun fichier temporaire)
+        donnees = file.read()
 
-        # 2) OCR
-        st.write(f"🔍 Lecture et OCR sur **{file.name}** ...")
-        texte = extraire_texte_ocr(tmp_path) # OCR brut
-        tclean = nettoyer(texte) # Nettoyage du texte OCR
+        # 2) Lecture du texte (couche native ou OCR ; arrêt dès que IBAN, BIC et titulaire sont trouvés),
+        #    puis IBAN, grille RIB (texte ou tableau du PDF) et libellés confrontés, confiance de chaque champ
+        st.write(f"🔍 Lecture de **{file.name}** ...")
+        resultat = extracteur.extraire_octets(donnees, file.name)
+        st.caption(f"Source du texte : {resumer_lecture(resultat.infos)}")
 
         # Si rien n'est lu par l'OCR, on considère que c'est une erreur "douce"
-        if not tclean.strip():
+        if not nettoyer(resultat.texte).strip():
             raise RuntimeError("OCR vide (aucun texte exploitable)")
 
-        # 3) Extraction des informations
-        iban = extraire_iban_valide(tclean)
-        cb = cg = nc = cle = tit = dom = ""
-
-        if iban:
-            cb, cg, nc, cle = decomposer_iban_fr(iban)
-
-        # Valeurs trouvées via libellés si IBAN incomplet
-        lb_cb, lb_cg, lb_nc, lb_cle, lb_tit, lb_dom = extraire_par_libelles(tclean)
-        cb = cb or lb_cb
-        cg = cg or lb_cg
-        nc = nc or lb_nc
-        cle = cle or lb_cle
-        tit = lb_tit
-        dom = lb_dom
-
-        # 4) Calcul clé ou reconstruction IBAN si possible
-        if not cle and all([cb, cg, nc]):
-            cle = calculer_cle_rib(cb, cg, nc)
-        if not iban and all([cb, cg, nc, cle]):
-            iban = construire_iban_fr(cb, cg, nc, cle)
-
-        # Extraction du bic
-        bic = extraire_bic_valide(tclean)
-
-        # 5) Ajout des résultats OK
+        # 3) Ajout des résultats OK
         data.append({
-            "Fichier": file.name,
-            "Statut": "OK",
-            "Titulaire du compte": nz(tit),
-            "Code Banque": nz(cb),
-            "Code Guichet": nz(cg),
-            "N° de compte": nz(nc),
-            "Clé RIB": nz(cle),
-            "BIC / SWIFT": nz(bic),
-            "IBAN": nz(iban),
-            "Domiciliation": nz(dom),
+            **ligne_resultat(resultat),
+            "Statut": "OK" if not resultat.a_verifier else "À VÉRIFIER",
         })
 
     except Exception as e:
@@ -119,22 +84,13 @@ for idx, file in enumerate(uploaded_files):
         # Si besoin de deboggage plus fin, décommente la ligne suivante:
         # err_msg = f"ERREUR: {e}\n{traceback.format_exc()}"
         data.append({
+            **dict.fromkeys(COLONNES_EXPORT, "MANQUANT"),
             "Fichier": file.name,
             "Statut": err_msg,
-            "Titulaire du compte": "MANQUANT",
-            "Code Banque": "MANQUANT",
-            "Code Guichet": "MANQUANT",
-            "N° de compte": "MANQUANT",
-            "Clé RIB": "MANQUANT",
-            "BIC / SWIFT": "MANQUANT",
-            "IBAN": "MANQUANT",
-            "Domiciliation": "MANQUANT",
+            "Confiance": "0%",
+            "À vérifier": "",
         })
     finally:
-        # Nettoyage du fichier temporaire
-        if tmp_path and os.path.exists(tmp_path):
-            os.remove(tmp_path)
-
         # Mise à jour de la progression
         progress.progress((idx + 1) / total)
 
@@ -142,11 +98,12 @@ for idx, file in enumerate(uploaded_files):
 df = pd.DataFrame(data)
 
 # On met la colonne Statut devant pour la visibilité
-cols = ["Fichier", "Statut", "Titulaire du compte", "Code Banque", "Code Guichet",
-        "N° de compte", "Clé RIB", "BIC / SWIFT", "IBAN", "Domiciliation"]
+cols = ["Fichier", "Statut", *COLONNES_EXPORT[1:]]
 df = df.reindex(columns=cols)
 
 st.success("✅ Extraction terminée !")
+stats = extracteur.cache.statistiques()
+st.caption(f"Cache OCR : {stats['succes']} succès / {stats['echecs']} échecs, {stats['entrees']} documents en cache")
 st.dataframe(df, width="stretch")
 
 # --- Export CSV ---
@@ -0,0 +1,170 @@
+"""
+Cache disque des textes extraits des PDF (couche native ou OCR).
+
+Un même RIB est souvent re-téléversé dans l'application ou relu chaque nuit par le
+traitement par lot : on mémorise donc le texte de chaque page, indexé par l'empreinte
+SHA-256 du contenu du PDF et par les paramètres de lecture (dpi, langue, version de
+Tesseract). Un document déjà vu est relu en quelques millisecondes, sans OCR.
+
+Le stockage est une base SQLite locale, bornée en taille : les entrées les moins
+récemment utilisées sont supprimées en premier (LRU).
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from functools import lru_cache
+
+import pytesseract
+
+from moteur_ocr import version_bibliotheque
+
+# Emplacement et taille maximale par défaut de la base de cache
+CHEMIN_CACHE_DEFAUT = os.path.join(os.path.expanduser("~"), ".cache", "rib-extractor", "ocr.sqlite")
+TAILLE_MAX_DEFAUT = 200 * 1024 * 1024  # 200 Mo de texte
+
+# Écritures après lesquelles le total des tailles tenu en mémoire est recalculé par la base
+# (d'autres processus peuvent écrire dans la même base sans que ce total le voie)
+ECRITURES_RECALCUL = 256
+
+# À incrémenter quand la lecture des pages change (seuil texte natif, nettoyage…) pour invalider le cache
+VERSION_CACHE = 4
+
+
+@lru_cache(maxsize=1)
+def version_tesseract() -> str:
+    """Version du moteur Tesseract utilisé (calculée une seule fois par processus)."""
+    version = version_bibliotheque()
+    if version:
+        return version
+    try:
+        return str(pytesseract.get_tesseract_version())
+    except Exception:
+        return "inconnue"
+
+
+def empreinte_pdf(donnees: bytes) -> str:
+    """Empreinte SHA-256 du contenu d'un PDF."""
+    return hashlib.sha256(donnees).hexdigest()
+
+
+class CacheOCR:
+    """
+    Cache LRU persistant du texte des pages d'un PDF.
+
+    Chaque entrée est un dictionnaire de listes alignées sur les pages d'un document :
+    "sources" ('texte' ou 'ocr' pour toutes les pages), "pages" (texte des pages déjà
+    lues, None pour une page jamais lue, par exemple à cause d'un arrêt anticipé), "dpi"
+    (résolution retenue pour chaque page OCRisée), "tableaux" (grilles RIB lues comme des
+    tableaux sur chaque page native) et, si la mise en page est demandée, "mots" (mots
+    positionnés de chaque page, avec leur confiance). Utilisable depuis plusieurs threads ;
+    plusieurs processus peuvent partager la même base (mode WAL).
+
+    La taille totale des entrées est tenue en mémoire (mise à jour à chaque écriture et
+    éviction) : elle n'est recalculée par la base qu'à l'ouverture, quand elle dépasse la
+    taille maximale, et toutes les ECRITURES_RECALCUL écritures.
+    """
+
+    def __init__(self, chemin: str = CHEMIN_CACHE_DEFAUT, taille_max: int = TAILLE_MAX_DEFAUT):
+        self.chemin = chemin
+        self.taille_max = taille_max
+        self.succes = 0
+        self.echecs = 0
+        self._verrou = threading.Lock()
+
+        dossier = os.path.dirname(chemin)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        self._conn = sqlite3.connect(chemin, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                cle    TEXT PRIMARY KEY,
+                valeur TEXT NOT NULL,
+                taille INTEGER NOT NULL,
+                acces  REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_acces ON pages(acces)")
+        self._conn.commit()
+        self._taille = self._taille_base()
+        self._ecritures = 0
+
+    def cle(self, donnees: bytes, *parametres) -> str:
+        """
+        Clé d'un document : empreinte du PDF, paramètres de lecture (dpi, mode d'OCR…),
+        version de Tesseract et version du format du cache.
+        """
+        morceaux = [empreinte_pdf(donnees), *map(str, parametres), version_tesseract(), str(VERSION_CACHE)]
+        return ":".join(morceaux)
+
+    def lire(self, cle: str) -> dict | None:
+        """
+        Renvoie l'entrée d'un document déjà vu, None sinon.
+        Un accès met à jour la date d'utilisation de l'entrée (LRU).
+        """
+        with self._verrou:
+            ligne = self._conn.execute("SELECT valeur FROM pages WHERE cle = ?", (cle,)).fetchone()
+            if ligne is None:
+                self.echecs += 1
+                return None
+            self.succes += 1
+            self._conn.execute("UPDATE pages SET acces = ? WHERE cle = ?", (time.time(), cle))
+            self._conn.commit()
+        return json.loads(ligne[0])
+
+    def ecrire(self, cle: str, entree: dict):
+        """Enregistre l'entrée d'un document puis applique la limite de taille."""
+        valeur = json.dumps(entree, ensure_ascii=False)
+        taille = len(valeur.encode("utf-8"))
+        with self._verrou:
+            # Une entrée remplacée libère sa taille (recherche par la clé primaire)
+            ancienne = self._conn.execute("SELECT taille FROM pages WHERE cle = ?", (cle,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (cle, valeur, taille, acces) VALUES (?, ?, ?, ?)",
+                (cle, valeur, taille, time.time()),
+            )
+            self._taille += taille - (ancienne[0] if ancienne else 0)
+            self._ecritures += 1
+            if self._ecritures >= ECRITURES_RECALCUL:
+                self._taille, self._ecritures = self._taille_base(), 0
+            self._evincer()
+            self._conn.commit()
+
+    def _taille_base(self) -> int:
+        """Taille totale des entrées, calculée par la base (parcours de toute la table)."""
+        return self._conn.execute("SELECT COALESCE(SUM(taille), 0) FROM pages").fetchone()[0]
+
+    def _evincer(self):
+        """Supprime les entrées les moins récemment utilisées jusqu'à repasser sous la taille maximale."""
+        if self._taille <= self.taille_max:
+            return
+        # Le total tenu en mémoire ignore les écritures des autres processus : il est recalculé avant d'évincer
+        self._taille, self._ecritures = self._taille_base(), 0
+        a_supprimer = []
+        for cle, taille in self._conn.execute("SELECT cle, taille FROM pages ORDER BY acces"):
+            if self._taille <= self.taille_max:
+                break
+            a_supprimer.append((cle,))
+            self._taille -= taille
+        self._conn.executemany("DELETE FROM pages WHERE cle = ?", a_supprimer)
+
+    def statistiques(self) -> dict:
+        """Compteurs de succès / échecs et occupation de la base."""
+        with self._verrou:
+            nb, taille = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(taille), 0) FROM pages").fetchone()
+        return {
+            "succes": self.succes,
+            "echecs": self.echecs,
+            "entrees": nb,
+            "taille": taille,
+            "taille_max": self.taille_max,
+        }
+
+    def fermer(self):
+        """Ferme la connexion SQLite."""
+        with self._verrou:
+            self._conn.close()
@@ -0,0 +1,241 @@
+"""
+Moteur d'extraction des RIB, réutilisable d'un document à l'autre.
+
+Un `ExtracteurRib` est construit une fois et garde entre les appels tout ce qui coûte à
+préparer : connexion au cache OCR, moteurs Tesseract (langue sondée, modèles chargés par
+libtesseract), annuaire des banques projeté en mémoire. Le script de traitement par lot
+(`rib_extractor.py`) et l'application Streamlit (`app_with_ocr.py`) n'en sont que des
+façades ; un worker d'ingestion peut l'importer directement :
+
+    from extracteur import ExtracteurRib
+
+    extracteur = ExtracteurRib()
+    resultat = extracteur.extraire_fichier("rib/rib.pdf")
+    resultat.champs["iban"], resultat.confiances["iban"]
+
+    for resultat in extracteur.extraire_lot(chemins, nb_processus=4):
+        ...
+"""
+
+import os
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import (
+    extraire_texte_pdf, extraire_texte_image, est_image, resumer_sources, resumer_dpi, champs_resolus, langue_ocr, ECHELLE_DPI,
+    reconcilier_rib, champs_a_verifier, CHAMPS_RIB,
+)
+from cache_ocr import CacheOCR, CHEMIN_CACHE_DEFAUT, empreinte_pdf
+from annuaire_banques import annuaire_banques
+from parcours import lire_document
+
+# Résultat de l'extraction d'un document :
+# - fichier : nom du document ; texte : texte lu (couche native ou OCR)
+# - champs / confiances : valeurs retenues et confiance de chaque champ (voir `reconcilier_rib`)
+# - a_verifier : champs sous le seuil de confiance ; infos : détails de la lecture (voir `extraire_texte_pdf`),
+#   plus l'empreinte SHA-256 du document (infos["empreinte"]), ou le message d'erreur d'un
+#   document qui n'a pas pu être analysé (infos["erreur"], voir `resultat_erreur`)
+Resultat = namedtuple("Resultat", "fichier texte champs confiances a_verifier infos")
+
+# À incrémenter quand l'extraction des champs change (expressions, confrontation des sources,
+# réparation de l'IBAN…) : les résultats enregistrés dans le manifeste sont alors recalculés
+VERSION_EXTRACTION = 2
+
+# Colonnes d'export d'un résultat, dans l'ordre
+COLONNES_EXPORT = ("Fichier", "Titulaire du compte", "Code Banque", "Code Guichet", "N° de compte", "Clé RIB",
+                   "BIC / SWIFT", "IBAN", "Domiciliation", "Confiance", "À vérifier")
+# Colonnes des codes numériques, dont les zéros initiaux doivent survivre à Excel
+COLONNES_CODES = ("Code Banque", "Code Guichet", "N° de compte", "Clé RIB")
+
+
+class ExtracteurRib:
+    """
+    Moteur d'extraction : lecture du document (texte natif du PDF, sinon OCR) puis confrontation des
+    sources champ par champ. Les options de lecture sont fixées à la construction :
+    - chemin_cache : base SQLite du cache OCR (None : pas de cache)
+    - arret_anticipe : lecture arrêtée à la première page où IBAN, BIC et titulaire sont trouvés
+    - zone_rib, echelle_dpi, mise_en_page : voir `extraire_texte_pdf`
+    - nb_threads : pages d'un même document OCRisées en parallèle (défaut : NB_THREADS_OCR)
+    """
+
+    def __init__(self, chemin_cache: str | None = CHEMIN_CACHE_DEFAUT, arret_anticipe: bool = True,
+                 zone_rib: bool = False, echelle_dpi: tuple = ECHELLE_DPI, mise_en_page: bool = False,
+                 nb_threads: int | None = None):
+        # Paramètres de construction, pour recréer le même moteur dans chaque processus d'un lot
+        self.parametres = dict(chemin_cache=chemin_cache, arret_anticipe=arret_anticipe, zone_rib=zone_rib,
+                               echelle_dpi=tuple(echelle_dpi), mise_en_page=mise_en_page)
+        self.arret_anticipe = arret_anticipe
+        self.zone_rib = zone_rib
+        self.echelle_dpi = tuple(echelle_dpi)
+        self.mise_en_page = mise_en_page
+        self.nb_threads = nb_threads
+        self.cache = CacheOCR(chemin_cache) if chemin_cache else None
+
+    def preparer(self):
+        """
+        Paie une fois pour toutes les coûts fixes, au lieu du premier document : langue OCR
+        sondée (et modèles chargés dans les moteurs libtesseract), annuaire des banques ouvert.
+        """
+        langue_ocr()
+        annuaire_banques()
+
+    def extraire_octets(self, donnees: bytes, nom: str = "") -> Resultat:
+        """
+        Extrait les champs d'un document fourni en mémoire, PDF ou image (PNG, JPEG, TIFF,
+        reconnue à sa signature) ; `nom` identifie le document dans le résultat.
+        """
+        infos = {}
+        if est_image(donnees):
+            texte = extraire_texte_image(donnees, infos, cache=self.cache, nom=nom, mise_en_page=self.mise_en_page)
+        else:
+            texte = extraire_texte_pdf(donnees, infos, self.nb_threads,
+                                       arret=champs_resolus if self.arret_anticipe else None, cache=self.cache,
+                                       nom=nom, zone_rib=self.zone_rib, echelle_dpi=self.echelle_dpi,
+                                       mise_en_page=self.mise_en_page)
+        # Mots positionnés et leur confiance (option mise_en_page) : pages mal lues, à relire plus finement
+        mots = infos.pop("mots", None)
+        if mots is not None and mots.pages_a_relire():
+            infos["a_relire"] = mots.pages_a_relire()
+        champs, confiances = reconcilier_rib(texte, mots, infos.pop("tableaux", None))
+        infos["empreinte"] = empreinte_pdf(donnees)
+        return Resultat(nom, texte, champs, confiances, champs_a_verifier(confiances), infos)
+
+    def extraire_fichier(self, chemin: str, nom: str | None = None) -> Resultat:
+        """
+        Extrait les champs d'un fichier ou d'un membre d'archive ZIP ('lot.zip/rib.pdf', voir
+        `parcours`). Le résultat porte `nom`, par défaut le nom du fichier.
+        """
+        return self.extraire_octets(lire_document(chemin), nom or os.path.basename(chemin))
+
+    def extraire_document(self, chemin: str, nom: str | None = None) -> Resultat:
+        """
+        Comme `extraire_fichier`, mais une erreur (fichier disparu depuis le parcours, membre
+        d'archive corrompu…) donne un résultat en erreur au lieu d'interrompre le lot.
+        """
+        nom = nom or os.path.basename(chemin)
+        try:
+            return self.extraire_fichier(chemin, nom)
+        except Exception as e:
+            return resultat_erreur(nom, e)
+
+    def extraire_lot(self, chemins, nb_processus: int = 1, max_en_cours: int | None = None):
+        """
+        Extrait une suite de fichiers et génère leurs `Resultat` au fil de l'eau, dans l'ordre des chemins.
+        Un élément de `chemins` peut aussi être un couple (chemin, nom), comme ceux générés par
+        `parcours.parcourir` : le résultat porte alors ce nom (chemin relatif au dossier parcouru).
+
+        Avec plusieurs processus, chacun construit et prépare son propre moteur (mêmes options,
+        un seul Tesseract par processus) ; au plus `max_en_cours` fichiers (par défaut 2 par
+        processus) sont soumis en même temps, ce qui borne la mémoire quel que soit le nombre
+        de fichiers. `chemins` peut être un générateur : il n'est parcouru qu'au fil de l'eau.
+        Un document illisible donne un résultat en erreur (voir `extraire_document`) : le lot continue.
+        """
+        if nb_processus <= 1:
+            for chemin in chemins:
+                yield self.extraire_document(*document(chemin))
+            return
+
+        max_en_cours = max_en_cours or 2 * nb_processus
+        with ProcessPoolExecutor(max_workers=nb_processus, initializer=initialiser_processus,
+                                 initargs=(self.parametres,)) as pool:
+            en_cours = deque()
+            for chemin in chemins:
+                chemin, nom = document(chemin)
+                nom = nom or os.path.basename(chemin)
+                en_cours.append((pool.submit(extraire_dans_processus, chemin, nom), nom))
+                # Fenêtre pleine : on attend le plus ancien fichier avant d'en soumettre un nouveau
+                if len(en_cours) >= max_en_cours:
+                    yield resultat_tache(*en_cours.popleft())
+            while en_cours:
+                yield resultat_tache(*en_cours.popleft())
+
+
+# ---------------------------------------------------------------------------
+# Moteur de chaque processus d'un lot
+# ---------------------------------------------------------------------------
+
+EXTRACTEUR = None       # Moteur du processus courant (voir initialiser_processus)
+
+def initialiser_processus(parametres: dict):
+    """
+    Prépare un processus d'analyse : Tesseract limité à un seul thread (un processus = un
+    Tesseract, sans sur-souscription des cœurs), puis un moteur propre au processus (sa
+    connexion au cache OCR, ses moteurs Tesseract), préparé une fois pour tout le lot.
+    Le parallélisme vient déjà des processus : une page à la fois dans chaque fichier.
+    """
+    global EXTRACTEUR
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    EXTRACTEUR = ExtracteurRib(**parametres, nb_threads=1)
+    EXTRACTEUR.preparer()
+
+def extraire_dans_processus(chemin: str, nom: str | None = None) -> Resultat:
+    """Extrait un fichier avec le moteur du processus courant (erreurs rendues en résultat)."""
+    return EXTRACTEUR.extraire_document(chemin, nom)
+
+def resultat_tache(tache, nom: str) -> Resultat:
+    """Résultat d'une tâche du pool ; une erreur hors du moteur (processus arrêté…) donne un résultat en erreur."""
+    try:
+        return tache.result()
+    except Exception as e:
+        return resultat_erreur(nom, e)
+
+def resultat_erreur(nom: str, erreur: Exception) -> Resultat:
+    """Résultat d'un document qui n'a pas pu être analysé : aucun champ, tous à vérifier."""
+    infos = {"sources": [], "dpi": [], "nb_pages": 0, "erreur": f"{type(erreur).__name__}: {erreur}"}
+    return Resultat(nom, "", dict.fromkeys(CHAMPS_RIB, ""), dict.fromkeys(CHAMPS_RIB, 0.0), list(CHAMPS_RIB), infos)
+
+def document(element) -> tuple:
+    """(chemin, nom) d'un élément de lot : un chemin seul, ou un couple (chemin, nom)."""
+    return (element, None) if isinstance(element, str) else tuple(element)
+
+
+# ---------------------------------------------------------------------------
+# Présentation des résultats (partagée par le script et l'application)
+# ---------------------------------------------------------------------------
+
+def nz(v):
+    """Remplace une valeur vide par 'MANQUANT'."""
+    return v if v else "MANQUANT"
+
+def resumer_lecture(infos: dict) -> str:
+    """Résumé de la lecture d'un document : source du texte, résolutions d'OCR, cache, pages peu lisibles."""
+    if infos.get("erreur"):
+        return f"ERREUR : {infos['erreur']}"
+    resume = resumer_sources(infos.get("sources", []), infos.get("nb_pages"))
+    if any(infos.get("dpi", [])):
+        resume += f" [{resumer_dpi(infos['dpi'])}]"
+    if infos.get("cache") == "succes":
+        resume += " (cache)"
+    if infos.get("a_relire"):
+        resume += f", page(s) peu lisible(s) : {', '.join(map(str, infos['a_relire']))}"
+    return resume
+
+def ligne_resultat(resultat: Resultat, apostrophe: bool = False) -> dict:
+    """
+    Ligne d'export d'un résultat (colonnes COLONNES_EXPORT), champs absents marqués 'MANQUANT'.
+    Avec `apostrophe`, les codes sont préfixés d'une apostrophe pour qu'Excel garde leurs zéros initiaux.
+    """
+    champs, prefixe = resultat.champs, "'" if apostrophe else ""
+    return {
+        "Fichier": resultat.fichier,
+        "Titulaire du compte": nz(champs["titulaire"]),
+        "Code Banque": prefixe + nz(champs["code_banque"]),
+        "Code Guichet": prefixe + nz(champs["code_guichet"]),
+        "N° de compte": prefixe + nz(champs["numero_compte"]),
+        "Clé RIB": prefixe + nz(champs["cle_rib"]),
+        "BIC / SWIFT": nz(champs["bic"]),
+        "IBAN": nz(champs["iban"]),
+        "Domiciliation": nz(champs["domiciliation"]),
+        "Confiance": f"{min(resultat.confiances.values()):.0%}",
+        # Document en erreur : le message remplace la liste des champs à vérifier
+        "À vérifier": (f"ERREUR : {resultat.infos['erreur']}" if resultat.infos.get("erreur")
+                       else ", ".join(resultat.a_verifier)),
+    }
+
+def recoder_codes(ligne: dict, apostrophe: bool) -> dict:
+    """
+    Ligne d'export relue (CSV, JSON Lines ou Parquet) remise au format d'une autre sortie :
+    l'apostrophe devant les codes (COLONNES_CODES) est ajoutée ou retirée selon `apostrophe`.
+    """
+    prefixe = "'" if apostrophe else ""
+    return {**ligne, **{c: prefixe + (ligne.get(c) or "").lstrip("'") for c in COLONNES_CODES}}
@@ -0,0 +1,160 @@
+"""
+Manifeste des traitements par lot : reprise d'un lot interrompu ou relancé.
+
+Le dépôt quotidien ajoute quelques centaines de RIB à un dossier qui en contient des
+dizaines de milliers : relancer le lot ne doit traiter que les fichiers nouveaux ou
+modifiés. Le manifeste enregistre pour chaque fichier (chemin absolu) sa taille, sa date
+de modification (celle de l'archive pour un membre de ZIP), l'empreinte SHA-256 de son
+contenu, les paramètres de lecture et le résultat de son analyse.
+
+Un fichier est repris tel quel du manifeste si sa taille et sa date de modification n'ont
+pas changé (aucune lecture du fichier) ; si elles ont changé mais que son contenu est
+identique (fichier recopié ou touché), seule son empreinte est recalculée. Changer les
+paramètres de lecture (mise en page, résolutions…, mais aussi version de l'extraction et
+annuaire des banques, voir `parametres_lecture` dans rib_extractor.py) fait retraiter
+tous les fichiers.
+
+Un document qui n'a pas pu être analysé (archive abîmée, PDF illisible) est enregistré avec
+le statut 'erreur' et le message de l'erreur : il est repris tel quel, sans faire échouer à
+nouveau le lot, sauf avec `retenter_erreurs`.
+
+Comme le cache OCR, c'est une base SQLite locale (mode WAL), écrite fichier par fichier :
+un lot interrompu reprend là où il s'était arrêté.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+
+from parcours import identite_document, lire_document, separer_membre, ERREURS_LECTURE
+
+# Emplacement par défaut, à côté du cache OCR
+CHEMIN_MANIFESTE_DEFAUT = os.path.join(os.path.expanduser("~"), ".cache", "rib-extractor", "manifeste.sqlite")
+
+# Taille des blocs lus pour calculer l'empreinte d'un fichier
+TAILLE_BLOC = 1 << 20
+
+
+def empreinte_fichier(chemin: str) -> str:
+    """
+    Empreinte SHA-256 du contenu d'un fichier, lu par blocs, ou d'un membre d'archive
+    (même valeur que `empreinte_pdf`).
+    """
+    if separer_membre(chemin) is not None:
+        return hashlib.sha256(lire_document(chemin)).hexdigest()
+    sha = hashlib.sha256()
+    with open(chemin, "rb") as f:
+        for bloc in iter(lambda: f.read(TAILLE_BLOC), b""):
+            sha.update(bloc)
+    return sha.hexdigest()
+
+
+class Manifeste:
+    """
+    Statut et résultat de chaque fichier déjà traité, pour un jeu de `parametres` de lecture
+    (chaîne quelconque : un résultat obtenu avec d'autres paramètres n'est pas repris).
+    Le résultat enregistré est un dictionnaire sérialisable en JSON. Avec `retenter_erreurs`,
+    les fichiers en erreur sont retraités au lieu d'être repris.
+    """
+
+    def __init__(self, chemin: str = CHEMIN_MANIFESTE_DEFAUT, parametres: str = "",
+                 retenter_erreurs: bool = False):
+        self.chemin = chemin
+        self.parametres = parametres
+        self.retenter_erreurs = retenter_erreurs
+        dossier = os.path.dirname(chemin)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        self._conn = sqlite3.connect(chemin, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS fichiers (
+                chemin     TEXT PRIMARY KEY,
+                taille     INTEGER NOT NULL,
+                mtime      INTEGER NOT NULL,
+                empreinte  TEXT NOT NULL,
+                parametres TEXT NOT NULL,
+                statut     TEXT NOT NULL,
+                resultat   TEXT,
+                date       REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def resultat(self, chemin: str) -> dict | None:
+        """
+        Résultat enregistré d'un fichier déjà traité et inchangé, None s'il est à (re)traiter :
+        nouveau, modifié, illisible, traité avec d'autres paramètres, ou en erreur avec
+        `retenter_erreurs`.
+        """
+        try:
+            identite = identite_document(chemin)
+        except ERREURS_LECTURE:
+            return None
+        ligne = self._conn.execute(
+            "SELECT taille, mtime, empreinte, parametres, statut, resultat FROM fichiers WHERE chemin = ?",
+            (identite.chemin,),
+        ).fetchone()
+        if ligne is None:
+            return None
+        taille, mtime, empreinte, parametres, statut, resultat = ligne
+        if parametres != self.parametres or statut not in ("fait", "erreur"):
+            return None
+        if statut == "erreur" and self.retenter_erreurs:
+            return None
+        if (taille, mtime) != (identite.taille, identite.mtime):
+            # Taille ou date changées : le contenu n'est comparé que dans ce cas
+            try:
+                if taille != identite.taille or empreinte_fichier(chemin) != empreinte:
+                    return None
+            except ERREURS_LECTURE:
+                return None
+            self._conn.execute("UPDATE fichiers SET mtime = ? WHERE chemin = ?", (identite.mtime, identite.chemin))
+            self._conn.commit()
+        return json.loads(resultat)
+
+    def empreinte(self, chemin: str) -> str:
+        """
+        Empreinte du contenu d'un fichier : celle enregistrée si sa taille et sa date de
+        modification n'ont pas changé (aucune lecture), sinon calculée.
+        """
+        identite = identite_document(chemin)
+        ligne = self._conn.execute("SELECT taille, mtime, empreinte FROM fichiers WHERE chemin = ?",
+                                   (identite.chemin,)).fetchone()
+        if ligne is not None and tuple(ligne[:2]) == (identite.taille, identite.mtime):
+            return ligne[2]
+        return empreinte_fichier(chemin)
+
+    def enregistrer(self, chemin: str, resultat: dict | None, empreinte: str | None = None,
+                    statut: str = "fait"):
+        """
+        Enregistre le statut ('fait' ou 'erreur') et le résultat d'un fichier traité.
+        `empreinte` évite de relire le fichier quand elle est déjà connue. Un fichier disparu
+        n'est pas enregistré ; un contenu illisible est enregistré sans empreinte.
+        """
+        try:
+            identite = identite_document(chemin)
+        except ERREURS_LECTURE:
+            return
+        if not empreinte:
+            try:
+                empreinte = empreinte_fichier(chemin)
+            except ERREURS_LECTURE:
+                empreinte = ""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO fichiers (chemin, taille, mtime, empreinte, parametres, statut, resultat, date) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (identite.chemin, identite.taille, identite.mtime, empreinte,
+             self.parametres, statut, json.dumps(resultat, ensure_ascii=False), time.time()),
+        )
+        self._conn.commit()
+
+    def statistiques(self) -> dict:
+        """Nombre de fichiers enregistrés par statut."""
+        return dict(self._conn.execute("SELECT statut, COUNT(*) FROM fichiers GROUP BY statut").fetchall())
+
+    def fermer(self):
+        """Ferme la connexion SQLite."""
+        self._conn.close()
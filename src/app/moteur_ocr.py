@@ -0,0 +1,163 @@
+"""
+Moteur OCR persistant : appels directs à la bibliothèque Tesseract (API C, via ctypes).
+
+La commande `tesseract` démarre un nouveau processus et recharge le modèle de langue
+(plusieurs dizaines de Mo pour `fra`) à chaque page : sur un RIB d'une seule page, ce
+chargement coûte plus cher que la reconnaissance elle-même. Ici, chaque moteur est
+initialisé une seule fois pour une langue puis réutilisé de page en page ; les moteurs
+libres attendent dans une file, et il n'en existe jamais plus que de threads d'OCR
+simultanés.
+
+Si libtesseract est introuvable (variable TESSERACT_LIB, sinon recherche système),
+`disponible()` renvoie False et l'OCR se fait par la commande `tesseract`.
+"""
+
+import os
+import queue
+import atexit
+import ctypes
+import ctypes.util
+import threading
+from functools import lru_cache
+
+import pytesseract
+
+# Segmentation de page de la commande `tesseract` par défaut (3 = PSM_AUTO) : l'API C démarre
+# autrement (6 = un seul bloc), ce qui découperait différemment les RIB en colonnes
+PSM_AUTO = 3
+
+# En-tête de la sortie TSV de la commande `tesseract` (l'API C ne le produit pas)
+ENTETE_TSV = "level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext\n"
+
+
+@lru_cache(maxsize=1)
+def bibliotheque():
+    """Charge libtesseract et déclare les fonctions utilisées ; None si la bibliothèque est absente."""
+    chemin = os.environ.get("TESSERACT_LIB") or ctypes.util.find_library("tesseract")
+    if not chemin:
+        return None
+    try:
+        lib = ctypes.CDLL(chemin)
+    except OSError:
+        return None
+
+    lib.TessVersion.restype = ctypes.c_char_p
+    lib.TessBaseAPICreate.restype = ctypes.c_void_p
+    lib.TessBaseAPIInit3.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p]
+    lib.TessBaseAPIInit3.restype = ctypes.c_int
+    lib.TessBaseAPISetPageSegMode.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    lib.TessBaseAPISetImage.argtypes = [ctypes.c_void_p, ctypes.c_char_p,
+                                        ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int]
+    lib.TessBaseAPISetSourceResolution.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    # Les textes renvoyés sont alloués par Tesseract : on garde le pointeur pour les libérer
+    lib.TessBaseAPIGetUTF8Text.argtypes = [ctypes.c_void_p]
+    lib.TessBaseAPIGetUTF8Text.restype = ctypes.c_void_p
+    lib.TessBaseAPIGetTsvText.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    lib.TessBaseAPIGetTsvText.restype = ctypes.c_void_p
+    lib.TessDeleteText.argtypes = [ctypes.c_void_p]
+    lib.TessBaseAPIClear.argtypes = [ctypes.c_void_p]
+    lib.TessBaseAPIEnd.argtypes = [ctypes.c_void_p]
+    lib.TessBaseAPIDelete.argtypes = [ctypes.c_void_p]
+    return lib
+
+
+def disponible() -> bool:
+    """Vrai si libtesseract a pu être chargée."""
+    return bibliotheque() is not None
+
+
+def version_bibliotheque() -> str | None:
+    """Version de libtesseract, None si elle est absente."""
+    lib = bibliotheque()
+    return lib.TessVersion().decode() if lib is not None else None
+
+
+class PoolTesseract:
+    """
+    Réserve de moteurs Tesseract initialisés, par langue.
+
+    Un moteur n'est utilisé que par un thread à la fois : `ocr` en prend un libre dans la
+    file de sa langue (ou en initialise un nouveau si tous sont occupés), puis l'y remet.
+    Le nombre de moteurs suit donc le nombre de threads d'OCR simultanés.
+    """
+
+    def __init__(self):
+        self._lib = bibliotheque()
+        self._libres = {}            # langue -> file des moteurs libres
+        self._verrou = threading.Lock()
+
+    def _file(self, lang: str) -> queue.LifoQueue:
+        with self._verrou:
+            return self._libres.setdefault(lang, queue.LifoQueue())
+
+    def _creer(self, lang: str):
+        """Initialise un moteur pour `lang` (chargement du modèle de langue, fait une seule fois)."""
+        moteur = self._lib.TessBaseAPICreate()
+        if self._lib.TessBaseAPIInit3(moteur, None, lang.encode()) != 0:
+            self._lib.TessBaseAPIDelete(moteur)
+            # Même exception que la commande, pour que le repli sur une autre langue reste identique
+            raise pytesseract.TesseractError(1, f"Failed loading language '{lang}'")
+        # Même segmentation que la commande : le résultat ne dépend pas du moteur trouvé
+        self._lib.TessBaseAPISetPageSegMode(moteur, PSM_AUTO)
+        return moteur
+
+    def charger(self, lang: str) -> bool:
+        """Initialise un moteur pour `lang` et le garde en réserve ; False si la langue n'est pas installée."""
+        try:
+            moteur = self._creer(lang)
+        except pytesseract.TesseractError:
+            return False
+        self._file(lang).put(moteur)
+        return True
+
+    def ocr(self, img, lang: str, dpi: int, sortie: str = "txt") -> str:
+        """
+        Reconnaît une image PIL. `sortie` vaut 'txt' (texte brut) ou 'tsv' (mots avec leurs
+        boîtes englobantes, au même format que la commande `tesseract ... tsv`).
+        """
+        libres = self._file(lang)
+        try:
+            moteur = libres.get_nowait()
+        except queue.Empty:
+            moteur = self._creer(lang)
+        try:
+            img = img.convert("L")
+            largeur, hauteur = img.size
+            self._lib.TessBaseAPISetImage(moteur, img.tobytes(), largeur, hauteur, 1, largeur)
+            self._lib.TessBaseAPISetSourceResolution(moteur, dpi)
+            if sortie == "tsv":
+                pointeur = self._lib.TessBaseAPIGetTsvText(moteur, 0)
+            else:
+                pointeur = self._lib.TessBaseAPIGetUTF8Text(moteur)
+            if not pointeur:
+                raise pytesseract.TesseractError(1, "Tesseract n'a renvoyé aucun texte")
+            texte = ctypes.string_at(pointeur).decode("utf-8", errors="replace")
+            self._lib.TessDeleteText(pointeur)
+            # Libère le résultat de la page, le modèle de langue reste chargé
+            self._lib.TessBaseAPIClear(moteur)
+        except BaseException:
+            self._lib.TessBaseAPIEnd(moteur)
+            self._lib.TessBaseAPIDelete(moteur)
+            raise
+        libres.put(moteur)
+        return ENTETE_TSV + texte if sortie == "tsv" else texte
+
+    def fermer(self):
+        """Libère tous les moteurs libres."""
+        with self._verrou:
+            files, self._libres = list(self._libres.values()), {}
+        for libres in files:
+            while not libres.empty():
+                moteur = libres.get_nowait()
+                self._lib.TessBaseAPIEnd(moteur)
+                self._lib.TessBaseAPIDelete(moteur)
+
+
+@lru_cache(maxsize=1)
+def pool_tesseract() -> PoolTesseract | None:
+    """Réserve de moteurs partagée par le processus (None sans libtesseract), libérée à sa sortie."""
+    if not disponible():
+        return None
+    pool = PoolTesseract()
+    atexit.register(pool.fermer)
+    return pool
@@ -0,0 +1,187 @@
+"""
+Parcours paresseux des dossiers de dépôt : PDF, images et archives ZIP de RIB.
+
+Le partage de dépôt contient des millions d'entrées, rangées par date puis par client :
+on ne construit jamais la liste complète. `parcourir` explore l'arborescence avec
+`os.scandir` (seuls les dossiers de la branche explorée sont listés, dans l'ordre
+alphabétique pour que l'ordre des résultats ne dépende pas du système de fichiers) et
+génère les documents au fur et à mesure, ce qui alimente directement le pool d'analyse
+(`ExtracteurRib.extraire_lot`).
+
+Les membres d'une archive ZIP sont désignés comme des fichiers du dossier qu'elle
+formerait : 'depot/lot.zip/client/rib.pdf'. `lire_document` et `identite_document` lisent
+indifféremment un fichier ou un membre d'archive (archives imbriquées non gérées). Chaque
+processus garde ouvertes ses dernières archives (`archive_ouverte`) : le répertoire central
+d'un ZIP de milliers de membres n'est lu qu'une fois, pas à chaque membre.
+"""
+
+import os
+import zlib
+import zipfile
+import threading
+from fnmatch import fnmatch
+from collections import namedtuple, OrderedDict
+
+# Extensions des documents analysés : PDF, photos et scans (formats lus par `extraire_texte_image`)
+EXTENSIONS_DOCUMENTS = (".pdf", ".png", ".jpg", ".jpeg", ".tif", ".tiff")
+EXTENSION_ARCHIVE = ".zip"
+
+# Nombre d'archives gardées ouvertes par processus (les plus récemment utilisées)
+MAX_ARCHIVES_OUVERTES = 8
+
+# Erreurs de `lire_document` / `identite_document` : fichier disparu entre le parcours et la
+# lecture, archive ou membre abîmé
+ERREURS_LECTURE = (OSError, KeyError, EOFError, zipfile.BadZipFile, zlib.error)
+
+# Identité d'un document sur le disque : chemin absolu, taille (octets), date de modification (ns).
+# Pour un membre d'archive : taille du membre, date de modification de l'archive.
+Identite = namedtuple("Identite", "chemin taille mtime")
+
+
+def retenu(relatif: str, inclure=(), exclure=()) -> bool:
+    """
+    Vrai si le chemin relatif (séparateur '/') passe les filtres : il correspond à au moins
+    un motif de `inclure` (s'il y en a) et à aucun motif de `exclure`. Les motifs glob sont
+    comparés au chemin relatif complet et au nom seul : '*.pdf', '2025-*/*', 'brouillons'.
+    """
+    nom = relatif.rsplit("/", 1)[-1]
+    if any(fnmatch(relatif, motif) or fnmatch(nom, motif) for motif in exclure):
+        return False
+    return not inclure or any(fnmatch(relatif, motif) or fnmatch(nom, motif) for motif in inclure)
+
+
+def cle_ordre(relatif: str) -> list:
+    """
+    Clé de tri qui reproduit l'ordre de `parcourir` : chemins relatifs comparés élément par
+    élément (un dossier et tout son contenu viennent à la place de son nom). Sert à fusionner
+    des résultats produits séparément (tranches d'un lot) dans l'ordre d'un parcours unique.
+    """
+    return relatif.split("/")
+
+
+def membres_archive(archive: str, relatif: str, extensions: tuple, inclure=(), exclure=()):
+    """
+    Génère (chemin, chemin relatif) des documents d'une archive ZIP, dans l'ordre de
+    `cle_ordre`. L'archive reste ouverte dans le cache du processus : l'identité et le
+    contenu des membres sont ensuite lus dans le même répertoire central.
+    """
+    try:
+        zf = archive_ouverte(archive)
+        noms = sorted((info.filename for info in zf.infolist() if not info.is_dir()), key=cle_ordre)
+    except (OSError, zipfile.BadZipFile) as e:
+        print(f"Archive illisible {archive} : {e}")
+        return
+    for nom in noms:
+        membre = f"{relatif}/{nom}"
+        if nom.lower().endswith(extensions) and retenu(membre, inclure, exclure):
+            yield os.path.join(archive, *nom.split("/")), membre
+
+
+def lister(dossier: str) -> list:
+    """Entrées d'un dossier, triées par nom (liste vide si le dossier est illisible)."""
+    try:
+        with os.scandir(dossier) as entrees:
+            return sorted(entrees, key=lambda e: e.name)
+    except OSError as e:
+        print(f"Dossier illisible {dossier} : {e}")
+        return []
+
+
+def parcourir(racine: str, recursif: bool = False, inclure=(), exclure=(),
+              extensions: tuple = EXTENSIONS_DOCUMENTS, archives: bool = True):
+    """
+    Génère (chemin, chemin relatif à `racine`) pour chaque document de `racine`, au fil de
+    l'exploration. Avec `recursif`, les sous-dossiers sont parcourus en profondeur, chacun à
+    la place de son nom (ordre de `cle_ordre`), sans suivre les liens symboliques de
+    dossiers ; un dossier exclu par `exclure` n'est pas exploré du tout. Avec `archives`,
+    les documents des archives ZIP sont aussi générés. Seuls les dossiers de la branche
+    en cours d'exploration sont gardés en mémoire.
+    """
+    pile = [(iter(lister(racine)), "")]
+    while pile:
+        entrees, prefixe = pile[-1]
+        entree = next(entrees, None)
+        if entree is None:
+            pile.pop()
+            continue
+        relatif = prefixe + entree.name
+        if entree.is_dir(follow_symlinks=False):
+            if recursif and not any(fnmatch(relatif, m) or fnmatch(entree.name, m) for m in exclure):
+                pile.append((iter(lister(entree.path)), relatif + "/"))
+        elif not entree.is_file():
+            continue
+        elif archives and entree.name.lower().endswith(EXTENSION_ARCHIVE):
+            if retenu(relatif, (), exclure):
+                yield from membres_archive(entree.path, relatif, extensions, inclure, exclure)
+        elif entree.name.lower().endswith(extensions) and retenu(relatif, inclure, exclure):
+            yield entree.path, relatif
+
+
+# ---------------------------------------------------------------------------
+# Accès aux documents : fichiers ou membres d'archive
+# ---------------------------------------------------------------------------
+
+# Archives ouvertes du processus : chemin -> (pid, (taille, mtime), ZipFile), ordre LRU
+_ARCHIVES = OrderedDict()
+_VERROU_ARCHIVES = threading.Lock()
+
+
+def archive_ouverte(archive: str) -> zipfile.ZipFile:
+    """
+    Archive ZIP ouverte, gardée dans le cache du processus (LRU de `MAX_ARCHIVES_OUVERTES`).
+    Elle est rouverte si elle a changé sur le disque (taille ou date) ou si le cache a été
+    hérité d'un autre processus (fork du pool) : un descripteur partagé n'a qu'une position
+    de lecture pour les deux processus.
+    """
+    infos = os.stat(archive)
+    signature = (infos.st_size, infos.st_mtime_ns)
+    with _VERROU_ARCHIVES:
+        entree = _ARCHIVES.get(archive)
+        if entree is not None:
+            pid, signature_connue, zf = entree
+            if pid == os.getpid() and signature_connue == signature:
+                _ARCHIVES.move_to_end(archive)
+                return zf
+            del _ARCHIVES[archive]
+            if pid == os.getpid():
+                zf.close()
+        zf = zipfile.ZipFile(archive)
+        _ARCHIVES[archive] = (os.getpid(), signature, zf)
+        while len(_ARCHIVES) > MAX_ARCHIVES_OUVERTES:
+            pid, _, ancienne = _ARCHIVES.popitem(last=False)[1]
+            if pid == os.getpid():
+                ancienne.close()
+        return zf
+
+
+def separer_membre(chemin: str) -> tuple | None:
+    """(archive, nom du membre) si `chemin` désigne un membre d'archive ZIP, None sinon."""
+    if os.path.exists(chemin):
+        return None
+    marque = EXTENSION_ARCHIVE + os.sep
+    fin = chemin.lower().find(marque)
+    while fin >= 0:
+        archive = chemin[:fin + len(EXTENSION_ARCHIVE)]
+        if os.path.isfile(archive):
+            return archive, chemin[fin + len(marque):].replace(os.sep, "/")
+        fin = chemin.lower().find(marque, fin + 1)
+    return None
+
+def lire_document(chemin: str) -> bytes:
+    """Contenu d'un fichier ou d'un membre d'archive."""
+    membre = separer_membre(chemin)
+    if membre is None:
+        with open(chemin, "rb") as f:
+            return f.read()
+    archive, nom = membre
+    return archive_ouverte(archive).read(nom)
+
+def identite_document(chemin: str) -> Identite:
+    """Taille et date de modification d'un fichier ou d'un membre d'archive, sans le lire."""
+    membre = separer_membre(chemin)
+    if membre is None:
+        infos = os.stat(chemin)
+        return Identite(os.path.abspath(chemin), infos.st_size, infos.st_mtime_ns)
+    archive, nom = membre
+    taille = archive_ouverte(archive).getinfo(nom).file_size
+    return Identite(os.path.abspath(chemin), taille, os.stat(archive).st_mtime_ns)
@@ -0,0 +1,175 @@
+"""
+Écriture des résultats au fil de l'eau : CSV, JSON Lines ou Parquet.
+
+Chaque ligne est écrite dès que son fichier est analysé, au lieu d'accumuler tout le lot
+en mémoire pour l'exporter à la fin : la mémoire reste constante quel que soit le nombre
+de fichiers, et les lignes déjà écrites survivent à un arrêt brutal. Les écritures sont
+vidées sur disque périodiquement (toutes les FLUSH_LIGNES lignes ou FLUSH_SECONDES
+secondes) :
+- CSV et JSON Lines restent lisibles jusqu'à la dernière ligne vidée, même si le
+  traitement est interrompu ;
+- Parquet est écrit par groupes de lignes (row groups) ; son pied de fichier n'est écrit
+  qu'à la fermeture, faite aussi en cas d'exception (bloc `with`).
+
+    with ouvrir_sortie("rib_infos.csv", COLONNES_EXPORT) as sortie:
+        for ligne in lignes:
+            sortie.ecrire(ligne)
+"""
+
+import os
+import csv
+import json
+import time
+
+# Vidage périodique des écritures sur disque
+FLUSH_LIGNES = 100          # ... toutes les N lignes
+FLUSH_SECONDES = 10.0       # ... ou au plus tard après N secondes
+
+# Formats reconnus, d'après l'extension du fichier de sortie
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet"}
+
+
+class Sortie:
+    """
+    Écrivain de lignes (dictionnaires colonne -> texte) vers `chemin`, colonnes dans l'ordre de `colonnes`.
+    Les sous-classes écrivent (`_ecrire`) et vident sur disque (`_vider`) ; le rythme des vidages est commun.
+    """
+
+    # Vrai si les codes doivent être préfixés d'une apostrophe (zéros initiaux conservés par Excel)
+    apostrophe = False
+
+    def __init__(self, chemin: str, colonnes, flush_lignes: int = FLUSH_LIGNES,
+                 flush_secondes: float = FLUSH_SECONDES):
+        self.chemin = chemin
+        self.colonnes = tuple(colonnes)
+        self.flush_lignes = flush_lignes
+        self.flush_secondes = flush_secondes
+        self.nb_lignes = 0
+        self._en_attente = 0                    # Lignes écrites depuis le dernier vidage
+        self._dernier_vidage = time.monotonic()
+
+    def ecrire(self, ligne: dict):
+        """Écrit une ligne (les colonnes absentes sont laissées vides) et vide périodiquement."""
+        self._ecrire([ligne.get(c, "") for c in self.colonnes])
+        self.nb_lignes += 1
+        self._en_attente += 1
+        if self._en_attente >= self.flush_lignes or time.monotonic() - self._dernier_vidage >= self.flush_secondes:
+            self.vider()
+
+    def vider(self):
+        """Vide sur disque les lignes en attente."""
+        if self._en_attente:
+            self._vider()
+        self._en_attente = 0
+        self._dernier_vidage = time.monotonic()
+
+    def fermer(self):
+        """Vide les dernières lignes et ferme le fichier."""
+        self.vider()
+        self._fermer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+
+class SortieCSV(Sortie):
+    """
+    CSV pour Excel : toutes les valeurs entre guillemets (lues comme du texte) et codes
+    préfixés d'une apostrophe, pour conserver leurs zéros initiaux.
+    """
+
+    apostrophe = True
+
+    def __init__(self, chemin: str, colonnes, **options):
+        super().__init__(chemin, colonnes, **options)
+        self._fichier = open(chemin, "w", encoding="utf-8", newline="")
+        self._csv = csv.writer(self._fichier, quoting=csv.QUOTE_NONNUMERIC, lineterminator="\n")
+        self._csv.writerow(self.colonnes)
+
+    def _ecrire(self, valeurs: list):
+        self._csv.writerow(valeurs)
+
+    def _vider(self):
+        self._fichier.flush()
+        os.fsync(self._fichier.fileno())
+
+    def _fermer(self):
+        self._fichier.close()
+
+
+class SortieJSONL(Sortie):
+    """JSON Lines : un objet JSON par ligne, clés dans l'ordre des colonnes."""
+
+    def __init__(self, chemin: str, colonnes, **options):
+        super().__init__(chemin, colonnes, **options)
+        self._fichier = open(chemin, "w", encoding="utf-8")
+
+    def _ecrire(self, valeurs: list):
+        self._fichier.write(json.dumps(dict(zip(self.colonnes, valeurs)), ensure_ascii=False) + "\n")
+
+    def _vider(self):
+        self._fichier.flush()
+        os.fsync(self._fichier.fileno())
+
+    def _fermer(self):
+        self._fichier.close()
+
+
+class SortieParquet(Sortie):
+    """
+    Parquet (pyarrow), toutes les colonnes en texte : les lignes en attente forment un groupe
+    de lignes, écrit à chaque vidage. Seul le groupe en cours est gardé en mémoire.
+    """
+
+    def __init__(self, chemin: str, colonnes, **options):
+        super().__init__(chemin, colonnes, **options)
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        self._schema = pa.schema([(c, pa.string()) for c in self.colonnes])
+        self._parquet = pq.ParquetWriter(chemin, self._schema)
+        self._groupe = [[] for _ in self.colonnes]
+
+    def _ecrire(self, valeurs: list):
+        for colonne, valeur in zip(self._groupe, valeurs):
+            colonne.append(valeur)
+
+    def _vider(self):
+        self._parquet.write_table(self._pa.Table.from_arrays(self._groupe, schema=self._schema))
+        self._groupe = [[] for _ in self.colonnes]
+
+    def _fermer(self):
+        self._parquet.close()
+
+
+SORTIES = {"csv": SortieCSV, "jsonl": SortieJSONL, "parquet": SortieParquet}
+
+def format_sortie(chemin: str) -> str:
+    """Format d'un fichier de sortie d'après son extension (CSV par défaut)."""
+    return FORMATS.get(os.path.splitext(chemin)[1].lower(), "csv")
+
+def lire_sortie(chemin: str, format: str | None = None):
+    """
+    Relit un fichier de résultats (CSV, JSON Lines ou Parquet) ligne par ligne, sans le charger
+    en entier : génère des dictionnaires colonne -> texte.
+    """
+    format = format or format_sortie(chemin)
+    if format == "parquet":
+        import pyarrow.parquet as pq
+        for groupe in pq.ParquetFile(chemin).iter_batches():
+            yield from groupe.to_pylist()
+        return
+    with open(chemin, encoding="utf-8", newline="") as f:
+        if format == "csv":
+            yield from csv.DictReader(f)
+        else:
+            for ligne in f:
+                if ligne.strip():
+                    yield json.loads(ligne)
+
+def ouvrir_sortie(chemin: str, colonnes, format: str | None = None, **options) -> Sortie:
+    """Ouvre un écrivain pour `chemin` ; le format est déduit de l'extension s'il n'est pas donné."""
+    return SORTIES[format or format_sortie(chemin)](chemin, colonnes, **options)
@@ -2,7 +2,7 @@
 Fichier utils pour l'extraction d'informations bancaires à partir de fichiers RIB (PDF).
 
 Ce module fournit les fonctions nécessaires à :
-- L'extraction OCR du texte
+- L'extraction du texte (couche texte native du PDF, sinon OCR ; OCR direct des images)
 - L'identification des champs RIB (IBAN, BIC, Code Banque, etc.)
 - La validation et reconstruction d'informations manquantes
 
@@ -10,14 +10,29 @@ Ce module fournit les fonctions nécessaires à :
 
 
 # --- Import des modules ---
+import io
 import os
 import re
-import tempfile
+import string
 import logging
 import importlib
-from pdf2image import convert_from_path
+import threading
+import subprocess
+import unicodedata
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, combinations, product
+from collections import namedtuple
+from functools import partial, lru_cache, cached_property
+from concurrent.futures import ThreadPoolExecutor
+import pdfplumber
+import pypdfium2 as pdfium
+from pdf2image import convert_from_bytes
+from PIL import Image, ImageSequence
 import pytesseract
-from stdnum import iban as iban_lib
+from moteur_ocr import pool_tesseract
+from cache_ocr import version_tesseract
+from annuaire_banques import annuaire_banques
 
 # --- Chargement dynamique du module BIC ---
 try:
@@ -40,91 +55,648 @@ logging.getLogger("pdfminer").setLevel(logging.ERROR)
 
 #region REGEX
 # --- Expressions régulières de détection des champs ---
+# Chaque champ est décrit par son libellé (LIB_*, reconnu par le balayage unique du texte,
+# voir `balayer`) et, si besoin, par le motif de sa valeur lue juste après le libellé (VAL_*).
 
 # On reconnaît le texte 'code banque', 'banque' ou 'code bq', 
 # puis on cherche 5 chiffres après n’importe quel séparateur non numérique
-PAT_CODE_BANQUE  = re.compile(r'(?i)\b(code\s*banque|banque|code\s*bq)\b\D*([0-9]{5})')
+LIB_CODE_BANQUE  = r'code\s*banque|banque|code\s*bq'
+VAL_CODE_BANQUE  = re.compile(r'\D*([0-9]{5})')
 
 # Recherche du label 'guichet' et autorisation de toutes ses variations d'espacement, 
 # puis on prend le premier groupe de 5 chiffres après n’importe quel séparateur non numérique.
-PAT_CODE_GUICHET = re.compile(r'(?i)\b(code\s*guichet|guichet)\b\D*([0-9]{5})')
+LIB_CODE_GUICHET = r'code\s*guichet|guichet'
+VAL_CODE_GUICHET = re.compile(r'\D*([0-9]{5})')
 # Recherche du label 'numéro de compte' et ses variantes, 
 # puis on prend le groupe de 5 à 34 caractères alphanumériques après n’importe quel séparateur non numérique.
-PAT_NUM_COMPTE   = re.compile(r'(?i)\b(num(?:[ée]ro)?\s*de\s*compte|n[°\s]*compte|compte)\b\D*([A-Z0-9]{5,34})')
+LIB_NUM_COMPTE   = r'num(?:[ée]ro)?\s*de\s*compte|n[°\s]*compte|compte'
+VAL_NUM_COMPTE   = re.compile(r'(?i)\D*([A-Z0-9]{5,34})')
 # Recherche du label 'clé RIB' ou 'clé' et ses variantes, 
 # puis on prend le groupe de 2 chiffres après n’importe quel séparateur non numérique.
-PAT_CLE_RIB      = re.compile(r'(?i)\b(cl[ée]\s*rib|cl[ée])\b\D*([0-9]{2})')
+LIB_CLE_RIB      = r'cl[ée]\s*rib|cl[ée]'
+VAL_CLE_RIB      = re.compile(r'\D*([0-9]{2})')
 
 # Structure obligatoire d’un IBAN français : FR + 2 chiffres de clé + 23 caractères alphanumériques
 PAT_IBAN_FR_COMPACT = re.compile(r'FR\d{2}[A-Z0-9]{23}')
+# Valeur lue après un libellé 'IBAN' (repli quand aucun IBAN compact n'est valide)
+VAL_IBAN = re.compile(r'(?i)\s*[:\-]?\s*([A-Z0-9 ]{8,50})')
 
 # Label BIC / SWIFT tolérant OCR
 # Recherche les mots-clés BIC / SWIFT dans toutes les formes possibles, 
 # y compris avec des erreurs OCR, grâce à un pattern très tolérant.
-PAT_BIC = re.compile(
-    r"""
-    (?i)
-    \b(
+LIB_BIC = r"""
         B[\.\s]*I[\.\s]*C              # BIC / B.I.C / B I C
         (?:[\s\./:-]*S[\.\s]*W[\.\s]*I[\.\s]*F[\.\s]*T(?:\s*CODE)?)?
       | S[\.\s]*W[\.\s]*I[\.\s]*F[\.\s]*T(?:\s*CODE)?     # SWIFT / SWIFT CODE
       | CODE\s*B[\.\s]*I[\.\s]*C                          # CODE BIC
       | ADRESSE\s*S[\.\s]*W[\.\s]*I[\.\s]*F[\.\s]*T       # ADRESSE SWIFT
-    )\b
-    """,
-    re.VERBOSE # Permet d’ajouter des commentaires et des sauts de lignes dans le pattern
-)
+"""
 
 # Pattern du code BIC lui-même (structure officielle, 8 ou 11 chars)
 # 4 lettres (banque), 2 lettres (pays), 2 alphanumériques (localisation), 3 optionnels (agence).
 PAT_BIC_CODE = re.compile(
-    r'[A-Z]{4}[A-Z]{2}[A-Z0-9]{2}(?:[A-Z0-9]{3})?'
+    r'\b[A-Z]{4}[A-Z]{2}[A-Z0-9]{2}(?:[A-Z0-9]{3})?\b'
 )
 
 
+# Indices qu'une page OCR contient des coordonnées bancaires (libellés ou début d'IBAN FR).
+# Sert à décider s'il vaut la peine de relire la page à plus haute résolution.
+PAT_INDICE_RIB = re.compile(r'(?i)\b(IBAN|RIB|BIC|SWIFT|guichet)\b|\bFR\s?\d{2}\b')
+
 # On couvre différents libellés possibles pour capter le titulaire, 
 # car la structure des RIB varie selon les banques.
-PAT_TITULAIRE = re.compile(
-    r'(?i)\b(titulaire(?:\s*du\s*compte)?|nom\s+du\s+titul(?:aire)?|b[ée]n[ée]ficiaire|au\s*nom\s*de)\b\s*[:\-]?\s*([A-ZÉÈÊÀÂÎÏÔÙÜÇa-z0-9\.\'\-\s]+)'
-)
+LIB_TITULAIRE = r'titulaire(?:\s*du\s*compte)?|nom\s+du\s+titul(?:aire)?|b[ée]n[ée]ficiaire|au\s*nom\s*de'
+VAL_TITULAIRE = re.compile(r'(?i)\s*[:\-]?\s*([A-ZÉÈÊÀÂÎÏÔÙÜÇa-z0-9\.\'\-\s]+)')
+# Un titulaire ne doit pas contenir d'autres rubriques du RIB
+PAT_TITULAIRE_INVALIDE = re.compile(r'(?i)\b(BIC|IBAN|DOMICILIATION)\b')
+# Civilités et formes juridiques : repli pour trouver la ligne du titulaire sans libellé
+LIB_CIVILITE = r'M\.|MME|MONSIEUR|MADAME|SARL|SAS|SA|EURL|SOCIETE'
+
+# Libellés de la domiciliation, et texte qui les suit sur la même ligne
+LIB_DOMICILIATION = r'domiciliation|agence|adresse'
+VAL_DOMICILIATION = re.compile(r'[:\-\s]*(.*)')
+# Repli sans libellé : une ligne d'adresse postale ('12 rue …'), sans franchir de saut de ligne
+PAT_ADRESSE = re.compile(r'(?i)\b(\d{1,4}[^\S\n]+(rue|avenue|bd|boulevard|place|impasse))\b')
+PAT_NUMERO_VOIE = re.compile(r'\d{1,4}\s')
+
+# --- Motifs et tables de nettoyage ---
+# Compilés une seule fois : les fonctions de nettoyage sont appelées pour chaque page et
+# chaque candidat, et le petit cache interne du module `re` n'y suffit pas toujours.
+
+# Espaces ou tabulations à remplacer par un espace unique (un espace isolé est laissé tel quel)
+PAT_BLANCS = re.compile(r'[ \t]{2,}|\t')
+PAT_ESPACES_MULTIPLES = re.compile(r'\s{2,}')
+# Suite de caractères conservés dans le texte compacté (lettres et chiffres ASCII)
+PAT_ALPHANUMERIQUES = re.compile(r'[A-Za-z0-9]+')
+# Début d'IBAN français dans un mot OCR normalisé
+PAT_DEBUT_IBAN_FR = re.compile(r'FR\d{2}')
+
+# Tables de `bytes.translate` : caractères ASCII non alphanumériques à supprimer, et passage
+# en majuscules des lettres ASCII. Bien plus rapide qu'une substitution par regex.
+NON_ALPHANUMERIQUES = bytes(c for c in range(128) if not chr(c).isalnum())
+NON_ALPHANUMERIQUES_SAUF_LIGNES = NON_ALPHANUMERIQUES.replace(b"\n", b"")
+MAJUSCULES_ASCII = bytes.maketrans(string.ascii_lowercase.encode(), string.ascii_uppercase.encode())
 
 #region OCR
 # ---------------------------------------------------------------------------
-# OCR
+# Lecture du texte : couche texte native puis OCR
 # ---------------------------------------------------------------------------
 
-def extraire_texte_ocr(path: str) -> str:
-    """Réalise une extraction OCR complète du texte d'un PDF."""
-    
-    # Initialise une chaîne vide qui contiendra le texte OCR final.
-    texte = ""
+# Nombre minimal de caractères alphanumériques pour qu'une couche texte native soit jugée exploitable.
+# En dessous, la page est probablement un scan (ou un en-tête seul) et passe par l'OCR.
+SEUIL_TEXTE_NATIF = 40
+
+# Nombre de pages d'un même PDF OCRisées en parallèle.
+# Chaque page lance son propre sous-processus tesseract : des threads suffisent.
+NB_THREADS_OCR = os.cpu_count() or 1
+
+def texte_natif_exploitable(texte: str) -> bool:
+    """Vérifie qu'une couche texte native (pdfplumber) est suffisamment propre pour éviter l'OCR."""
+    if not texte:
+        return False
+    # Glyphes sans table Unicode : pdfminer les rend sous la forme '(cid:12)', le texte est inutilisable
+    if "(cid:" in texte:
+        return False
+    utiles = [ch for ch in texte if not ch.isspace()]
+    alnum = sum(ch.isalnum() for ch in utiles)
+    if alnum < SEUIL_TEXTE_NATIF:
+        return False
+    # Trop de symboles ou de caractères de remplacement : encodage de police cassé
+    parasites = sum(1 for ch in utiles if ch == "\ufffd" or not ch.isprintable())
+    return parasites == 0 and alnum / len(utiles) >= 0.5
+
+# Résolution de rastérisation par défaut des pages sans couche texte
+DPI_OCR = 300
+
+# Échelle de résolutions essayées pour l'OCR d'une page : on commence bas (4 fois moins de
+# pixels qu'à 300 dpi) et on ne monte d'un cran que si la page semble contenir un RIB
+# que l'on n'arrive pas à valider (IBAN mod 97 ou clé RIB). Voir `ocr_page`.
+ECHELLE_DPI = (150, 300, 400)
+
+# pdfium n'est pas thread-safe : tout appel (ouverture et fermeture du document, nombre de pages,
+# chargement, rendu et fermeture d'une page) se fait sous ce verrou, un seul à la fois.
+# Tesseract, lui, tourne en parallèle (un moteur ou un sous-processus par thread).
+VERROU_RENDU = threading.Lock()
+
+def tesseract_stdin(img, lang: str, dpi: int = DPI_OCR, sortie: str = "txt") -> str:
+    """
+    Passe une image à Tesseract par l'entrée standard et lit le résultat sur la sortie standard :
+    contrairement à pytesseract, aucun fichier image temporaire n'est écrit sur disque.
+    L'image est envoyée en niveaux de gris au format PGM (non compressé, donc rapide à encoder).
+    `sortie` vaut 'txt' (texte brut) ou 'tsv' (mots avec leurs boîtes englobantes).
+    """
+    tampon = io.BytesIO()
+    img.convert("L").save(tampon, format="PPM")
+    commande = [pytesseract.pytesseract.tesseract_cmd, "stdin", "stdout", "-l", lang, "--dpi", str(dpi)]
+    if sortie == "tsv":
+        commande.append("tsv")
+    proc = subprocess.run(commande, input=tampon.getvalue(), capture_output=True)
+    if proc.returncode != 0:
+        raise pytesseract.TesseractError(proc.returncode, proc.stderr.decode("utf-8", errors="replace"))
+    return proc.stdout.decode("utf-8", errors="replace")
+
+def tesseract(img, lang: str, dpi: int = DPI_OCR, sortie: str = "txt") -> str:
+    """
+    Exécute Tesseract sur une image : par un moteur persistant (libtesseract, modèle de langue
+    chargé une fois pour toutes) s'il est disponible, sinon par la commande `tesseract`.
+    """
+    pool = pool_tesseract()
+    if pool is not None:
+        return pool.ocr(img, lang, dpi, sortie)
+    return tesseract_stdin(img, lang, dpi, sortie)
+
+# Langues d'OCR par ordre de préférence : la première installée est retenue
+LANGUES_OCR = ("fra", "eng")
+
+# Emplacements usuels des modèles de langue, essayés après TESSDATA_PREFIX quand la commande
+# `tesseract` est absente (libtesseract seule)
+DOSSIERS_TESSDATA = ("/usr/share/tesseract-ocr/5/tessdata", "/usr/share/tesseract-ocr/4.00/tessdata",
+                     "/usr/share/tessdata", "/usr/local/share/tessdata", "/opt/homebrew/share/tessdata")
+
+def langues_tessdata() -> frozenset:
+    """Langues dont le modèle (.traineddata) est dans le premier dossier tessdata trouvé (TESSDATA_PREFIX, puis DOSSIERS_TESSDATA)."""
+    prefixe = os.environ.get("TESSDATA_PREFIX")
+    dossiers = [prefixe, os.path.join(prefixe, "tessdata")] if prefixe else []
+    for dossier in dossiers + list(DOSSIERS_TESSDATA):
+        try:
+            noms = os.listdir(dossier)
+        except OSError:
+            continue
+        langues = frozenset(nom[:-len(".traineddata")] for nom in noms if nom.endswith(".traineddata"))
+        if langues:
+            return langues
+    return frozenset()
+
+@lru_cache(maxsize=1)
+def langues_installees() -> frozenset:
+    """
+    Langues Tesseract installées, sondées une seule fois par processus et sans charger de
+    modèle : `tesseract --list-langs`, sinon le contenu du dossier tessdata. En dernier
+    recours (libtesseract seule, dossier introuvable), les langues de LANGUES_OCR sont
+    chargées dans le moteur persistant jusqu'à la première qui réussit.
+    """
+    try:
+        langues = frozenset(pytesseract.get_languages(config=""))
+    except Exception:
+        langues = frozenset()
+    langues = langues or langues_tessdata()
+    pool = pool_tesseract()
+    if not langues and pool is not None:
+        # Le moteur chargé sert ensuite à l'OCR : aucun modèle inutile n'est gardé en mémoire
+        langue = next((lang for lang in LANGUES_OCR if pool.charger(lang)), None)
+        langues = frozenset([langue]) if langue else frozenset()
+    # Tesseract absent ou inutilisable : ensemble vide, l'erreur remontera lors de l'OCR
+    return langues
+
+def langue_ocr() -> str:
+    """
+    Langue passée à Tesseract : la première de LANGUES_OCR installée. Choisie une fois pour
+    toutes, au lieu de retenter l'anglais après un échec du français à chaque page.
+    """
+    installees = langues_installees()
+    return next((lang for lang in LANGUES_OCR if lang in installees), LANGUES_OCR[0])
+
+def diagnostic_ocr() -> dict:
+    """État du moteur OCR : moteur utilisé, version, langues installées et langue retenue."""
+    pool = pool_tesseract()
+    return {
+        "moteur": "libtesseract" if pool is not None else pytesseract.pytesseract.tesseract_cmd,
+        "version": version_tesseract(),
+        "langues": sorted(langues_installees()),
+        "langue": langue_ocr(),
+    }
+
+def ocr_image(img, dpi: int = DPI_OCR, sortie: str = "txt") -> str:
+    """Exécute Tesseract sur une image, dans la langue retenue par `langue_ocr`."""
+    return tesseract(img, langue_ocr(), dpi, sortie)
+
+def ocr_mots(img, dpi: int = DPI_OCR, zone=None) -> tuple:
+    """
+    Exécute Tesseract sur une image en gardant la position des mots : renvoie (texte, mots).
+    Le texte est reconstitué ligne par ligne à partir de la sortie TSV ; les boîtes des mots
+    (`Mot`) sont converties en points de la page, `zone` étant la partie de la page rendue
+    dans l'image (voir `rendre_page`).
+    """
+    echelle = 72 / dpi
+    gauche0, haut0 = zone[:2] if zone is not None else (0, 0)
+    lignes, mots = {}, []
+    for texte, gauche, haut, droite, bas, ligne, confiance in mots_tesseract(ocr_image(img, dpi, sortie="tsv")):
+        lignes.setdefault(ligne, []).append(texte)
+        mots.append(Mot(texte, gauche0 + gauche * echelle, haut0 + haut * echelle,
+                        gauche0 + droite * echelle, haut0 + bas * echelle, confiance))
+    return "\n".join(" ".join(ligne) for ligne in lignes.values()), mots
+
+def rendre_page(doc, num: int, dpi: int = DPI_OCR, zone=None):
+    """
+    Rastérise une page d'un document pypdfium2 en image PIL (niveaux de gris), en mémoire.
+    `zone` = (gauche, haut, droite, bas), en points depuis le coin haut gauche de la page
+    affichée, limite le rendu à cette partie de la page. La page est fermée sous le verrou
+    (sinon le ramasse-miettes la fermerait plus tard, depuis n'importe quel thread).
+    """
+    with VERROU_RENDU:
+        page = doc[num - 1]
+        try:
+            crop = (0, 0, 0, 0)
+            if zone is not None:
+                largeur, hauteur = page.get_size()
+                if page.get_rotation() in (90, 270):
+                    largeur, hauteur = hauteur, largeur
+                gauche, haut, droite, bas = zone
+                # pdfium attend les marges à retirer de chaque bord : (gauche, bas, droite, haut)
+                crop = (max(gauche, 0), max(hauteur - bas, 0), max(largeur - droite, 0), max(haut, 0))
+            return page.render(scale=dpi / 72, crop=crop, grayscale=True).to_pil()
+        finally:
+            page.close()
+
+
+def ocr_page(doc, num: int, zone_rib: bool = False, echelle_dpi: tuple = ECHELLE_DPI,
+             mise_en_page: bool = False) -> tuple:
+    """
+    Rastérise une seule page du PDF puis la passe à Tesseract. Renvoie (texte, dpi retenu, mots) :
+    avec `mise_en_page`, `mots` est la liste des mots positionnés de la page (voir `ocr_mots`),
+    sinon None.
+
+    Les résolutions de `echelle_dpi` sont essayées dans l'ordre : on s'arrête au premier
+    cran dont le texte est validé (`page_validee`), ou qui ne contient aucun indice de RIB
+    (une page de conditions générales ne gagne rien à être relue plus finement).
+    Le dernier cran est retenu dans tous les cas. Avec `mise_en_page`, la confiance des mots
+    est connue : une page sans indice de RIB mais mal lue (confiance moyenne sous
+    SEUIL_RELECTURE) est tout de même relue au cran suivant, l'indice pouvant être illisible.
+
+    Avec `zone_rib`, une première passe à DPI_REPERAGE localise le bloc RIB et seule cette
+    zone est rendue puis OCRisée. Sans bloc repérable, la page entière est traitée.
+    """
+    zone = None
+    if zone_rib:
+        img = rendre_page(doc, num, DPI_REPERAGE)
+        mots = mots_tesseract(ocr_image(img, DPI_REPERAGE, sortie="tsv"))
+        zone = localiser_zone_rib(mots, DPI_REPERAGE, img.size)
+
+    for dpi in echelle_dpi:
+        img = rendre_page(doc, num, dpi, zone)
+        texte, mots = ocr_mots(img, dpi, zone) if mise_en_page else (ocr_image(img, dpi), None)
+        lisible = mots is None or confiance_moyenne(mots) >= SEUIL_RELECTURE
+        if dpi == echelle_dpi[-1] or (not PAT_INDICE_RIB.search(texte) and lisible) or page_validee(texte):
+            return texte, dpi, mots
+
+def resumer_dpi(dpis: list) -> str:
+    """Résume les crans de résolution retenus pour les pages OCR d'un fichier (ex. '150 dpi ×2, 300 dpi ×1')."""
+    comptes = {}
+    for dpi in dpis:
+        if dpi:
+            comptes[dpi] = comptes.get(dpi, 0) + 1
+    return ", ".join(f"{dpi} dpi ×{n}" for dpi, n in sorted(comptes.items()))
+
+def resumer_sources(sources: list, nb_pages: int | None = None) -> str:
+    """
+    Résume la source du texte d'un fichier ('texte natif', 'OCR' ou 'mixte').
+    Si `nb_pages` est fourni et que la lecture s'est arrêtée avant la fin, le précise.
+    """
+    if not sources:
+        return "aucune"
+    nb_ocr = sources.count("ocr")
+    if nb_ocr == 0:
+        resume = "texte natif"
+    elif nb_ocr == len(sources):
+        resume = "OCR"
+    else:
+        resume = f"mixte ({nb_ocr}/{len(sources)} pages OCR)"
+    if nb_pages and len(sources) < nb_pages:
+        resume += f", arrêt après {len(sources)}/{nb_pages} pages"
+    return resume
+
+def extraire_texte_pdf(donnees: bytes, infos: dict | None = None, nb_threads: int | None = None,
+                       arret=None, cache=None, nom: str = "", zone_rib: bool = False,
+                       echelle_dpi: tuple = ECHELLE_DPI, mise_en_page: bool = False) -> str:
+    """
+    Extrait le texte d'un PDF fourni en mémoire (octets), page par page.
+
+    La couche texte native (pdfplumber) est utilisée en priorité : les RIB générés par
+    les banques en ont une parfaite et l'OCR est alors inutile. Seules les pages sans
+    couche texte exploitable sont rastérisées en mémoire et passées à Tesseract, sans
+    aucun fichier intermédiaire sur disque, à la résolution la plus basse de `echelle_dpi`
+    qui donne un RIB valide (voir `ocr_page` ; `echelle_dpi=(300,)` pour une résolution
+    fixe), jusqu'à `nb_threads` pages en parallèle (défaut : NB_THREADS_OCR). Le texte est
+    réassemblé dans l'ordre des pages.
+
+    Mode incrémental : si `arret` est fourni (fonction texte -> bool, par exemple
+    `champs_resolus`), il est évalué sur le texte cumulé après chaque page, dans l'ordre,
+    et la lecture s'arrête dès qu'il renvoie True. Les pages OCR sont alors traitées par
+    vagues de `nb_threads` pages, les suivantes ne sont jamais rastérisées.
+
+    Si `cache` (un `CacheOCR`) est fourni, le texte des pages déjà lues d'un document
+    identique (même contenu, mêmes paramètres) est repris du cache au lieu d'être
+    recalculé, et les pages nouvellement lues y sont enregistrées.
+
+    Avec `zone_rib`, chaque page OCR est d'abord lue à basse résolution pour localiser
+    le bloc RIB, puis seule cette zone est rendue et OCRisée (voir `ocr_page`).
+
+    Avec `mise_en_page`, la position des mots de chaque page est aussi conservée : mots
+    de pdfplumber pour le texte natif, sortie TSV de Tesseract pour l'OCR (le texte des
+    pages OCR est alors reconstitué à partir du TSV). Voir `extraire_mise_en_page`.
+
+    Si `infos` est fourni, il est complété avec infos["sources"] (la source de chaque
+    page lue : 'texte' ou 'ocr'), infos["dpi"] (résolution retenue pour chaque page lue,
+    None pour le texte natif), infos["nb_pages"] (nombre de pages du document),
+    infos["tableaux"] (grilles RIB lues comme des tableaux sur chaque page native, voir
+    `tableaux_rib` ; None pour une page OCR) et, avec un cache, infos["cache"] ('succes'
+    ou 'echec'). Avec `mise_en_page`, infos["mots"]
+    donne les mots positionnés de chaque page lue, avec leur confiance (`MotsOCR`).
+
+    `nom` (nom du fichier) ne sert qu'aux messages d'erreur.
+    """
+    nb_threads = nb_threads or NB_THREADS_OCR
 
-    # Crée un répertoire temporaire pour stocker les images extraites du PDF.
-    # Ce dossier est automatiquement supprimé en sortie du bloc 'with'.
-    with tempfile.TemporaryDirectory() as tmp:
+    cle = entree = None
+    if cache is not None:
+        echelle = "-".join(map(str, echelle_dpi))
+        mode = ("zone" if zone_rib else "page") + ("-mots" if mise_en_page else "")
+        cle = cache.cle(donnees, echelle, langue_ocr(), mode)
+        entree = cache.lire(cle)
+
+    if entree is not None:
+        # Document déjà vu : seules les pages jamais lues (None) restent à traiter
+        pages, sources, dpis = list(entree["pages"]), list(entree["sources"]), list(entree["dpi"])
+        mots_pages = [[Mot(*mot) for mot in mots] if mots is not None else None
+                      for mots in entree.get("mots", [None] * len(pages))]
+        tableaux = list(entree["tableaux"])
+    else:
+        # Texte natif de chaque page (None si la page doit passer par l'OCR), et grilles RIB
+        # lues comme des tableaux sur les pages natives
+        pages, mots_pages, tableaux = [], [], []
         try:
-            # Convertit chaque page du PDF en image haute résolution (300 dpi).
-            # Les images sont sauvegardées dans le dossier temporaire.
-            images = convert_from_path(path, dpi=300, output_folder=tmp)
+            with pdfplumber.open(io.BytesIO(donnees)) as pdf:
+                for page in pdf.pages:
+                    t = page.extract_text() or ""
+                    exploitable = texte_natif_exploitable(t)
+                    pages.append(t if exploitable else None)
+                    tableaux.append(tableaux_rib(page, t) if exploitable else None)
+                    mots_pages.append([Mot(m["text"], m["x0"], m["top"], m["x1"], m["bottom"])
+                                       for m in page.extract_words()] if exploitable and mise_en_page else None)
+        except Exception:
+            # PDF illisible par pdfplumber : pdfium ou poppler tenteront leur chance
+            pages, mots_pages, tableaux = [], [], []
+        sources = ["texte" if t is not None else "ocr" for t in pages]
+        dpis = [None] * len(pages)
+
+    a_ocr = [num for num, t in enumerate(pages, start=1) if t is None]
+    lues = 0        # Nombre de pages de tête disponibles et déjà soumises au critère d'arrêt
+    arrete = False
+
+    def avancer() -> bool:
+        """Soumet au critère d'arrêt chaque nouvelle page de tête disponible."""
+        nonlocal lues
+        while lues < len(pages) and pages[lues] is not None:
+            lues += 1
+            if arret("\n".join(t for t in pages[:lues] if t)):
+                return True
+        return False
+
+    doc = None
+    try:
+        if a_ocr or not pages:
+            try:
+                with VERROU_RENDU:
+                    doc = pdfium.PdfDocument(donnees)
+                    nb_pages_doc = len(doc)
+            except pdfium.PdfiumError:
+                doc = None
+
+        if doc is not None:
+            if not pages:
+                # Couche texte illisible mais document lisible par pdfium : tout passe par l'OCR
+                pages = [None] * nb_pages_doc
+                sources = ["ocr"] * nb_pages_doc
+                dpis = [None] * nb_pages_doc
+                mots_pages = [None] * nb_pages_doc
+                tableaux = [None] * nb_pages_doc
+                a_ocr = list(range(1, nb_pages_doc + 1))
+            # On ne rastérise que les pages dont la couche texte est absente ou inexploitable.
+            ocr = partial(ocr_page, doc, zone_rib=zone_rib, echelle_dpi=echelle_dpi, mise_en_page=mise_en_page)
+        elif a_ocr or not pages:
+            # PDF illisible par pdfium : conversion complète par poppler (réparti sur plusieurs
+            # threads). Sans output_folder, pdftoppm renvoie les images sur sa sortie standard :
+            # seul le PDF lui-même transite par un fichier temporaire, dans ce cas de secours.
+            images = convert_from_bytes(donnees, dpi=DPI_OCR, thread_count=nb_threads)
+            if not pages:
+                pages = [None] * len(images)
+                sources = ["ocr"] * len(images)
+                dpis = [None] * len(images)
+                mots_pages = [None] * len(images)
+                tableaux = [None] * len(images)
+                a_ocr = list(range(1, len(images) + 1))
+            def ocr(num):
+                img = images[num - 1]
+                texte, mots = ocr_mots(img, DPI_OCR) if mise_en_page else (ocr_image(img), None)
+                return texte, DPI_OCR, mots
+
+        arrete = arret is not None and avancer()
+        if a_ocr and not arrete:
+            # Chaque page est rendue puis reconnue dans son propre thread ; map() conserve l'ordre.
+            taille_vague = nb_threads if arret is not None else len(a_ocr)
+            with ThreadPoolExecutor(max_workers=min(nb_threads, len(a_ocr))) as pool:
+                for debut in range(0, len(a_ocr), taille_vague):
+                    vague = a_ocr[debut:debut + taille_vague]
+                    for num, (t, dpi, mots) in zip(vague, pool.map(ocr, vague)):
+                        pages[num - 1] = t
+                        dpis[num - 1] = dpi
+                        mots_pages[num - 1] = mots
+                    if arret is not None and avancer():
+                        arrete = True
+                        break
+
+    except Exception as e:
+        # Capture toute erreur provenant de la conversion PDF → image ou autre.
+        # Affiche un message d'erreur dans la console 
+        print(f"Erreur OCR sur {nom or 'le PDF'}: {e}")
+    finally:
+        if doc is not None:
+            with VERROU_RENDU:
+                doc.close()
 
-            # Parcourt chaque image extraite du PDF.
-            for img in images:
-                try:
-                    # Exécute l’OCR sur l’image en utilisant le modèle Tesseract français ('fra').
-                    # Le texte reconnu est ajouté à la variable 'texte'.
-                    texte += pytesseract.image_to_string(img, lang="fra") + "\n"
+    if cache is not None and pages and (entree is None or pages != entree["pages"]):
+        entree_cache = {"pages": pages, "sources": sources, "dpi": dpis, "tableaux": tableaux}
+        if mise_en_page:
+            entree_cache["mots"] = mots_pages
+        cache.ecrire(cle, entree_cache)
 
-                except pytesseract.TesseractError:
-                    # Si le modèle français échoue (cas rare), on tente un fallback avec l’OCR anglais.
-                    texte += pytesseract.image_to_string(img, lang="eng") + "\n"
+    nb_pages = len(pages)
+    if arrete:
+        # On ne conserve que les pages lues avant l'arrêt
+        pages, sources, dpis, mots_pages, tableaux = pages[:lues], sources[:lues], dpis[:lues], mots_pages[:lues], tableaux[:lues]
+
+    if infos is not None:
+        infos["sources"] = sources
+        infos["dpi"] = dpis
+        infos["nb_pages"] = nb_pages
+        infos["tableaux"] = tableaux
+        if mise_en_page:
+            infos["mots"] = MotsOCR(mots_pages)
+        if cache is not None:
+            infos["cache"] = "succes" if entree is not None else "echec"
+
+    # Retourne le texte en supprimant les espaces vides en début/fin.
+    return "\n".join(t for t in pages if t).strip()
+
+
+def extraire_texte_ocr(path: str, infos: dict | None = None, nb_threads: int | None = None,
+                       arret=None, cache=None, zone_rib: bool = False,
+                       echelle_dpi: tuple = ECHELLE_DPI, mise_en_page: bool = False) -> str:
+    """Extrait le texte d'un fichier PDF (voir `extraire_texte_pdf`)."""
+    with open(path, "rb") as f:
+        donnees = f.read()
+    return extraire_texte_pdf(donnees, infos, nb_threads, arret, cache, nom=path, zone_rib=zone_rib,
+                              echelle_dpi=echelle_dpi, mise_en_page=mise_en_page)
+
+
+# Signatures des formats d'image acceptés (photos et scans de RIB) : PNG, JPEG, TIFF
+SIGNATURES_IMAGE = (b"\x89PNG\r\n\x1a\n", b"\xff\xd8\xff", b"II*\x00", b"MM\x00*")
+
+# En dessous de cette résolution déclarée (souvent 72 dpi par défaut sur les photos), elle est ignorée
+DPI_IMAGE_MIN = 100
+
+def est_image(donnees: bytes) -> bool:
+    """Vrai si les octets sont une image PNG, JPEG ou TIFF (d'après leur signature)."""
+    return donnees.startswith(SIGNATURES_IMAGE)
+
+def extraire_texte_image(donnees: bytes, infos: dict | None = None, cache=None, nom: str = "",
+                         mise_en_page: bool = False) -> str:
+    """
+    Extrait par OCR le texte d'une image fournie en mémoire (photo ou scan de RIB en PNG,
+    JPEG ou TIFF ; une page par image d'un TIFF multipage).
 
+    Même contrat que `extraire_texte_pdf` pour `cache`, `mise_en_page` et `infos`, mais
+    l'image a déjà sa résolution : chaque page est OCRisée une seule fois, à la résolution
+    déclarée par le fichier (DPI_OCR si elle est absente ou invraisemblable), sans échelle
+    de résolutions ni zone RIB. Toutes les pages sont lues (pas d'arrêt anticipé).
+    """
+    cle = entree = None
+    if cache is not None:
+        cle = cache.cle(donnees, "image", langue_ocr(), "image" + ("-mots" if mise_en_page else ""))
+        entree = cache.lire(cle)
+
+    if entree is not None:
+        pages, dpis = list(entree["pages"]), list(entree["dpi"])
+        mots_pages = [[Mot(*mot) for mot in mots] if mots is not None else None
+                      for mots in entree.get("mots", [None] * len(pages))]
+    else:
+        pages, dpis, mots_pages = [], [], []
+        try:
+            with Image.open(io.BytesIO(donnees)) as image:
+                for trame in ImageSequence.Iterator(image):
+                    dpi = round(trame.info.get("dpi", (0,))[0])
+                    dpi = dpi if dpi >= DPI_IMAGE_MIN else DPI_OCR
+                    img = trame.convert("L")
+                    texte, mots = ocr_mots(img, dpi) if mise_en_page else (ocr_image(img, dpi), None)
+                    pages.append(texte)
+                    dpis.append(dpi)
+                    mots_pages.append(mots)
         except Exception as e:
-            # Capture toute erreur provenant de la conversion PDF → image ou autre.
-            # Affiche un message d'erreur dans la console 
-            print(f"Erreur OCR sur {path}: {e}")
+            print(f"Erreur OCR sur {nom or 'l’image'}: {e}")
+            pages, dpis, mots_pages = [], [], []
+
+    sources, tableaux = ["ocr"] * len(pages), [None] * len(pages)
+    if cache is not None and pages and entree is None:
+        entree_cache = {"pages": pages, "sources": sources, "dpi": dpis, "tableaux": tableaux}
+        if mise_en_page:
+            entree_cache["mots"] = mots_pages
+        cache.ecrire(cle, entree_cache)
+
+    if infos is not None:
+        infos["sources"] = sources
+        infos["dpi"] = dpis
+        infos["nb_pages"] = len(pages)
+        infos["tableaux"] = tableaux
+        if mise_en_page:
+            infos["mots"] = MotsOCR(mots_pages)
+        if cache is not None:
+            infos["cache"] = "succes" if entree is not None else "echec"
+
+    return "\n".join(t for t in pages if t).strip()
+
+
+#region Zone RIB
+# ---------------------------------------------------------------------------
+# OCR ciblé : repérage de la zone RIB à basse résolution
+# ---------------------------------------------------------------------------
+
+# Passe de repérage : 100 dpi, soit 9 fois moins de pixels qu'à 300 dpi
+DPI_REPERAGE = 100
 
-    # Retourne le texte OCR en supprimant les espaces vides en début/fin.
-    return texte.strip()
+# Marges ajoutées autour de la zone repérée, en points (72 points = 1 pouce).
+# La marge verticale couvre les valeurs écrites sous leur libellé (grille Banque / Guichet / Compte / Clé).
+MARGE_ZONE_X = 36
+MARGE_ZONE_Y = 54
+
+# Distance verticale maximale (points) entre un libellé secondaire et les ancres pour l'inclure dans la zone
+DISTANCE_LIBELLES = 144
+
+# Au-delà de cette fraction de la page, on OCRise la page entière (rien à gagner à découper)
+FRACTION_ZONE_MAX = 0.6
+
+# Mots qui signalent à eux seuls un bloc RIB, puis libellés rattachés au bloc s'ils sont proches
+ANCRES_RIB = {"IBAN", "BIC", "SWIFT", "RIB"}
+LIBELLES_RIB = {"BANQUE", "GUICHET", "COMPTE", "CLE", "TITULAIRE", "DOMICILIATION", "IDENTITE", "BANCAIRE"}
+
+def mots_tesseract(tsv: str) -> list:
+    """
+    Convertit la sortie TSV de Tesseract en liste de mots :
+    (texte, gauche, haut, droite, bas, ligne, confiance), boîte en pixels, `ligne` identifiant
+    la ligne du mot et `confiance` la confiance de sa reconnaissance (0-100).
+    """
+    mots = []
+    for ligne in tsv.splitlines()[1:]:
+        champs = ligne.split("\t")
+        if len(champs) < 12 or not champs[11].strip():
+            continue
+        gauche, haut, largeur, hauteur = (int(v) for v in champs[6:10])
+        mots.append((champs[11], gauche, haut, gauche + largeur, haut + hauteur, tuple(champs[1:5]),
+                     max(float(champs[10]), 0)))
+    return mots
+
+def normaliser_mot(mot: str) -> str:
+    """Met un mot en majuscules sans accents ni ponctuation (comparaison avec les libellés)."""
+    mot = unicodedata.normalize("NFKD", mot.upper())
+    return "".join(ch for ch in mot if ch.isalnum() and ch.isascii())
+
+def localiser_zone_rib(mots: list, dpi: int, taille_image: tuple):
+    """
+    Repère la zone d'une page qui contient le bloc RIB à partir des mots d'une passe OCR
+    basse résolution. Renvoie (gauche, haut, droite, bas) en points, ou None si aucune
+    ancre (IBAN, BIC, RIB, 'FRxx…') n'est trouvée ou si la zone couvre presque toute la page.
+    """
+    lignes_ancres, lignes_libelles = set(), set()
+    for mot in mots:
+        texte, ligne = mot[0], mot[5]
+        mot = normaliser_mot(texte)
+        if mot in ANCRES_RIB or PAT_DEBUT_IBAN_FR.match(mot):
+            lignes_ancres.add(ligne)
+        elif mot in LIBELLES_RIB:
+            lignes_libelles.add(ligne)
+    if not lignes_ancres:
+        return None
+
+    echelle = 72 / dpi
+    boites = [m[1:5] for m in mots if m[5] in lignes_ancres]
+    haut = min(b[1] for b in boites) * echelle
+    bas = max(b[3] for b in boites) * echelle
+
+    # Libellés secondaires (titulaire, domiciliation, grille des codes) proches des ancres
+    for m in mots:
+        if m[5] in lignes_libelles:
+            milieu = (m[2] + m[4]) / 2 * echelle
+            if haut - DISTANCE_LIBELLES <= milieu <= bas + DISTANCE_LIBELLES:
+                boites.append(m[1:5])
+
+    largeur_page, hauteur_page = taille_image[0] * echelle, taille_image[1] * echelle
+    gauche = max(min(b[0] for b in boites) * echelle - MARGE_ZONE_X, 0)
+    haut = max(min(b[1] for b in boites) * echelle - MARGE_ZONE_Y, 0)
+    droite = min(max(b[2] for b in boites) * echelle + MARGE_ZONE_X, largeur_page)
+    bas = min(max(b[3] for b in boites) * echelle + MARGE_ZONE_Y, hauteur_page)
+
+    if (droite - gauche) * (bas - haut) > FRACTION_ZONE_MAX * largeur_page * hauteur_page:
+        return None
+    return (gauche, haut, droite, bas)
 
 
 #region Traitement
@@ -138,114 +710,480 @@ def nettoyer(texte: str) -> str:
     texte = texte.replace('\r', '')
     # Remplace les séquences d'espaces ou tabulations multiples par un espace unique
     # Cela améliore la lisibilité et facilite les futures correspondances avec les regex
-    texte = re.sub(r'[ \t]+', ' ', texte)
+    texte = PAT_BLANCS.sub(' ', texte)
     return texte
 
 def compacter(texte: str) -> str:
     """Compacte un texte en supprimant tout caractère non alphanumérique."""
-    # Retire tout ce qui n'est pas une lettre majuscule/minuscule ou un chiffre
+    # Retire tout ce qui n'est pas une lettre majuscule/minuscule ou un chiffre ASCII
     # Exemple : "FR76 3000 6000-0112" -> "FR76300060000112"
-    return re.sub(r'[^A-Za-z0-9]', '', texte)
+    return texte.encode("ascii", "ignore").translate(None, NON_ALPHANUMERIQUES).decode("ascii")
+
+def compacter_majuscules(texte: str) -> str:
+    """Compacte un texte (voir `compacter`) et le met en majuscules, en une seule passe."""
+    # Exemple : "bous frpp-xxx" -> "BOUSFRPPXXX"
+    return texte.encode("ascii", "ignore").translate(MAJUSCULES_ASCII, NON_ALPHANUMERIQUES).decode("ascii")
+
+#region Balayage
+# ---------------------------------------------------------------------------
+# Balayage unique du texte : repérage de tous les candidats des champs RIB
+# ---------------------------------------------------------------------------
+
+# Types de libellés reconnus par le balayage. À une même position, l'ordre décide :
+# 'titulaire du compte' est un libellé de titulaire (et non un 'compte'), 'adresse swift'
+# un libellé de BIC (et non une domiciliation).
+TYPES_LIBELLES = (
+    ("titulaire", LIB_TITULAIRE),
+    ("compte", LIB_NUM_COMPTE),
+    ("banque", LIB_CODE_BANQUE),
+    ("guichet", LIB_CODE_GUICHET),
+    ("cle", LIB_CLE_RIB),
+    ("iban", r'IBAN'),
+    ("bic", f'(?x:{LIB_BIC})'),
+    ("domiciliation", LIB_DOMICILIATION),
+    ("civilite", LIB_CIVILITE),
+    ("rib", r'RIB'),
+)
+
+# Tous les libellés en une seule expression, un groupe nommé par type. Elle est appliquée au
+# texte en minuscules (motifs mis en minuscules : ils n'utilisent aucune classe \S, \D, \W, \B),
+# ce qui est deux fois plus rapide qu'une recherche insensible à la casse. Le caractère non
+# alphanumérique qui précède le libellé (équivalent de \b) permet au moteur de sauter
+# directement d'un séparateur à l'autre au lieu d'essayer chaque position.
+PAT_BALAYAGE = re.compile(
+    r'\W(?:' + "|".join(f"(?P<{nom}>{motif.lower()})" for nom, motif in TYPES_LIBELLES) + r')\b'
+)
+# Même expression, insensible à la casse, pour les rares textes dont la mise en minuscules change la longueur
+PAT_BALAYAGE_CASSE = re.compile(
+    r'(?i)\W(?:' + "|".join(f"(?P<{nom}>{motif})" for nom, motif in TYPES_LIBELLES) + r')\b'
+)
+
+# Libellé repéré : type, position (début, fin) dans le texte et numéro de ligne
+Candidat = namedtuple("Candidat", "type debut fin ligne")
+
+class TexteIndexe:
+    """
+    Index d'un texte construit une fois par document (voir `balayer`) et partagé par tous les extracteurs :
+    - lignes / debuts : lignes du texte et position de début de chacune
+    - libelles : type -> libellés de ce type (Candidat), dans l'ordre du texte ;
+      index_lignes : type -> numéros des lignes qui contiennent un libellé de ce type
+    - compact : texte sans séparateurs, en majuscules, et debuts_compacts : position dans `compact`
+      du début de chaque ligne ; ibans : IBAN FR candidats qui s'y trouvent, et positions_ibans :
+      IBAN -> Candidat situant sa première occurrence dans le texte
+    - majuscules et segments (calculés au premier usage) : texte en majuscules, et correspondance
+      des positions de `compact` vers celles du texte (`position_originale`)
+
+    Les fenêtres de lignes (`fenetre_majuscules`, `fenetre_compacte`) sont des tranches de ces
+    vues : aucune ligne n'est recopiée, jointe ni remise en majuscules.
+    """
+
+    def __init__(self, texte: str):
+        self.texte = texte
+        self.lignes = texte.split("\n")
+        self.debuts = list(accumulate((len(ligne) + 1 for ligne in self.lignes[:-1]), initial=0))
+
+        # Un séparateur est ajouté en tête pour que le premier mot puisse être un libellé :
+        # un libellé trouvé en [debut + 1, fin) dans le texte préfixé est en [debut, fin - 1) dans le texte.
+        minuscules = texte.lower()
+        if len(minuscules) == len(texte):
+            correspondances = PAT_BALAYAGE.finditer("\n" + minuscules)
+        else:
+            correspondances = PAT_BALAYAGE_CASSE.finditer("\n" + texte)
+        self.libelles = {nom: [] for nom, _ in TYPES_LIBELLES}
+        for m in correspondances:
+            debut, fin = m.start(), m.end() - 1
+            ligne = self.ligne_de(debut)
+            self.libelles[m.lastgroup].append(Candidat(m.lastgroup, debut, fin, ligne))
+        # Les candidats sont dans l'ordre du texte : leurs lignes aussi
+        self.index_lignes = {nom: list(dict.fromkeys(c.ligne for c in candidats))
+                             for nom, candidats in self.libelles.items()}
+
+        # Texte compacté ligne par ligne (une seule passe de `translate` qui garde les sauts de ligne) :
+        # donne à la fois `compact` et la position dans `compact` du début de chaque ligne.
+        lignes_compactes = (texte.encode("ascii", "ignore")
+                            .translate(MAJUSCULES_ASCII, NON_ALPHANUMERIQUES_SAUF_LIGNES)
+                            .decode("ascii").split("\n"))
+        self.compact = "".join(lignes_compactes)
+        self.debuts_compacts = list(accumulate(map(len, lignes_compactes[:-1]), initial=0))
+        # Ordre du texte, sans doublons ; chaque IBAN est situé dans le texte par sa première occurrence
+        self.positions_ibans = {}
+        for m in PAT_IBAN_FR_COMPACT.finditer(self.compact):
+            if m.group() not in self.positions_ibans:
+                debut, fin = self.position_originale(m.start()), self.position_originale(m.end() - 1) + 1
+                self.positions_ibans[m.group()] = Candidat("iban", debut, fin, self.ligne_de(debut))
+        self.ibans = list(self.positions_ibans)
+
+    @cached_property
+    def majuscules(self) -> str:
+        """Texte en majuscules, aligné caractère par caractère sur le texte (None si la mise en majuscules change la longueur)."""
+        majuscules = self.texte.upper()
+        return majuscules if len(majuscules) == len(self.texte) else None
+
+    @cached_property
+    def segments(self) -> tuple:
+        """
+        Suites de lettres et chiffres ASCII du texte, seuls caractères gardés par `compact` (les
+        caractères non ASCII, séparateurs et sauts de ligne en sont retirés) : (positions de début
+        dans le texte, positions de début dans `compact`).
+        """
+        origines, positions, k = [], [], 0
+        for m in PAT_ALPHANUMERIQUES.finditer(self.texte):
+            origines.append(m.start())
+            positions.append(k)
+            k += m.end() - m.start()
+        return origines, positions
+
+    def position_originale(self, k: int) -> int:
+        """Position dans le texte du caractère `k` de `compact`."""
+        origines, positions = self.segments
+        s = bisect_right(positions, k) - 1
+        return origines[s] + k - positions[s]
+
+    def lignes_avec(self, *types) -> list:
+        """Numéros des lignes qui contiennent un libellé de l'un des `types`, dans l'ordre."""
+        if len(types) == 1:
+            return self.index_lignes[types[0]]
+        return sorted({i for nom in types for i in self.index_lignes[nom]})
+
+    def ligne_de(self, position: int) -> int:
+        """Numéro de la ligne qui contient une position du texte."""
+        return bisect_right(self.debuts, position) - 1
+
+    def fin_ligne(self, ligne: int) -> int:
+        """Position de la fin d'une ligne (avant le saut de ligne)."""
+        return self.debuts[ligne] + len(self.lignes[ligne])
+
+    def fenetre(self, ligne: int, nb_lignes: int) -> tuple:
+        """Positions (début, fin) dans le texte des `nb_lignes` lignes qui commencent à `ligne`."""
+        derniere = min(ligne + nb_lignes, len(self.lignes)) - 1
+        return self.debuts[ligne], self.fin_ligne(derniere)
+
+    def fenetre_majuscules(self, ligne: int, nb_lignes: int) -> str:
+        """Lignes [ligne, ligne + nb_lignes) en majuscules, telles que jointes par des sauts de ligne."""
+        debut, fin = self.fenetre(ligne, nb_lignes)
+        if self.majuscules is None:
+            return self.texte[debut:fin].upper()
+        return self.majuscules[debut:fin]
+
+    def fenetre_compacte(self, ligne: int, nb_lignes: int) -> str:
+        """Lignes [ligne, ligne + nb_lignes) compactées en majuscules (tranche de `compact`)."""
+        fin = ligne + nb_lignes
+        return self.compact[self.debuts_compacts[ligne]:self.debuts_compacts[fin] if fin < len(self.lignes) else None]
+
+    def valeurs_apres(self, type_libelle: str, motif) -> list:
+        """Valeurs lues après chacun des libellés de `type_libelle` (voir `valeur_apres`), sans doublons."""
+        valeurs = (motif.match(self.texte, lib.fin) for lib in self.libelles[type_libelle])
+        return list(dict.fromkeys(m.group(1) for m in valeurs if m))
+
+    def valeur_apres(self, type_libelle: str, motif) -> str:
+        """
+        Valeur d'un champ : premier groupe de `motif` (VAL_*) lu juste après un libellé de
+        `type_libelle`, pour le premier libellé où le motif correspond.
+        """
+        for lib in self.libelles[type_libelle]:
+            m = motif.match(self.texte, lib.fin)
+            if m:
+                return m.group(1)
+        return ""
+
+@lru_cache(maxsize=16)
+def balayer(texte: str) -> TexteIndexe:
+    """
+    Balaye et indexe un texte une seule fois. Le résultat est mémorisé : les extracteurs appelés
+    successivement sur le même texte (IBAN, BIC, libellés…) partagent le même index.
+    """
+    return TexteIndexe(texte)
 
 #region Extraction
 # ---------------------------------------------------------------------------
 # Fonctions d'extraction des informations bancaires
 # ---------------------------------------------------------------------------
 
-def extraire_iban_valide(t: str) -> str:
-    """Recherche un IBAN français valide dans le texte."""
-    # On compacte le texte (suppression des espaces/bruits) et on met en majuscules
-    compact = compacter(t).upper()
-    # Recherche directe d'un IBAN FR "compact" (sans espaces) via regex
-    for cand in set(PAT_IBAN_FR_COMPACT.findall(compact)):
-        try:
-            # Validation officielle via python-stdnum
-            if iban_lib.is_valid(cand):
-                return iban_lib.format(cand) # Retourne la version formatée (avec espaces)
-        except Exception:
-            pass
+# --- Calcul mod 97 (ISO 7064) : clé d'IBAN et clé RIB ---
+# Le calcul lit les caractères un à un, chacun converti en nombre. Une table de transitions
+# donne, pour un reste `r` et un caractère `c`, le reste obtenu en lisant `c` après `r` :
+# on évite ainsi de construire la chaîne de chiffres puis un grand entier.
+
+def transitions_mod97(valeurs: dict) -> tuple:
+    """Table des transitions du calcul mod 97 pour une conversion caractère -> nombre donnée."""
+    return tuple(
+        {c: (r * 10 ** len(str(v)) + v) % 97 for c, v in valeurs.items()}
+        for r in range(97)
+    )
+
+# IBAN : un chiffre vaut lui-même, une lettre deux chiffres (A=10 … Z=35)
+VALEURS_MOD97 = {c: v for v, c in enumerate(string.digits + string.ascii_uppercase)}
+VALEURS_MOD97.update({c.lower(): v for c, v in VALEURS_MOD97.items() if c.isalpha()})
+TRANSITIONS_MOD97 = transitions_mod97(VALEURS_MOD97)
+
+# Clé RIB : une lettre du numéro de compte vaut un seul chiffre (A, J = 1 ; B, K, S = 2 … ; I, R, Z = 9)
+VALEURS_CLE_RIB = {c: int(c) for c in string.digits}
+VALEURS_CLE_RIB.update(zip(string.ascii_uppercase, map(int, "12345678912345678923456789")))
+TRANSITIONS_CLE_RIB = transitions_mod97(VALEURS_CLE_RIB)
+
+# Structure d'un IBAN FR : FR, clé, code banque et guichet (5 chiffres chacun), compte (11 alphanumériques), clé RIB
+PAT_IBAN_FR = re.compile(r'FR[A-Z0-9]{2}[0-9]{10}[A-Z0-9]{11}[0-9]{2}')
+
+def reste_mod97(chaine: str, reste: int = 0, transitions: tuple = TRANSITIONS_MOD97) -> int | None:
+    """
+    Reste modulo 97 du nombre formé par `chaine` (lettres converties), lu à la suite de `reste`.
+    None si la chaîne contient un caractère absent de la table (ni chiffre ni lettre ASCII).
+    """
+    try:
+        for c in chaine:
+            reste = transitions[reste][c]
+    except KeyError:
+        return None
+    return reste
+
+def iban_fr_valide(iban: str) -> bool:
+    """
+    Vérifie un IBAN français compact et en majuscules : structure, puis clé mod 97
+    (BBAN suivi de 'FRxx' : le reste doit valoir 1). Même résultat que python-stdnum.
+    """
+    if len(iban) != 27 or not PAT_IBAN_FR.match(iban):
+        return False
+    return reste_mod97(iban[:4], reste_mod97(iban[4:])) == 1
+
+def rib_valide(bban: str) -> bool:
+    """Vérifie la clé RIB d'un BBAN français (banque, guichet, compte, clé : 23 caractères en majuscules)."""
+    return len(bban) == 23 and reste_mod97(bban, 0, TRANSITIONS_CLE_RIB) == 0
+
+def formater_iban(iban: str) -> str:
+    """Écrit un IBAN compact par groupes de 4 caractères ('FR76 3000 6000 …')."""
+    return " ".join([iban[i:i + 4] for i in range(0, len(iban), 4)])
+
+def candidats_iban(t: str):
+    """
+    Génère les IBAN français valides lus tels quels dans le texte (IBAN compacts), dans l'ordre
+    de préférence. Aucune réparation : un IBAN mal lu n'est réparé qu'en dernier recours, par
+    `reconcilier_rib`.
+    """
+    b = balayer(t)
+    trouves = []
+    # IBAN FR "compacts" (sans espaces ni bruit) repérés par le balayage : d'abord ceux qui sont
+    # sur la ligne d'un libellé 'IBAN' ou sur la suivante (situés dans le texte par `positions_ibans`)
+    lignes_iban = set(b.index_lignes["iban"])
+    def hors_libelle(cand):
+        ligne = b.positions_ibans[cand].ligne
+        return ligne not in lignes_iban and ligne - 1 not in lignes_iban
+    for cand in sorted(b.ibans, key=hors_libelle):
+        if iban_fr_valide(cand):
+            trouves.append(cand)
+            yield cand
 
     # Fallback : recherche d'un IBAN par label
-    for m in re.finditer(r'(?i)\bIBAN\b\s*[:\-]?\s*([A-Z0-9 ]{8,50})', t):
-        extrait = compacter(m.group(1)).upper()
+    for lib in b.libelles["iban"]:
+        m = VAL_IBAN.match(t, lib.fin)
+        if not m:
+            continue
+        extrait = compacter_majuscules(m.group(1))
         # Vérifie que la structure est plausible : FR + longueur minimale correcte
         if extrait.startswith("FR") and len(extrait) >= 27:
             extrait = extrait[:27] # Tronque au format IBAN FR exact
-            try:
-                # Validation officielle via python-stdnum
-                if iban_lib.is_valid(extrait):
-                    return iban_lib.format(extrait)
-            except Exception:
-                continue
-    return ""
+            if extrait not in trouves and iban_fr_valide(extrait):
+                trouves.append(extrait)
+                yield extrait
 
-def decomposer_iban_fr(iban: str):
-    """Décompose un IBAN français en code banque, guichet, compte et clé."""
-    # Si l'IBAN est vide ou invalide, retourne des chaînes vides.
-    if not iban:
-        return ("", "", "", "")
-    try:
-        # Compacte et met en majuscules l'IBAN
-        c = iban_lib.compact(iban).upper()
-        # Vérifie que l'IBAN est bien français et valide
-        if not (c.startswith("FR") and iban_lib.is_valid(c)):
-            return ("", "", "", "")
-        # Extrait le BBAN (Basic Bank Account Number) de l'IBAN
-        bban = c[4:]
-        # Retourne les composantes : code banque, code guichet, numéro de compte, clé RIB
-        return (bban[:5], bban[5:10], bban[10:21], bban[21:23])
-    except Exception:
-        return ("", "", "", "")
+def extraire_iban_valide(t: str) -> str:
+    """
+    Recherche un IBAN français valide tel quel dans le texte (sans réparation) : sert à valider
+    une page, qui ne doit pas l'être sur la foi d'un IBAN corrigé.
+    """
+    iban = next(candidats_iban(t), "")
+    return formater_iban(iban) if iban else "" # Retourne la version formatée (avec espaces)
 
-def lettres_vers_nombres(s: str) -> str:
-    """Convertit les lettres d'un compte en nombres selon la convention RIB."""
-    out = []
-    # Pour chaque caractère dans la chaîne d'entrée
-    for ch in s.upper():
-        # Si le caractère est un chiffre, on l'ajoute tel quel
-        if ch.isdigit():
-            out.append(ch)
-        # Si c'est une lettre, on la convertit en nombre (A=10, B=11, ..., Z=35)
-        elif 'A' <= ch <= 'Z':
-            out.append(str(10 + ord(ch) - ord('A')))
-    return ''.join(out)
+def decomposer_iban_fr(iban: str) -> tuple:
+    """
+    Décompose un IBAN français (compact ou espacé) en code banque, guichet, compte et clé ;
+    chaînes vides si l'IBAN n'est pas un IBAN FR valide.
+    """
+    c = compacter_majuscules(iban)
+    if not iban_fr_valide(c):
+        return ("", "", "", "")
+    # BBAN (Basic Bank Account Number) : tout ce qui suit 'FRxx'
+    bban = c[4:]
+    return (bban[:5], bban[5:10], bban[10:21], bban[21:23])
 
 def calculer_cle_rib(cb: str, cg: str, nc: str) -> str:
     """Calcule la clé RIB à partir des composantes."""
     # Si l'une des composantes est manquante, retourne une chaîne vide.
     if not (cb and cg and nc):
         return ""
-    # Construit la base numérique pour le calcul de la clé RIB
-    base = f"{cb}{cg}{lettres_vers_nombres(nc)}"
-    if not base.isdigit():
-        return ""
-    try:
-        # Calcule la clé RIB selon la formule officielle
-        cle = 97 - (int(base) % 97)
-        return f"{cle:02d}"
-    except Exception:
+    # Codes banque et guichet numériques ; les lettres du compte sont converties (voir VALEURS_CLE_RIB)
+    base = f"{cb}{cg}"
+    if not (base.isascii() and base.isdigit()):
         return ""
+    reste = reste_mod97(compacter_majuscules(nc), reste_mod97(base), TRANSITIONS_CLE_RIB)
+    # Calcule la clé RIB selon la formule officielle : 97 - (banque guichet compte 00) mod 97
+    return f"{97 - reste * 100 % 97:02d}"
 
 def construire_iban_fr(cb: str, cg: str, nc: str, cle: str) -> str:
     """Construit un IBAN FR à partir d'un RIB complet."""
     if not all([cb, cg, nc, cle]):
         return ""
     # Construit le BBAN (Basic Bank Account Number)
-    bban = f"{cb}{cg}{nc}{cle}"
-    try:
-        # Génère l'IBAN complet en utilisant python-stdnum
-        iban = iban_lib.from_bban("FR", bban)
-        if iban_lib.is_valid(iban):
-            return iban_lib.format(iban)
-    except Exception:
-        pass
+    bban = f"{cb}{cg}{nc}{cle}".upper()
+    reste = reste_mod97(bban)
+    if reste is None:
+        return ""
+    # Clé de l'IBAN : 98 - (BBAN suivi de 'FR00') mod 97
+    iban = f"FR{98 - reste_mod97('FR00', reste):02d}{bban}"
+    if iban_fr_valide(iban):
+        return formater_iban(iban)
     return ""
 
 
-PAT_BIC_CODE = re.compile(
-    r'\b[A-Z]{4}[A-Z]{2}[A-Z0-9]{2}(?:[A-Z0-9]{3})?\b'
+#region Réparation IBAN
+# ---------------------------------------------------------------------------
+# Réparation des IBAN dont un caractère a été mal lu par l'OCR
+# ---------------------------------------------------------------------------
+
+# Confusions courantes de Tesseract : caractère lu -> caractères qu'il peut cacher, du plus
+# probable au moins probable.
+CONFUSIONS_OCR = {
+    "O": "0", "Q": "0", "D": "0", "0": "OD",
+    "I": "1", "L": "1", "1": "IL",
+    "S": "5", "5": "S",
+    "B": "8", "8": "B",
+    "Z": "2", "2": "Z",
+    "G": "6", "6": "G",
+    "T": "7", "7": "T",
+    "A": "4", "4": "A",
+}
+# Lettres qui peuvent cacher un chiffre
+LETTRES_CHIFFRES = "".join(c for c, alt in CONFUSIONS_OCR.items() if c.isalpha() and any(a.isdigit() for a in alt))
+
+# IBAN FR « proche » : structure d'un IBAN FR, où une lettre confondable peut tenir la place d'un chiffre.
+# La recherche se fait par anticipation, les candidats pouvant se chevaucher dans le texte compacté.
+PAT_IBAN_FR_PROCHE = re.compile(
+    rf'(?=(FR[0-9{LETTRES_CHIFFRES}]{{12}}[A-Z0-9]{{11}}[0-9{LETTRES_CHIFFRES}]{{2}}))'
 )
 
+# Nature de chaque caractère d'un IBAN FR après 'FR' : 'n' chiffre, 'c' chiffre ou lettre (numéro de compte)
+STRUCTURE_IBAN_FR = "FR" + "n" * 12 + "c" * 11 + "nn"
+# Bornes de la recherche : le temps de réparation d'un document reste négligeable devant l'OCR
+MAX_CORRECTIONS_IBAN = 4       # lettres remplacées par le chiffre qu'elles cachent (imposé par la structure)
+MAX_SUBSTITUTIONS_IBAN = 2     # substitutions essayées ensemble dans le numéro de compte
+MAX_ESSAIS_IBAN = 2000         # combinaisons évaluées par candidat
+MAX_CANDIDATS_IBAN = 8         # IBAN proches essayés par document
+CONFIANCE_SURE = 95            # caractère lu avec au moins cette confiance (0-100) : jamais remplacé
+
+class RestesPositions:
+    """
+    Calcul mod 97 incrémental d'une chaîne, pour évaluer le remplacement de quelques caractères
+    sans tout recalculer :
+    - avant[i] : reste de chaine[:i]
+    - apres[i] : valeur de chaine[i + 1:] modulo 97 ; puissance[i] : 10^(nombre de chiffres de chaine[i + 1:]) modulo 97
+    """
+
+    def __init__(self, chaine: str, transitions: tuple, valeurs: dict):
+        self.chaine = chaine
+        self.transitions = transitions
+        self.avant = [0]
+        for c in chaine:
+            self.avant.append(transitions[self.avant[-1]][c])
+        n = len(chaine)
+        self.apres, self.puissance = [0] * n, [1] * n
+        for i in range(n - 2, -1, -1):
+            v = valeurs[chaine[i + 1]]
+            self.apres[i] = (v * self.puissance[i + 1] + self.apres[i + 1]) % 97
+            self.puissance[i] = self.puissance[i + 1] * 10 ** len(str(v)) % 97
+
+    def reste(self, substitutions: list) -> int:
+        """Reste de la chaîne entière après substitutions [(position, caractère)], triées par position."""
+        t = self.transitions
+        reste = self.avant[substitutions[0][0]]
+        for (i, c), suivante in zip(substitutions, substitutions[1:] + [None]):
+            reste = t[reste][c]
+            # Caractères inchangés jusqu'à la substitution suivante
+            for d in self.chaine[i + 1:suivante[0] if suivante else i + 1]:
+                reste = t[reste][d]
+        return (reste * self.puissance[i] + self.apres[i]) % 97
+
+def reparer_iban_fr(candidat: str, confiances=None) -> str:
+    """
+    Répare un IBAN FR mal lu (27 caractères compacts en majuscules, commençant par 'FR').
+
+    1. Toute lettre là où seul un chiffre est possible est remplacée par le chiffre qu'elle cache ('O' -> '0').
+    2. On essaie ensuite, par nombre croissant, des substitutions de la table CONFUSIONS_OCR dans le
+       numéro de compte, les plus probables d'abord : confusion la plus fréquente, et caractère lu
+       avec la plus faible confiance si `confiances` (confiance OCR de chaque caractère, 0-100) est fourni.
+    3. Une réparation n'est retenue que si la clé de l'IBAN (mod 97) et la clé RIB sont toutes deux
+       justes, et si elle est la seule à l'être pour ce nombre de substitutions.
+
+    Renvoie l'IBAN compact réparé, "" si aucune réparation n'est sûre.
+    """
+    if len(candidat) != 27 or not candidat.startswith("FR") or not (candidat.isascii() and candidat.isalnum()):
+        return ""
+
+    # 1) Corrections imposées par la structure
+    caracteres = list(candidat)
+    corrections = 0
+    for i, nature in enumerate(STRUCTURE_IBAN_FR):
+        if nature == "n" and not caracteres[i].isdigit():
+            chiffres = [a for a in CONFUSIONS_OCR.get(caracteres[i], "") if a.isdigit()]
+            if not chiffres:
+                return ""
+            caracteres[i] = chiffres[0]
+            corrections += 1
+    if corrections > MAX_CORRECTIONS_IBAN:
+        return ""
+    base = "".join(caracteres)
+
+    # Les deux contrôles portent sur le BBAN (positions 4 à 26 de l'IBAN) : 'FRxx' est lu à la fin pour la clé IBAN
+    bban = base[4:]
+    cle_iban = RestesPositions(bban + base[:4], TRANSITIONS_MOD97, VALEURS_MOD97)
+    cle_rib = RestesPositions(bban, TRANSITIONS_CLE_RIB, VALEURS_CLE_RIB)
+    if cle_iban.avant[-1] == 1 and cle_rib.avant[-1] == 0:
+        return base
+
+    # 2) Substitutions possibles dans le numéro de compte : (coût, position dans le BBAN, caractère)
+    options = []
+    for i in range(4, 27):
+        if STRUCTURE_IBAN_FR[i] != "c" or (confiances is not None and confiances[i] >= CONFIANCE_SURE):
+            continue
+        poids = confiances[i] / 100 if confiances is not None else 1
+        for rang, alternative in enumerate(CONFUSIONS_OCR.get(base[i], "")):
+            options.append(((rang + 1) * poids, i - 4, alternative))
+
+    # 3) Par nombre croissant de substitutions, les combinaisons les plus probables d'abord
+    essais = 0
+    for nb in range(1, MAX_SUBSTITUTIONS_IBAN + 1):
+        combinaisons = sorted(
+            (c for c in combinations(options, nb) if len({i for _, i, _ in c}) == nb),
+            key=lambda c: sum(cout for cout, _, _ in c),
+        )
+        reparations = []
+        for combinaison in combinaisons:
+            essais += 1
+            if essais > MAX_ESSAIS_IBAN:
+                return ""
+            substitutions = sorted((i, c) for _, i, c in combinaison)
+            if cle_iban.reste(substitutions) == 1 and cle_rib.reste(substitutions) == 0:
+                reparations.append(substitutions)
+                if len(reparations) > 1:
+                    return ""   # plusieurs réparations possibles : aucune n'est sûre
+        if reparations:
+            for i, c in reparations[0]:
+                caracteres[i + 4] = c
+            return "".join(caracteres)
+    return ""
+
+def reparer_iban_texte(t: str) -> str:
+    """
+    Cherche dans le texte les IBAN FR proches et renvoie la seule réparation obtenue
+    (IBAN compact), "" si aucune ou si plusieurs IBAN différents en sortent.
+    """
+    b = balayer(t)
+    reparations = set()
+    for candidat in list(dict.fromkeys(PAT_IBAN_FR_PROCHE.findall(b.compact)))[:MAX_CANDIDATS_IBAN]:
+        iban = reparer_iban_fr(candidat)
+        if iban:
+            reparations.add(iban)
+    return reparations.pop() if len(reparations) == 1 else ""
+
+
 #region Nettoyage
 def nettoyer_bic_ocr(chunk):
     """
@@ -258,7 +1196,7 @@ def nettoyer_bic_ocr(chunk):
     if not chunk:
         return ""
     # Supprime espaces et points
-    bic = re.sub(r'[^A-Za-z0-9]', '', chunk).upper()
+    bic = compacter_majuscules(chunk)
 
     # Certaines OCR lisent 'BOUS FRPP XXX' → 'BOUSFRPPXXX'
     # On ne garde que 8 ou 11 chars max.
@@ -282,7 +1220,7 @@ def valider_normaliser_bic(raw: str) -> str:
         return ""
 
     # Nettoyage brut
-    bic = re.sub(r'[^A-Za-z0-9]', '', raw.upper())
+    bic = compacter_majuscules(raw)
 
     if len(bic) not in (8, 11):
         return ""
@@ -314,36 +1252,38 @@ def extraire_bic_valide(texte: str) -> str:
     1. Trouve une ligne contenant un label BIC / SWIFT / Code BIC / Adresse SWIFT
     2. Regarde dans les quelques lignes suivantes pour un code BIC au bon format
     3. Valide et normalise (FR + python-stdnum)
-    4. Fallback global sur tout le texte si aucun label trouvé
-    """
-    lignes = texte.splitlines()
-    n = len(lignes)
-
-    # 1) On cherche d'abord les zones où on parle de BIC / SWIFT
-    for i, ligne in enumerate(lignes):
-        if PAT_BIC.search(ligne):
-            # On prend une fenêtre autour (ligne du label + quelques lignes suivantes)
-            fenetre = "\n".join(lignes[i:i+6]).upper()
-
-            # a) Recherche sur la fenêtre compactée (pour gérer 'BOUS FRPP XXX')
-            compact = re.sub(r'[^A-Z0-9]', '', fenetre)
-            candidats = PAT_BIC_CODE.findall(compact)
-            for cand in candidats:
-                bic = valider_normaliser_bic(cand)
-                if bic:
-                    return bic
-
-            # b) Recherche sur la fenêtre brute (au cas où ce soit déjà bien collé)
-            candidats = PAT_BIC_CODE.findall(fenetre)
-            for cand in candidats:
-                bic = valider_normaliser_bic(cand)
-                if bic:
-                    return bic
+    4. Fallback global sur tout le texte si aucun label trouvé : tout BIC au bon format, ceux
+       des banques de l'annuaire d'abord (l'annuaire ne sert qu'à ordonner, et à la confiance
+       donnée par `reconcilier_rib`)
+    """
+    b = balayer(texte)
+
+    # 1) On cherche d'abord les zones où on parle de BIC / SWIFT (lignes repérées par le balayage)
+    for i in b.lignes_avec("bic"):
+        # On prend une fenêtre autour (ligne du label + quelques lignes suivantes), lue dans l'index
+        # a) Recherche sur la fenêtre compactée (pour gérer 'BOUS FRPP XXX')
+        candidats = PAT_BIC_CODE.findall(b.fenetre_compacte(i, 6))
+        for cand in candidats:
+            bic = valider_normaliser_bic(cand)
+            if bic:
+                return bic
+
+        # b) Recherche sur la fenêtre brute (au cas où ce soit déjà bien collé)
+        candidats = PAT_BIC_CODE.findall(b.fenetre_majuscules(i, 6))
+        for cand in candidats:
+            bic = valider_normaliser_bic(cand)
+            if bic:
+                return bic
 
     # 2) Si aucun label trouvé ou rien de valide dans la zone → fallback global
-    texte_up = texte.upper()
-    compact_global = re.sub(r'[^A-Z0-9]', '', texte_up)
-    candidats = PAT_BIC_CODE.findall(compact_global)
+    annuaire = annuaire_banques()
+    if annuaire is None:
+        candidats = PAT_BIC_CODE.findall(b.compact)
+    else:
+        # Sans libellé, cherchés mot à mot dans le texte ; un BIC d'une banque connue de l'annuaire
+        # passe avant un mot de 8 lettres qui n'a que le format d'un BIC ('FR' au milieu)
+        candidats = sorted(PAT_BIC_CODE.findall(b.fenetre_majuscules(0, len(b.lignes))),
+                           key=lambda c: not annuaire.bic_connu(c))
     for cand in candidats:
         bic = valider_normaliser_bic(cand)
         if bic:
@@ -355,45 +1295,644 @@ def extraire_bic_valide(texte: str) -> str:
 
 def extraire_titulaire(t: str) -> str:
     """Extrait le titulaire du compte depuis le texte OCR."""
-    m = PAT_TITULAIRE.search(t)
-    if m:
-        val = m.group(2).strip().split("\n")[0].strip()
-        if len(val) > 3 and not re.search(r'\b(BIC|IBAN|DOMICILIATION)\b', val, re.I):
-            return val
-    for l in t.split('\n'):
-        if re.search(r'\b(M\.|MME|MONSIEUR|MADAME|SARL|SAS|SA|EURL|SOCIETE)\b', l, re.I):
-            return l.strip()
+    b = balayer(t)
+    # Premier libellé de titulaire suivi d'une valeur
+    for lib in b.libelles["titulaire"]:
+        m = VAL_TITULAIRE.match(t, lib.fin)
+        if m:
+            val = m.group(1).strip().split("\n")[0].strip()
+            if len(val) > 3 and not PAT_TITULAIRE_INVALIDE.search(val):
+                return val
+            break
+    # Sinon, première ligne qui contient une civilité ou une forme juridique
+    for i in b.lignes_avec("civilite"):
+        return b.lignes[i].strip()
     return ""
 
 def extraire_domiciliation(t: str) -> str:
-    """Extrait la domiciliation sur plusieurs lignes consécutives."""
-    lignes = [l.strip() for l in t.split('\n') if l.strip()]
-    for i, l in enumerate(lignes):
-        if re.search(r'(?i)\b(domiciliation|agence|adresse)\b', l):
-            contenu = []
-            m = re.search(r'(?i)\b(domiciliation|agence|adresse)\b[:\-\s]*(.*)', l)
-            after = m.group(2).strip() if m else ""
-            if after:
-                contenu.append(after)
-            for j in range(i + 1, len(lignes)):
-                nextline = lignes[j]
-                if re.search(r'(?i)\b(BIC|IBAN|TITULAIRE|COMPTE|CODE BANQUE|CLE RIB|CLÉ RIB|RIB)\b', nextline):
-                    break
-                if len(nextline) < 3:
-                    break
-                contenu.append(nextline)
-            return ' '.join(contenu).strip()
+    """
+    Extrait la domiciliation sur plusieurs lignes, jusqu'à la prochaine rubrique identifiable.
+    Combine toutes les lignes de l'agence ou de l'adresse.
+    """
+    b = balayer(t)
+    if b.libelles["domiciliation"]:
+        lib = b.libelles["domiciliation"][0]
+        contenu = []
+        # Texte qui suit le libellé sur sa ligne
+        after = VAL_DOMICILIATION.match(t, lib.fin, b.fin_ligne(lib.ligne)).group(1).strip()
+        if after:
+            contenu.append(after)
+
+        # Lignes qui ouvrent une autre rubrique : fin de la domiciliation
+        arrets = set(b.lignes_avec("bic", "iban", "titulaire", "compte", "rib"))
+        arrets.update(c.ligne for c in b.libelles["banque"] if t[c.debut:c.fin].lower().startswith("code"))
+        arrets.update(c.ligne for c in b.libelles["cle"] if "rib" in t[c.debut:c.fin].lower())
+        for j in range(lib.ligne + 1, len(b.lignes)):
+            nextline = b.lignes[j].strip()
+            if not nextline:
+                continue
+            if j in arrets or len(nextline) < 3:
+                break
+            contenu.append(nextline)
+
+        dom = ' '.join(contenu)
+        dom = PAT_ESPACES_MULTIPLES.sub(' ', dom)
+        return dom.strip()
+
+    # Fallback heuristique si le mot-clé n'existe pas : première ligne d'adresse, cherchée en une fois sur tout le texte
+    m = PAT_ADRESSE.search(t)
+    if m:
+        return b.lignes[b.ligne_de(m.start())].strip()
+    lignes = [l.strip() for l in b.lignes if l.strip()]
+    for l in lignes:
+        if 'RIB' in l.upper() and PAT_NUMERO_VOIE.search(l):
+            return l.split('RIB', 1)[-1].strip(' :.-')
     return ""
 
 #region Finalisation
 def extraire_par_libelles(t: str):
     """Extrait tous les champs RIB à partir des libellés textuels."""
-    cb = cg = nc = cle = tit = dom = ""
-    m = PAT_CODE_BANQUE.search(t);  cb = m.group(2) if m else ""
-    m = PAT_CODE_GUICHET.search(t); cg = m.group(2) if m else ""
-    m = PAT_NUM_COMPTE.search(t);   nc = m.group(2).replace(" ", "") if m else ""
-    m = PAT_CLE_RIB.search(t);      cle = m.group(2) if m else ""
+    b = balayer(t)
+    cb = b.valeur_apres("banque", VAL_CODE_BANQUE)
+    cg = b.valeur_apres("guichet", VAL_CODE_GUICHET)
+    nc = b.valeur_apres("compte", VAL_NUM_COMPTE).replace(" ", "")
+    cle = b.valeur_apres("cle", VAL_CLE_RIB)
     tit = extraire_titulaire(t)
     dom = extraire_domiciliation(t)
-    nc = re.sub(r'[^A-Z0-9]', '', nc.upper())
+    nc = compacter_majuscules(nc)
     return cb, cg, nc, cle, tit, dom
+
+def champs_resolus(texte: str) -> bool:
+    """
+    Critère d'arrêt du mode incrémental de `extraire_texte_ocr` : vrai dès que le texte
+    contient un IBAN valide tel que lu (clé mod 97 vérifiée, sans réparation), un BIC et un titulaire.
+    """
+    t = nettoyer(texte)
+    return bool(extraire_iban_valide(t) and extraire_bic_valide(t) and extraire_titulaire(t))
+
+def page_validee(texte: str) -> bool:
+    """
+    Indique si le texte OCR d'une page contient un RIB cohérent : un IBAN valide tel que lu
+    (clé mod 97, sans réparation : un IBAN qui ne passe qu'une fois corrigé fait monter la
+    résolution), ou des codes banque / guichet / compte dont la clé RIB calculée
+    correspond à la clé lue.
+    """
+    t = nettoyer(texte)
+    if extraire_iban_valide(t):
+        return True
+    cb, cg, nc, cle, _, _ = extraire_par_libelles(t)
+    return bool(cle) and calculer_cle_rib(cb, cg, nc) == cle
+
+
+#region Mise en page
+# ---------------------------------------------------------------------------
+# Extraction par la mise en page : mots positionnés (TSV de Tesseract ou pdfplumber)
+# ---------------------------------------------------------------------------
+
+# Mot positionné : texte, boîte englobante en points depuis le coin haut gauche de la page, et
+# confiance de la lecture (0-100 ; CONFIANCE_NATIVE pour la couche texte native d'un PDF)
+CONFIANCE_NATIVE = 100
+Mot = namedtuple("Mot", "texte gauche haut droite bas confiance", defaults=(CONFIANCE_NATIVE,))
+# Libellé repéré sur une ligne visuelle : type, numéro de la ligne, rangs de son premier et de son dernier mot
+LibellePlace = namedtuple("LibellePlace", "type ligne premier dernier")
+
+# Côté des cases de l'index spatial, en points (à peu près une ligne de texte courant)
+TAILLE_CASE = 12
+# Distance verticale maximale (points) entre le bas d'un libellé et une valeur écrite dessous
+DISTANCE_DESSOUS = 36
+# Écart horizontal entre deux mots d'une ligne, en hauteurs de mot, au-delà duquel on change de colonne
+ECART_COLONNE = 3
+# Lignes d'une domiciliation lues sous son libellé
+MAX_LIGNES_DOMICILIATION = 3
+# Libellés qui ouvrent une rubrique et terminent la valeur du libellé précédent (une civilité fait partie du titulaire)
+RUBRIQUES = frozenset(nom for nom, _ in TYPES_LIBELLES if nom != "civilite")
+
+# Champs du RIB lus après leur libellé : type de libellé -> (champ, motif de la valeur)
+CHAMPS_LIBELLES = {
+    "banque": ("code_banque", VAL_CODE_BANQUE),
+    "guichet": ("code_guichet", VAL_CODE_GUICHET),
+    "compte": ("numero_compte", VAL_NUM_COMPTE),
+    "cle": ("cle_rib", VAL_CLE_RIB),
+}
+
+class GrilleMots:
+    """
+    Index spatial des mots d'une page, construit une fois :
+    - lignes : lignes visuelles (mots dont les boîtes se chevauchent verticalement), chacune
+      triée de gauche à droite
+    - cases : case (colonne, rangée) de TAILLE_CASE points -> mots (ligne, rang) qui la touchent,
+      pour trouver en quelques cases les mots placés sous un libellé
+    - libelles : libellés reconnus par le balayage (PAT_BALAYAGE) dans le texte de chaque ligne
+    """
+
+    def __init__(self, mots):
+        self.lignes = []
+        for mot in sorted(mots, key=lambda m: (m.haut + m.bas) / 2):
+            milieu = (mot.haut + mot.bas) / 2
+            ligne = self.lignes[-1] if self.lignes else None
+            if ligne and ligne[0].haut <= milieu <= ligne[0].bas:
+                ligne.append(mot)
+            else:
+                self.lignes.append([mot])
+        for ligne in self.lignes:
+            ligne.sort(key=lambda m: m.gauche)
+
+        self.cases = {}
+        for i, ligne in enumerate(self.lignes):
+            for rang, mot in enumerate(ligne):
+                rangee = int(mot.haut // TAILLE_CASE)
+                for colonne in range(int(mot.gauche // TAILLE_CASE), int(mot.droite // TAILLE_CASE) + 1):
+                    self.cases.setdefault((colonne, rangee), []).append((i, rang))
+
+        self.libelles = [lib for i in range(len(self.lignes)) for lib in self.libelles_ligne(i)]
+
+    def libelles_ligne(self, i: int) -> list:
+        """Libellés de la ligne `i`, reconnus dans son texte (mots joints par une espace) puis ramenés aux mots."""
+        ligne = self.lignes[i]
+        fins = list(accumulate(len(m.texte) + 1 for m in ligne))
+        texte = " ".join(m.texte for m in ligne)
+        minuscules = texte.lower()
+        if len(minuscules) == len(texte):
+            correspondances = PAT_BALAYAGE.finditer("\n" + minuscules)
+        else:
+            correspondances = PAT_BALAYAGE_CASSE.finditer("\n" + texte)
+        return [LibellePlace(m.lastgroup, i, bisect_right(fins, m.start()), bisect_right(fins, m.end() - 2))
+                for m in correspondances]
+
+    def a_droite(self, lib: LibellePlace, arrets: frozenset = RUBRIQUES) -> list:
+        """
+        Mots qui suivent un libellé sur sa ligne, jusqu'au prochain libellé de l'un des types
+        `arrets` ou à un changement de colonne.
+        """
+        ligne = self.lignes[lib.ligne]
+        suivants = [l.premier for l in self.libelles if l.ligne == lib.ligne and l.premier > lib.dernier and l.type in arrets]
+        fin = min(suivants, default=len(ligne))
+        mots = []
+        for mot in ligne[lib.dernier + 1:fin]:
+            precedent = mots[-1] if mots else ligne[lib.dernier]
+            if mot.gauche - precedent.droite > ECART_COLONNE * (precedent.bas - precedent.haut):
+                break
+            mots.append(mot)
+        return mots
+
+    def colonne(self, lib: LibellePlace) -> tuple:
+        """
+        Étendue horizontale (gauche, droite) de la colonne d'un libellé : jusqu'aux libellés voisins
+        de la même ligne (en-tête d'une grille), sinon la largeur du libellé élargie de part et d'autre.
+        """
+        ligne = self.lignes[lib.ligne]
+        premier, dernier = ligne[lib.premier], ligne[lib.dernier]
+        marge = ECART_COLONNE * (premier.bas - premier.haut)
+        voisins = [l for l in self.libelles if l.ligne == lib.ligne and l is not lib and l.type in RUBRIQUES]
+        gauche = max((ligne[l.dernier].droite for l in voisins if l.dernier < lib.premier), default=premier.gauche - marge)
+        droite = min((ligne[l.premier].gauche for l in voisins if l.premier > lib.dernier), default=dernier.droite + marge)
+        return gauche, droite
+
+    def dessous(self, lib: LibellePlace, distance: float = DISTANCE_DESSOUS) -> list:
+        """
+        Lignes de mots placées sous un libellé, dans sa colonne (voir `colonne`) et à moins de
+        `distance` points : liste de (numéro de ligne, mots), de haut en bas.
+        """
+        gauche, droite = self.colonne(lib)
+        bas = max(m.bas for m in self.lignes[lib.ligne][lib.premier:lib.dernier + 1])
+        trouves = set()
+        for rangee in range(int(bas // TAILLE_CASE), int((bas + distance) // TAILLE_CASE) + 1):
+            for colonne in range(int(gauche // TAILLE_CASE), int(droite // TAILLE_CASE) + 1):
+                trouves.update(self.cases.get((colonne, rangee), ()))
+        lignes = {}
+        for i, rang in sorted(trouves):
+            mot = self.lignes[i][rang]
+            if i > lib.ligne and mot.haut - bas <= distance and gauche <= (mot.gauche + mot.droite) / 2 <= droite:
+                lignes.setdefault(i, []).append(mot)
+        return list(lignes.items())
+
+    def lignes_rubriques(self, *types) -> set:
+        """Numéros des lignes qui contiennent un libellé de l'un des `types`."""
+        return {l.ligne for l in self.libelles if l.type in types}
+
+
+def valeur_mise_en_page(grille: GrilleMots, lib: LibellePlace, motif) -> str:
+    """
+    Valeur d'un code lu après son libellé : à droite sur la même ligne (comme dans le texte), sinon
+    dans la première ligne placée dessous, dans la colonne du libellé (grille RIB en colonnes ;
+    les mots d'une même cellule forment une seule valeur).
+    """
+    m = motif.match(" ".join(mot.texte for mot in grille.a_droite(lib)))
+    if m:
+        return m.group(1)
+    for _, mots in grille.dessous(lib)[:1]:
+        m = motif.match("".join(mot.texte for mot in mots))
+        if m:
+            return m.group(1)
+    return ""
+
+def extraire_mise_en_page(pages: list) -> dict:
+    """
+    Extrait les champs d'un RIB à partir des mots positionnés de chaque page (listes de `Mot`,
+    None pour une page sans mots, ou `MotsOCR`) : codes banque / guichet / compte / clé, titulaire et
+    domiciliation, trouvés par leur position par rapport aux libellés (à droite, ou dessous).
+    Une grille RIB en colonnes (libellés sur une ligne, valeurs dessous) est lue en une passe.
+    Le premier libellé de chaque champ qui donne une valeur l'emporte ; champ absent : ''.
+    """
+    champs = dict.fromkeys(("code_banque", "code_guichet", "numero_compte", "cle_rib", "titulaire", "domiciliation"), "")
+    for mots in pages:
+        if not mots:
+            continue
+        grille = GrilleMots([Mot(*mot) for mot in mots])
+        for lib in grille.libelles:
+            if lib.type in CHAMPS_LIBELLES:
+                champ, motif = CHAMPS_LIBELLES[lib.type]
+                if not champs[champ]:
+                    champs[champ] = valeur_mise_en_page(grille, lib, motif)
+
+            elif lib.type == "titulaire" and not champs["titulaire"]:
+                # Sur la ligne du libellé, sinon sur la première ligne dessous
+                candidats = [grille.a_droite(lib)] + [mots for _, mots in grille.dessous(lib)[:1]]
+                for mots_valeur in candidats:
+                    m = VAL_TITULAIRE.match(" ".join(mot.texte for mot in mots_valeur))
+                    valeur = m.group(1).strip() if m else ""
+                    if len(valeur) > 3 and not PAT_TITULAIRE_INVALIDE.search(valeur):
+                        champs["titulaire"] = valeur
+                        break
+
+            elif lib.type == "domiciliation" and not champs["domiciliation"]:
+                # Texte à droite du libellé puis lignes de la même colonne, jusqu'à une autre rubrique
+                contenu = [" ".join(mot.texte for mot in grille.a_droite(lib, arrets=frozenset()))]
+                arrets = grille.lignes_rubriques("bic", "iban", "titulaire", "compte", "rib")
+                gauche = grille.colonne(lib)[0]
+                for i, _ in grille.dessous(lib, DISTANCE_DESSOUS * MAX_LIGNES_DOMICILIATION)[:MAX_LIGNES_DOMICILIATION]:
+                    if i in arrets:
+                        break
+                    # Une ligne d'adresse déborde de la colonne du libellé : on la lit jusqu'au bout
+                    contenu.append(" ".join(mot.texte for mot in grille.lignes[i] if mot.droite >= gauche))
+                champs["domiciliation"] = PAT_ESPACES_MULTIPLES.sub(" ", " ".join(contenu)).strip(" :-")
+
+    champs["numero_compte"] = compacter_majuscules(champs["numero_compte"])
+    return champs
+
+
+#region Confiances OCR
+# ---------------------------------------------------------------------------
+# Mots d'un document avec leur confiance, en tableaux compacts
+# ---------------------------------------------------------------------------
+
+# Confiance moyenne des mots d'une page (0-100) sous laquelle elle mérite d'être relue (dpi supérieur, VLM)
+SEUIL_RELECTURE = 80
+
+def confiance_moyenne(mots) -> float:
+    """Confiance moyenne d'une liste de `Mot` (CONFIANCE_NATIVE si elle est vide : rien à relire)."""
+    return sum(m.confiance for m in mots) / len(mots) if mots else CONFIANCE_NATIVE
+
+class MotsOCR:
+    """
+    Mots positionnés d'un document et confiance de leur lecture, rangés en tableaux compacts
+    alignés (module `array`) au lieu d'une liste d'objets par mot :
+    - textes / fins : texte de tous les mots bout à bout, et position de fin de chacun
+    - pages : numéro de page de chaque mot (à partir de 1) ; debuts_pages : rang du premier mot de chaque page
+    - boites : gauche, haut, droite, bas de chaque mot (4 flottants par mot, en points)
+    - confiances : confiance de chaque mot (0-100, CONFIANCE_NATIVE pour le texte natif)
+
+    L'itération donne les mots de chaque page sous forme de listes de `Mot` (pages lues dans
+    l'ordre, liste vide pour une page sans mots), comme l'attend `extraire_mise_en_page`.
+    """
+
+    def __init__(self, pages: list):
+        textes = []
+        self.fins = array("I")
+        self.pages = array("H")
+        self.debuts_pages = array("I")
+        self.boites = array("f")
+        self.confiances = array("b")
+        for num, mots in enumerate(pages, start=1):
+            self.debuts_pages.append(len(self.pages))
+            for mot in mots or ():
+                mot = Mot(*mot)
+                textes.append(mot.texte)
+                self.fins.append((self.fins[-1] if self.fins else 0) + len(mot.texte))
+                self.pages.append(num)
+                self.boites.extend((mot.gauche, mot.haut, mot.droite, mot.bas))
+                self.confiances.append(round(mot.confiance))
+        self.debuts_pages.append(len(self.pages))
+        self.textes = "".join(textes)
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    @property
+    def nb_pages(self) -> int:
+        return len(self.debuts_pages) - 1
+
+    def mot(self, k: int) -> Mot:
+        """Mot de rang `k` du document."""
+        debut = self.fins[k - 1] if k else 0
+        return Mot(self.textes[debut:self.fins[k]], *self.boites[4 * k:4 * k + 4], self.confiances[k])
+
+    def page(self, num: int) -> list:
+        """Mots de la page `num` (à partir de 1)."""
+        return [self.mot(k) for k in range(self.debuts_pages[num - 1], self.debuts_pages[num])]
+
+    def __iter__(self):
+        return (self.page(num) for num in range(1, self.nb_pages + 1))
+
+    def confiance_page(self, num: int) -> float:
+        """Confiance moyenne des mots de la page `num` (CONFIANCE_NATIVE pour une page sans mots)."""
+        confiances = self.confiances[self.debuts_pages[num - 1]:self.debuts_pages[num]]
+        return sum(confiances) / len(confiances) if confiances else CONFIANCE_NATIVE
+
+    def pages_a_relire(self, seuil: float = SEUIL_RELECTURE) -> list:
+        """Numéros des pages dont la confiance moyenne est sous `seuil` : à relire plus finement (dpi, VLM)."""
+        return [num for num in range(1, self.nb_pages + 1) if self.confiance_page(num) < seuil]
+
+    def compact(self, num: int) -> tuple:
+        """
+        Mots de la page `num` compactés en majuscules (comme `compacter_majuscules`), avec la
+        confiance de chaque caractère (celle de son mot) : (texte compact, array des confiances).
+        """
+        morceaux, confiances = [], array("b")
+        for k in range(self.debuts_pages[num - 1], self.debuts_pages[num]):
+            debut = self.fins[k - 1] if k else 0
+            morceau = compacter_majuscules(self.textes[debut:self.fins[k]])
+            morceaux.append(morceau)
+            confiances.extend([self.confiances[k]] * len(morceau))
+        return "".join(morceaux), confiances
+
+def reparer_iban_mots(mots: MotsOCR) -> str:
+    """
+    Variante de `reparer_iban_texte` guidée par la confiance OCR de chaque caractère : seuls
+    les caractères lus avec une confiance inférieure à CONFIANCE_SURE sont remplacés, les moins
+    sûrs d'abord (voir `reparer_iban_fr`). Renvoie la seule réparation obtenue, "" sinon.
+    """
+    reparations = set()
+    for num in range(1, mots.nb_pages + 1):
+        compact, confiances = mots.compact(num)
+        candidats = {}
+        for m in PAT_IBAN_FR_PROCHE.finditer(compact):
+            candidats.setdefault(m.group(1), m.start())
+        for candidat, debut in list(candidats.items())[:MAX_CANDIDATS_IBAN]:
+            iban = reparer_iban_fr(candidat, confiances[debut:debut + len(candidat)])
+            if iban:
+                reparations.add(iban)
+    return reparations.pop() if len(reparations) == 1 else ""
+
+
+#region Tableaux
+# ---------------------------------------------------------------------------
+# Grille RIB des PDF natifs lue comme un tableau (pdfplumber)
+# ---------------------------------------------------------------------------
+
+# Format exact de chaque cellule de la grille, une fois compactée : pas d'heuristique sur le texte libre
+FORMATS_GRILLE = {
+    "banque": re.compile(r'[0-9]{5}'),
+    "guichet": re.compile(r'[0-9]{5}'),
+    "compte": re.compile(r'[A-Z0-9]{11}'),
+    "cle": re.compile(r'[0-9]{2}'),
+}
+# Ordre des codes dans une combinaison (banque, guichet, compte, clé)
+ORDRE_GRILLE = ("banque", "guichet", "compte", "cle")
+
+def type_entete(cellule) -> str | None:
+    """Type du libellé de grille (banque, guichet, compte, clé) d'une cellule d'en-tête, None sinon."""
+    if not cellule:
+        return None
+    m = PAT_BALAYAGE_CASSE.search("\n" + cellule)
+    return m.lastgroup if m and m.lastgroup in FORMATS_GRILLE else None
+
+def lire_tableau_rib(lignes: list) -> tuple | None:
+    """
+    Codes (banque, guichet, compte, clé) d'un tableau extrait par pdfplumber (liste de lignes de
+    cellules) : ligne d'en-têtes suivie de la ligne des valeurs, ou tableau vertical (libellé
+    puis valeur sur chaque ligne). Chaque cellule doit avoir exactement le format de son champ
+    (FORMATS_GRILLE). None si moins de deux codes sont lus.
+    """
+    codes = dict.fromkeys(ORDRE_GRILLE, "")
+
+    def lire(type_champ, cellule):
+        valeur = compacter_majuscules(cellule or "")
+        if type_champ and not codes[type_champ] and FORMATS_GRILLE[type_champ].fullmatch(valeur):
+            codes[type_champ] = valeur
+
+    for r, ligne in enumerate(lignes):
+        types = [type_entete(cellule) for cellule in ligne]
+        if sum(t is not None for t in types) >= 2 and r + 1 < len(lignes):
+            for type_champ, cellule in zip(types, lignes[r + 1]):
+                lire(type_champ, cellule)
+        elif len(ligne) >= 2 and types[0]:
+            lire(types[0], ligne[1])
+
+    if sum(bool(v) for v in codes.values()) < 2:
+        return None
+    return tuple(codes[t] for t in ORDRE_GRILLE)
+
+def tableaux_rib(page, texte: str) -> list:
+    """
+    Grilles RIB d'une page native pdfplumber, lues comme des tableaux : liste de combinaisons
+    (banque, guichet, compte, clé). Rien n'est fait si le texte de la page ne contient pas au
+    moins deux libellés de grille différents (banque, guichet, compte, clé).
+
+    Les grilles à filets sont lues par `find_tables` (stratégie des traits). Sans filets, pour
+    chaque ligne d'en-tête (au moins deux libellés de grille), les colonnes sont tracées à
+    mi-distance entre les cellules de l'en-tête (mots séparés de plus d'une hauteur de mot) et
+    la grille est lue par `extract_table` avec ces traits explicites : chaque valeur de la
+    ligne suivante tombe dans la cellule de son libellé.
+    """
+    b = balayer(texte)
+    if sum(bool(b.libelles[t]) for t in ORDRE_GRILLE) < 2:
+        return []
+
+    resultats = [codes for table in page.find_tables() if (codes := lire_tableau_rib(table.extract()))]
+    if resultats:
+        return resultats
+
+    grille = GrilleMots([Mot(m["text"], m["x0"], m["top"], m["x1"], m["bottom"]) for m in page.extract_words()])
+    for i, ligne in enumerate(grille.lignes[:-1]):
+        if len({l.type for l in grille.libelles if l.ligne == i and l.type in FORMATS_GRILLE}) < 2:
+            continue
+        haut, bas = min(m.haut for m in ligne), max(m.bas for m in ligne)
+        valeurs = grille.lignes[i + 1]
+        if min(m.haut for m in valeurs) - bas > DISTANCE_DESSOUS:
+            continue
+
+        # Cellules de l'en-tête : mots séparés de moins d'une hauteur de mot
+        cellules = [[ligne[0]]]
+        for precedent, mot in zip(ligne, ligne[1:]):
+            if mot.gauche - precedent.droite > precedent.bas - precedent.haut:
+                cellules.append([])
+            cellules[-1].append(mot)
+        marge = ECART_COLONNE * (bas - haut)
+        traits = ([cellules[0][0].gauche - marge]
+                  + [(avant[-1].droite + apres[0].gauche) / 2 for avant, apres in zip(cellules, cellules[1:])]
+                  + [cellules[-1][-1].droite + marge])
+        table = page.extract_table({
+            "vertical_strategy": "explicit", "explicit_vertical_lines": traits,
+            "horizontal_strategy": "explicit", "explicit_horizontal_lines": [haut, bas, max(m.bas for m in valeurs)],
+        })
+        codes = lire_tableau_rib(table or [])
+        if codes:
+            resultats.append(codes)
+    return resultats
+
+
+#region Réconciliation
+# ---------------------------------------------------------------------------
+# Réconciliation des sources : IBAN, grille RIB, libellés, et confiance par champ
+# ---------------------------------------------------------------------------
+
+# Champs d'un RIB, dans l'ordre d'affichage
+CHAMPS_RIB = ("titulaire", "code_banque", "code_guichet", "numero_compte", "cle_rib", "bic", "iban", "domiciliation")
+
+# Grille RIB sur une seule ligne : 'banque guichet compte clé', séparés par des espaces ou des barres
+SEP_GRILLE = r'[^\S\n]*[|;/-]?[^\S\n]*'
+PAT_GRILLE_RIB = re.compile(
+    rf'(?i)\b([0-9]{{5}}){SEP_GRILLE}([0-9]{{5}}){SEP_GRILLE}([A-Z0-9]{{11}}){SEP_GRILLE}([0-9]{{2}})\b'
+)
+
+# Poids de chaque source dans le score d'une combinaison et dans la confiance d'un champ
+POIDS_SOURCES = {"iban": 0.6, "tableau": 0.6, "reparation": 0.4, "grille": 0.5, "mise_en_page": 0.5, "libelle": 0.3}
+# Bonus quand la clé RIB lue est vérifiée par le calcul (contrainte indépendante des sources)
+BONUS_CLE_RIB = 0.3
+# Nombre de valeurs retenues par champ lu après un libellé (borne le nombre de combinaisons)
+MAX_VALEURS_LIBELLE = 3
+# En dessous de cette confiance, un champ est à vérifier à la main
+SEUIL_CONFIANCE = 0.8
+# Confiance maximale des codes et de l'IBAN quand le document contient plusieurs RIB cohérents différents
+CONFIANCE_AMBIGUE = 0.5
+# Bonus d'un code banque connu de l'annuaire des banques
+BONUS_ANNUAIRE = 0.1
+# Confiance minimale d'un BIC dont l'annuaire confirme qu'il est celui de la banque de l'IBAN
+CONFIANCE_BIC_COHERENT = 0.9
+
+def valeurs_libelles(t: str) -> tuple:
+    """Valeurs lues après les libellés (au plus MAX_VALEURS_LIBELLE par champ) : (banques, guichets, comptes, clés)."""
+    b = balayer(t)
+    return (
+        b.valeurs_apres("banque", VAL_CODE_BANQUE)[:MAX_VALEURS_LIBELLE],
+        b.valeurs_apres("guichet", VAL_CODE_GUICHET)[:MAX_VALEURS_LIBELLE],
+        list(dict.fromkeys(compacter_majuscules(nc) for nc in b.valeurs_apres("compte", VAL_NUM_COMPTE)[:MAX_VALEURS_LIBELLE])),
+        b.valeurs_apres("cle", VAL_CLE_RIB)[:MAX_VALEURS_LIBELLE],
+    )
+
+def candidats_rib(t: str) -> list:
+    """
+    Combinaisons (banque, guichet, compte, clé) proposées par chaque source, avec leur source :
+    décomposition des IBAN valides tels que lus, grilles RIB sur une ligne, et produit des valeurs lues
+    après les libellés (plusieurs valeurs par champ, champ vide quand aucun libellé n'est lu).
+    """
+    candidats = []
+    for iban in candidats_iban(t):
+        candidats.append((decomposer_iban_fr(iban), "iban"))
+    for m in PAT_GRILLE_RIB.finditer(t):
+        candidats.append(((m.group(1), m.group(2), m.group(3).upper(), m.group(4)), "grille"))
+
+    libelles = valeurs_libelles(t)
+    if any(libelles):
+        for valeurs in product(*(v or [""] for v in libelles)):
+            candidats.append((valeurs, "libelle"))
+    return candidats
+
+def reconcilier_rib(texte: str, mots: list | None = None, tableaux: list | None = None) -> tuple:
+    """
+    Extrait tous les champs d'un RIB en confrontant les sources au lieu de les prendre dans
+    un ordre fixe. Chaque combinaison (banque, guichet, compte, clé) candidate est notée :
+    somme des poids des sources qui proposent chacune de ses valeurs, plus un bonus si la clé
+    RIB lue est juste ou que le code banque est connu de l'annuaire. La combinaison de meilleur
+    score est retenue (la première à égalité). Le BIC est confronté au code banque retenu.
+
+    Avec `mots` (mots positionnés de chaque page, voir `extraire_texte_pdf(mise_en_page=True)`),
+    les valeurs trouvées par la mise en page sont une source de plus (`extraire_mise_en_page`),
+    et elles sont préférées pour le titulaire et la domiciliation ; avec leur confiance (`MotsOCR`),
+    la réparation d'un IBAN mal lu ne touche que les caractères peu sûrs. Les grilles lues comme des
+    tableaux dans les pages natives (`tableaux`, voir `tableaux_rib`) sont une source aussi sûre
+    que l'IBAN.
+
+    Renvoie (champs, confiances) : deux dictionnaires indexés par CHAMPS_RIB, la confiance
+    d'un champ allant de 0 (absent) à 1 (lu par plusieurs sources et vérifié par les clés).
+    """
+    t = nettoyer(texte)
+    b = balayer(t)
+    candidats = candidats_rib(t)
+    mise_en_page = extraire_mise_en_page(mots) if mots else {}
+    codes = tuple(mise_en_page.get(nom, "") for nom in ("code_banque", "code_guichet", "numero_compte", "cle_rib"))
+    if any(codes):
+        candidats.append((codes, "mise_en_page"))
+    for tableaux_page in tableaux or ():
+        candidats.extend((tuple(codes), "tableau") for codes in tableaux_page or ())
+    # Dernier recours, une seule fois : aucun IBAN valide tel que lu, un IBAN dont quelques caractères
+    # ont été mal lus par l'OCR (O/0, I/1, S/5, B/8…) est réparé, d'abord en se guidant sur la
+    # confiance de chaque caractère, sinon sur le texte seul
+    if not any(source == "iban" for _, source in candidats):
+        iban = (reparer_iban_mots(mots) if isinstance(mots, MotsOCR) else "") or reparer_iban_texte(t)
+        if iban:
+            candidats.append((decomposer_iban_fr(iban), "reparation"))
+
+    # Valeurs proposées par chaque source, champ par champ (un libellé soutient sa valeur même si
+    # les autres champs n'ont pas été lus)
+    soutiens = [{} for _ in range(4)]
+    for valeurs, source in candidats:
+        for k, valeur in enumerate(valeurs):
+            if valeur:
+                soutiens[k].setdefault(valeur, set()).add(source)
+
+    annuaire = annuaire_banques()
+    def banque_connue(code):
+        return annuaire is not None and annuaire.connu(code)
+
+    def score(valeurs):
+        total = sum(POIDS_SOURCES[s] for k, v in enumerate(valeurs) for s in soutiens[k].get(v, ()))
+        total += BONUS_ANNUAIRE * banque_connue(valeurs[0])
+        return total + (BONUS_CLE_RIB if valeurs[3] and rib_valide("".join(valeurs)) else 0)
+
+    meilleur = ("", "", "", "")
+    if candidats:
+        scores = [score(valeurs) for valeurs, _ in candidats]
+        meilleur = candidats[scores.index(max(scores))][0]
+    cb, cg, nc, cle = meilleur
+
+    # Confiance des codes : sources concordantes, plus le bonus si la clé lue est vérifiée
+    cle_verifiee = bool(cle) and rib_valide(cb + cg + nc + cle)
+    confiances = {}
+    for nom, k in (("code_banque", 0), ("code_guichet", 1), ("numero_compte", 2), ("cle_rib", 3)):
+        valeur = meilleur[k]
+        poids = sum(POIDS_SOURCES[s] for s in soutiens[k].get(valeur, ()))
+        confiances[nom] = min(1.0, poids + BONUS_CLE_RIB * cle_verifiee) if valeur else 0.0
+    if banque_connue(cb):
+        confiances["code_banque"] = min(1.0, confiances["code_banque"] + BONUS_ANNUAIRE)
+
+    # Clé absente : calculée, elle ne vaut pas mieux que les codes dont elle découle
+    if not cle and cb and cg and nc:
+        cle = calculer_cle_rib(cb, cg, nc)
+        confiances["cle_rib"] = min(confiances["code_banque"], confiances["code_guichet"], confiances["numero_compte"])
+
+    # IBAN : celui du texte s'il a été retenu (reformé à l'identique à partir de ses codes), sinon
+    # reconstruit ; il est aussi sûr que le moins sûr de ses codes
+    iban = construire_iban_fr(cb, cg, nc, cle) if all([cb, cg, nc, cle]) else ""
+    confiances["iban"] = min(confiances[nom] for nom in ("code_banque", "code_guichet", "numero_compte", "cle_rib")) if iban else 0.0
+
+    # Un autre RIB complet et vérifié (IBAN ou grille) dans le même document : le choix est incertain
+    if any(valeurs != meilleur and source != "libelle" and rib_valide("".join(valeurs)) for valeurs, source in candidats):
+        for nom in ("code_banque", "code_guichet", "numero_compte", "cle_rib", "iban"):
+            confiances[nom] = min(confiances[nom], CONFIANCE_AMBIGUE)
+
+    # Champs sans contrôle croisé : confiance plus élevée quand ils sont lus après leur libellé
+    bic = extraire_bic_valide(t)
+    tit = mise_en_page.get("titulaire") or extraire_titulaire(t) or extraire_titulaire(texte)
+    dom = mise_en_page.get("domiciliation") or extraire_domiciliation(t) or extraire_domiciliation(texte)
+    for nom, valeur, type_libelle in (("bic", bic, "bic"), ("titulaire", tit, "titulaire"), ("domiciliation", dom, "domiciliation")):
+        confiances[nom] = (0.8 if b.libelles[type_libelle] else 0.5) if valeur else 0.0
+
+    # BIC confronté à l'annuaire : bonus s'il est d'une banque connue, confirmé s'il est celui de la
+    # banque de l'IBAN, à vérifier s'il est d'une autre banque
+    if bic and annuaire is not None and annuaire.bic_connu(bic):
+        confiances["bic"] = min(1.0, confiances["bic"] + BONUS_ANNUAIRE)
+    coherent = annuaire.bic_coherent(bic, cb) if annuaire is not None else None
+    if coherent is not None:
+        confiances["bic"] = max(confiances["bic"], CONFIANCE_BIC_COHERENT) if coherent else min(confiances["bic"], CONFIANCE_AMBIGUE)
+
+    champs = {
+        "titulaire": tit, "code_banque": cb, "code_guichet": cg, "numero_compte": nc,
+        "cle_rib": cle, "bic": bic, "iban": iban, "domiciliation": dom,
+    }
+    return champs, {nom: round(confiances[nom], 2) for nom in CHAMPS_RIB}
+
+def champs_a_verifier(confiances: dict) -> list:
+    """Champs dont la confiance est sous SEUIL_CONFIANCE, dans l'ordre de CHAMPS_RIB."""
+    return [nom for nom in CHAMPS_RIB if confiances[nom] < SEUIL_CONFIANCE]
@@ -1,8 +1,10 @@
 """
 RIB Extractor - Analyse et extraction automatique des informations de RIB à partir de fichiers PDF.
 
-Ce script lit tous les fichiers PDF présents dans le dossier spécifié, exécute une reconnaissance
-optique de caractères (OCR) sur chaque page, puis tente d'extraire les informations suivantes :
+Ce script lit tous les RIB présents dans le dossier spécifié (PDF, images, archives ZIP ; sous-dossiers
+compris avec -r), récupère le texte de chaque page (couche texte native du PDF, sinon reconnaissance
+optique de caractères), puis tente
+d'extraire les informations suivantes :
     - Titulaire du compte
     - Code Banque
     - Code Guichet
@@ -12,42 +14,47 @@ optique de caractères (OCR) sur chaque page, puis tente d'extraire les informat
     - IBAN
     - Domiciliation (agence ou adresse)
 
-Les données extraites sont ensuite exportées dans un fichier CSV, en conservant les zéros initiaux
-et en forçant toutes les colonnes à être interprétées comme du texte.
+Les données extraites sont écrites au fil de l'eau dans un fichier CSV (par défaut), JSON Lines ou
+Parquet ; le CSV conserve les zéros initiaux et force toutes les colonnes à être lues comme du texte.
 
 Fonctionnalités principales :
-    • OCR systématique sur tous les PDF (via Tesseract)
+    • Lecture directe de la couche texte des PDF natifs, OCR (Tesseract) uniquement si nécessaire
     • Extraction robuste avec expressions régulières et heuristiques
     • Validation et reconstruction partielle de l'IBAN lorsque possible
+    • Confrontation de l'IBAN, de la grille RIB et des libellés, avec une confiance par champ
     • Formatage propre pour usage avec Excel ou autres outils
+    • Traitement par lot réparti sur plusieurs processus (option -j)
+    • Moteur réutilisable (`app/extracteur.py`, classe ExtracteurRib) dont ce script n'est qu'une façade
+    • Cache disque du texte des PDF déjà lus (option --cache / --sans-cache)
+    • Reprise des lots : les fichiers inchangés déjà traités sont repris du manifeste (option --manifeste)
+    • Lot réparti sur plusieurs machines par tranches (option --tranche i/N), puis fusion (--fusionner)
 
 Auteur : GASMI Rémy
 Date   : 2025-11
 """
 
 import os
-import re
-import csv
-import tempfile
+import sys
+import json
+import heapq
+import hashlib
 import logging
-import importlib
-import pandas as pd
-from pdf2image import convert_from_path
-import pytesseract
-from stdnum import iban as iban_lib
-
-
-# ---------------------------------------------------------------------------
-# Chargement dynamique du module swiftbic / bic (pour compatibilité future)
-# ---------------------------------------------------------------------------
-
-try:
-    bic_lib = importlib.import_module("stdnum.swiftbic")
-except ModuleNotFoundError:
-    try:
-        bic_lib = importlib.import_module("stdnum.bic")
-    except ModuleNotFoundError:
-        bic_lib = None
+import argparse
+from collections import deque
+
+# Le moteur d'extraction (lecture des PDF, OCR, confrontation des champs) est partagé avec
+# l'application Streamlit : ce script n'en est qu'une façade en ligne de commande.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "app"))
+from utils import diagnostic_ocr, ECHELLE_DPI
+from cache_ocr import CacheOCR, CHEMIN_CACHE_DEFAUT, VERSION_CACHE
+from extracteur import (
+    ExtracteurRib, Resultat, COLONNES_EXPORT, VERSION_EXTRACTION, resumer_lecture, ligne_resultat, recoder_codes,
+    document,
+)
+from annuaire_banques import empreinte_annuaire
+from parcours import parcourir, cle_ordre, ERREURS_LECTURE
+from manifeste import Manifeste, CHEMIN_MANIFESTE_DEFAUT, empreinte_fichier
+from sorties import ouvrir_sortie, lire_sortie, SORTIES, FLUSH_LIGNES, FLUSH_SECONDES
 
 
 # ---------------------------------------------------------------------------
@@ -56,391 +63,251 @@ except ModuleNotFoundError:
 
 logging.getLogger("pdfminer").setLevel(logging.ERROR)
 
-DOSSIER_PDF = "rib"                 # Dossier contenant les fichiers PDF à analyser
-SORTIE_CSV = "rib_infos.csv"        # Nom du fichier CSV de sortie
-
-
-# ---------------------------------------------------------------------------
-# Expressions régulières pour l'extraction des champs RIB
-# ---------------------------------------------------------------------------
-
-PAT_CODE_BANQUE  = re.compile(r'(?i)\b(code\s*banque|banque|code\s*bq)\b\D*([0-9]{5})')
-PAT_CODE_GUICHET = re.compile(r'(?i)\b(code\s*guichet|guichet)\b\D*([0-9]{5})')
-PAT_NUM_COMPTE   = re.compile(r'(?i)\b(num(?:[ée]ro)?\s*de\s*compte|n[°\s]*compte|compte)\b\D*([A-Z0-9]{5,34})')
-PAT_CLE_RIB      = re.compile(r'(?i)\b(cl[ée]\s*rib|cl[ée])\b\D*([0-9]{2})')
-PAT_IBAN_FR_COMPACT = re.compile(r'FR\d{2}[A-Z0-9]{23}')
-PAT_BIC = re.compile(
-    r"""
-    (?i)
-    \b(
-        B[\.\s]*I[\.\s]*C              # BIC / B.I.C / B I C
-        (?:[\s\./:-]*S[\.\s]*W[\.\s]*I[\.\s]*F[\.\s]*T(?:\s*CODE)?)?
-      | S[\.\s]*W[\.\s]*I[\.\s]*F[\.\s]*T(?:\s*CODE)?     # SWIFT / SWIFT CODE
-      | CODE\s*B[\.\s]*I[\.\s]*C                          # CODE BIC
-      | ADRESSE\s*S[\.\s]*W[\.\s]*I[\.\s]*F[\.\s]*T       # ADRESSE SWIFT
-    )\b
-    """,
-    re.VERBOSE
-)
-
-
-PAT_TITULAIRE = re.compile(
-    r'(?i)\b(titulaire(?:\s*du\s*compte)?|nom\s+du\s+titul(?:aire)?|b[ée]n[ée]ficiaire|au\s*nom\s*de)\b\s*[:\-]?\s*([A-ZÉÈÊÀÂÎÏÔÙÜÇa-z0-9\.\'\-\s]+)'
-)
-PAT_DOMICILIATION = re.compile(r'(?i)\b(domiciliation|agence|adresse)\b\s*[:\-]?\s*([A-Z0-9\'\-\s,\.]+)')
+DOSSIER_PDF = "rib"                 # Dossier des RIB à analyser par défaut
+SORTIE_CSV = "rib_infos.csv"        # Fichier de sortie par défaut (format déduit de l'extension)
+NB_PROCESSUS = os.cpu_count() or 1  # Nombre de processus d'analyse en parallèle (un Tesseract chacun)
 
 
 # ---------------------------------------------------------------------------
-# OCR : conversion PDF → image → texte
+# Reprise d'un lot : fichiers déjà traités repris du manifeste
 # ---------------------------------------------------------------------------
 
-def extraire_texte_ocr(path: str) -> str:
+def parametres_lecture(extracteur: ExtracteurRib) -> str:
     """
-    Exécute une reconnaissance optique de caractères (OCR) sur un fichier PDF.
-    Chaque page est convertie en image avant d'être analysée par Tesseract.
-
-    Args:
-        path (str): Chemin vers le fichier PDF.
-
-    Returns:
-        str: Texte brut extrait du PDF.
+    Tout ce qui change le résultat d'un fichier, pour le manifeste : paramètres de lecture (le
+    cache n'en fait pas partie), versions de la lecture et de l'extraction des champs, et
+    contenu de l'annuaire des banques (contrôle du BIC).
     """
-    texte = ""
-    with tempfile.TemporaryDirectory() as tmp:
-        try:
-            images = convert_from_path(path, dpi=300, output_folder=tmp)
-            for img in images:
-                try:
-                    texte += pytesseract.image_to_string(img, lang="fra") + "\n"
-                except pytesseract.TesseractError:
-                    texte += pytesseract.image_to_string(img, lang="eng") + "\n"
-        except Exception as e:
-            print(f"Erreur OCR sur {path}: {e}")
-    return texte.strip()
-
+    parametres = {k: v for k, v in extracteur.parametres.items() if k != "chemin_cache"}
+    return json.dumps({**parametres, "version": VERSION_CACHE, "version_extraction": VERSION_EXTRACTION,
+                       "annuaire": empreinte_annuaire()}, sort_keys=True)
 
-# ---------------------------------------------------------------------------
-# Fonctions utilitaires pour le nettoyage de texte
-# ---------------------------------------------------------------------------
-
-def nettoyer(texte: str) -> str:
-    """Nettoie le texte pour supprimer les caractères parasites et espaces multiples."""
-    texte = texte.replace('\r', '')
-    texte = re.sub(r'[ \t]+', ' ', texte)
-    return texte
+def traiter_avec_reprise(extracteur: ExtracteurRib, chemins, manifeste: Manifeste | None,
+                         nb_processus: int = NB_PROCESSUS, max_en_cours: int | None = None):
+    """
+    Génère (résultat, repris) pour chaque élément de `chemins` (chemin, ou couple (chemin, nom)
+    comme ceux de `parcourir`), dans l'ordre. Les fichiers
+    inchangés déjà traités (voir `Manifeste.resultat`) sont repris du manifeste sans être
+    relus (repris=True) ; les autres sont analysés en parallèle puis enregistrés au fur et à mesure.
+    """
+    if manifeste is None:
+        for resultat in extracteur.extraire_lot(chemins, nb_processus, max_en_cours):
+            yield resultat, False
+        return
+
+    # Fichiers vus et pas encore générés : ((chemin, nom), repris). Des fichiers repris, seul le chemin
+    # est gardé ; leur résultat n'est relu du manifeste qu'au moment de le générer.
+    ordre = deque()
+
+    def a_traiter():
+        for element in chemins:
+            chemin, nom = document(element)
+            repris = manifeste.resultat(chemin) is not None
+            ordre.append(((chemin, nom), repris))
+            if not repris:
+                yield chemin, nom
+
+    def enregistrer(chemin, resultat):
+        # Document en échec ou illisible (aucune page) : marqué en erreur avec son message, il est
+        # repris tel quel au prochain lot (retraité seulement avec `retenter_erreurs`)
+        enregistre = {k: v for k, v in resultat._asdict().items() if k != "texte"}
+        en_erreur = "erreur" in resultat.infos or not resultat.infos.get("nb_pages")
+        manifeste.enregistrer(chemin, enregistre, resultat.infos.get("empreinte"),
+                              statut="erreur" if en_erreur else "fait")
+
+    def reprendre():
+        while ordre and ordre[0][1]:
+            (chemin, nom), _ = ordre.popleft()
+            enregistre = manifeste.resultat(chemin)
+            if enregistre is None:
+                # Fichier modifié pendant le lot : analysé sur place
+                resultat = extracteur.extraire_document(chemin, nom)
+                enregistrer(chemin, resultat)
+                yield resultat, False
+            else:
+                yield Resultat(texte="", **enregistre), True
+
+    for resultat in extracteur.extraire_lot(a_traiter(), nb_processus, max_en_cours):
+        yield from reprendre()
+        (chemin, _), _ = ordre.popleft()
+        enregistrer(chemin, resultat)
+        yield resultat, False
+    yield from reprendre()
 
-def compacter(texte: str) -> str:
-    """Supprime tout caractère non alphanumérique du texte (utile pour les IBAN)."""
-    return re.sub(r'[^A-Za-z0-9]', '', texte)
 
-#region IBAN / RIB
 # ---------------------------------------------------------------------------
-# Fonctions de gestion du RIB et IBAN
+# Lot réparti sur plusieurs machines : tranches puis fusion
 # ---------------------------------------------------------------------------
 
-def extraire_iban_valide(t: str) -> str:
-    """Recherche et valide un IBAN français dans le texte."""
-    compact = compacter(t).upper()
-    for cand in set(PAT_IBAN_FR_COMPACT.findall(compact)):
-        try:
-            if iban_lib.is_valid(cand):
-                return iban_lib.format(cand)
-        except Exception:
-            pass
-
-    # Fallback : recherche basée sur le label "IBAN"
-    for m in re.finditer(r'(?i)\bIBAN\b\s*[:\-]?\s*([A-Z0-9 ]{8,50})', t):
-        extrait = compacter(m.group(1)).upper()
-        if extrait.startswith("FR") and len(extrait) >= 27:
-            extrait = extrait[:27]
-            try:
-                if iban_lib.is_valid(extrait):
-                    return iban_lib.format(extrait)
-            except Exception:
-                continue
-    return ""
-
-def decomposer_iban_fr(iban: str):
-    """Décompose un IBAN français en code banque, guichet, numéro de compte et clé RIB."""
-    if not iban:
-        return ("", "", "", "")
+def lire_tranche(valeur: str) -> tuple:
+    """Lit une tranche 'i/N' (1 <= i <= N) en (i, N)."""
     try:
-        c = iban_lib.compact(iban).upper()
-        if not (c.startswith("FR") and iban_lib.is_valid(c)):
-            return ("", "", "", "")
-        bban = c[4:]
-        return (bban[:5], bban[5:10], bban[10:21], bban[21:23])
-    except Exception:
-        return ("", "", "", "")
-
-def lettres_vers_nombres(s: str) -> str:
-    """Convertit les lettres d'un numéro de compte en équivalent numérique (A=10, B=11, etc.)."""
-    out = []
-    for ch in s.upper():
-        if ch.isdigit():
-            out.append(ch)
-        elif 'A' <= ch <= 'Z':
-            out.append(str(10 + ord(ch) - ord('A')))
-    return ''.join(out)
-
-def calculer_cle_rib(cb: str, cg: str, nc: str) -> str:
-    """Calcule la clé RIB à partir du code banque, guichet et numéro de compte."""
-    if not (cb and cg and nc):
-        return ""
-    base = f"{cb}{cg}{lettres_vers_nombres(nc)}"
-    if not base.isdigit():
-        return ""
-    try:
-        cle = 97 - (int(base) % 97)
-        return f"{cle:02d}"
-    except Exception:
-        return ""
-
-def construire_iban_fr(cb: str, cg: str, nc: str, cle: str) -> str:
-    """Construit un IBAN français complet à partir des composantes RIB."""
-    if not all([cb, cg, nc, cle]):
-        return ""
-    bban = f"{cb}{cg}{nc}{cle}"
-    try:
-        iban = iban_lib.from_bban("FR", bban)
-        if iban_lib.is_valid(iban):
-            return iban_lib.format(iban)
-    except Exception:
-        pass
-    return ""
-
-#region BIC
-# ---------------------------------------------------------------------------
-# Fonctions d'extraction du BIC, Titulaire et Domiciliation
-# ---------------------------------------------------------------------------
-PAT_BIC_CODE = re.compile(
-    r'\b[A-Z]{4}[A-Z]{2}[A-Z0-9]{2}(?:[A-Z0-9]{3})?\b'
-)
-
-def nettoyer_bic_ocr(chunk):
-    """
-    Nettoie un code BIC extrait de l'OCR :
-    - supprime tous les caractères non alphanumériques
-    - met en majuscules
-    - tronque à 11 caractères maximum (format BIC)
+        indice, nombre = map(int, valeur.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"tranche attendue sous la forme i/N : {valeur!r}")
+    if not 1 <= indice <= nombre:
+        raise argparse.ArgumentTypeError(f"tranche hors limites : {valeur!r} (1 <= i <= N)")
+    return indice, nombre
+
+def filtrer_tranche(chemins, indice: int, nombre: int, empreinte=empreinte_fichier):
     """
-    if not chunk:
-        return ""
-
-    bic = re.sub(r'[^A-Za-z0-9]', '', chunk).upper()
-
-    # Tronque : 11 > format complet, 8 > format court
-    if len(bic) >= 11:
-        return bic[:11]
-    if len(bic) >= 8:
-        return bic[:8]
-    return ""
-
-def valider_normaliser_bic(raw: str) -> str:
+    Ne garde que les documents de la tranche `indice` sur `nombre`, attribués d'après
+    l'empreinte de leur contenu : chaque machine fait le même parcours et garde sa part,
+    sans coordination. Un même contenu (doublon sous plusieurs noms) tombe toujours dans la
+    même tranche, donc sur la machine dont le cache OCR le connaît déjà. Un document illisible
+    (disparu, membre d'archive abîmé) est attribué d'après son nom : une seule tranche en fait
+    une ligne d'erreur.
     """
-    Normalise un BIC (supprime le bruit) et le valide.
-
-    Hypothèse volontairement forte :
-    - On travaille sur des RIB français -> le code pays du BIC doit être 'FR'.
-      Si on veut accepter des banques étrangères, il faudra enlever ce test.
-    """
-    if not raw:
-        return ""
-
-    # Nettoyage brut
-    bic = re.sub(r'[^A-Za-z0-9]', '', raw.upper())
-
-    if len(bic) not in (8, 11):
-        return ""
-
-    # Filtre très fort pour éviter 'BOULOGNE', 'PARIS', etc.
-    # BIC = 4 lettres banque + 2 lettres pays + 2 alnum localisation (+ 3 optionnels)
-    if not (bic[:4].isalpha() and bic[4:6].isalpha()):
-        return ""
-
-    # Pour un RIB FR : pays = FR
-    if bic[4:6] != "FR":
-        return ""
-
-    # Validation via python-stdnum si dispo
-    if bic_lib:
+    for element in chemins:
+        chemin, nom = document(element)
         try:
-            if not bic_lib.is_valid(bic):
-                return ""
-        except Exception:
-            return ""
-
-    return bic
-
-def extraire_bic_valide(texte: str) -> str:
-    """
-    Extraction robuste du BIC :
-
-    1. Trouve une ligne contenant un label BIC / SWIFT / Code BIC / Adresse SWIFT
-    2. Regarde dans les quelques lignes suivantes pour un code BIC au bon format
-    3. Valide et normalise (FR + python-stdnum)
-    4. Fallback global sur tout le texte si aucun label trouvé
-    """
-    lignes = texte.splitlines()
-    n = len(lignes)
-
-    # 1) On cherche d'abord les zones où on parle de BIC / SWIFT
-    for i, ligne in enumerate(lignes):
-        if PAT_BIC.search(ligne):
-            # On prend une fenêtre autour (ligne du label + quelques lignes suivantes)
-            fenetre = "\n".join(lignes[i:i+6]).upper()
-
-            # a) Recherche sur la fenêtre compactée (pour gérer 'BOUS FRPP XXX')
-            compact = re.sub(r'[^A-Z0-9]', '', fenetre)
-            candidats = PAT_BIC_CODE.findall(compact)
-            for cand in candidats:
-                bic = valider_normaliser_bic(cand)
-                if bic:
-                    return bic
-
-            # b) Recherche sur la fenêtre brute (au cas où ce soit déjà bien collé)
-            candidats = PAT_BIC_CODE.findall(fenetre)
-            for cand in candidats:
-                bic = valider_normaliser_bic(cand)
-                if bic:
-                    return bic
-
-    # 2) Si aucun label trouvé ou rien de valide dans la zone → fallback global
-    texte_up = texte.upper()
-    compact_global = re.sub(r'[^A-Z0-9]', '', texte_up)
-    candidats = PAT_BIC_CODE.findall(compact_global)
-    for cand in candidats:
-        bic = valider_normaliser_bic(cand)
-        if bic:
-            return bic
-
-    return ""
-
-
-
-def extraire_titulaire(t: str) -> str:
-    """Extrait le titulaire du compte, en essayant de corriger les erreurs OCR."""
-    m = PAT_TITULAIRE.search(t)
-    if m:
-        val = m.group(2).strip().split("\n")[0].strip()
-        if len(val) > 3 and not re.search(r'\b(BIC|IBAN|DOMICILIATION)\b', val, re.I):
-            return val
-    for l in t.split('\n'):
-        if re.search(r'\b(M\.|MME|MONSIEUR|MADAME|SARL|SAS|SA|EURL|SOCIETE)\b', l, re.I):
-            return l.strip()
-    return ""
-
-def extraire_domiciliation(t: str) -> str:
+            cle = empreinte(chemin)
+        except ERREURS_LECTURE:
+            cle = ""
+        if not cle:
+            cle = hashlib.sha256((nom or chemin).encode()).hexdigest()
+        if int(cle[:16], 16) % nombre == indice - 1:
+            yield element
+
+def sortie_tranche(chemin: str, indice: int, nombre: int) -> str:
+    """Fichier de sortie d'une tranche : 'rib_infos.csv' -> 'rib_infos.2-4.csv'."""
+    base, extension = os.path.splitext(chemin)
+    return f"{base}.{indice}-{nombre}{extension}"
+
+def fusionner_tranches(entrees: list, chemin_sortie: str, format: str | None = None,
+                       flush_lignes: int = FLUSH_LIGNES) -> int:
     """
-    Extrait la domiciliation sur plusieurs lignes, jusqu'à la prochaine rubrique identifiable.
-    Combine toutes les lignes de l'agence ou de l'adresse.
+    Fusionne les sorties des tranches d'un lot (CSV, JSON Lines ou Parquet, formats
+    mélangeables) en une seule, dans l'ordre qu'aurait donné un lot unique (`cle_ordre`
+    sur la colonne Fichier). Chaque entrée est déjà dans cet ordre : la fusion est un
+    interclassement en flux, sans charger les fichiers. Renvoie le nombre de lignes écrites.
     """
-    lignes = [l.strip() for l in t.split('\n') if l.strip()]
-
-    for i, l in enumerate(lignes):
-        if re.search(r'(?i)\b(domiciliation|agence|adresse)\b', l):
-            contenu = []
-            m = re.search(r'(?i)\b(domiciliation|agence|adresse)\b[:\-\s]*(.*)', l)
-            after = m.group(2).strip() if m else ""
-            if after:
-                contenu.append(after)
-
-            for j in range(i + 1, len(lignes)):
-                nextline = lignes[j]
-                if re.search(r'(?i)\b(BIC|IBAN|TITULAIRE|COMPTE|CODE BANQUE|CLE RIB|CLÉ RIB|RIB)\b', nextline):
-                    break
-                if len(nextline) < 3:
-                    break
-                contenu.append(nextline)
-
-            dom = ' '.join(contenu)
-            dom = re.sub(r'\s{2,}', ' ', dom)
-            return dom.strip()
-
-    # Fallback heuristique si le mot-clé n'existe pas
-    for l in lignes:
-        if re.search(r'(?i)\b(\d{1,4}\s+(rue|avenue|bd|boulevard|place|impasse))\b', l):
-            return l.strip()
-    for l in lignes:
-        if 'RIB' in l.upper() and re.search(r'\d{1,4}\s', l):
-            return l.split('RIB', 1)[-1].strip(' :.-')
-    return ""
+    lectures = [lire_sortie(entree) for entree in entrees]
+    with ouvrir_sortie(chemin_sortie, COLONNES_EXPORT, format, flush_lignes=flush_lignes) as sortie:
+        for ligne in heapq.merge(*lectures, key=lambda ligne: cle_ordre(ligne["Fichier"])):
+            sortie.ecrire(recoder_codes(ligne, sortie.apostrophe))
+    return sortie.nb_lignes
 
 
 # ---------------------------------------------------------------------------
-# Extraction complète d'un texte OCR
+# Point d'entrée : analyse de tous les RIB du dossier, résultats écrits au fil de l'eau
 # ---------------------------------------------------------------------------
 
-def extraire_par_libelles(t: str):
-    """Extrait tous les champs d'un texte OCR via recherche de labels."""
-    cb = cg = nc = cle = tit = dom = ""
-    m = PAT_CODE_BANQUE.search(t);  cb = m.group(2) if m else ""
-    m = PAT_CODE_GUICHET.search(t); cg = m.group(2) if m else ""
-    m = PAT_NUM_COMPTE.search(t);   nc = m.group(2).replace(" ", "") if m else ""
-    m = PAT_CLE_RIB.search(t);      cle = m.group(2) if m else ""
-    tit = extraire_titulaire(t)
-    dom = extraire_domiciliation(t)
-    nc = re.sub(r'[^A-Z0-9]', '', nc.upper())
-    return cb, cg, nc, cle, tit, dom
-
-
-# ---------------------------------------------------------------------------
-# Boucle principale d'analyse de tous les fichiers PDF
-# ---------------------------------------------------------------------------
-
-rows = []
-
-for fichier in os.listdir(DOSSIER_PDF):
-    if not fichier.lower().endswith(".pdf"):
-        continue
-
-    chemin = os.path.join(DOSSIER_PDF, fichier)
-    print(f"OCR forcé sur {fichier}...")
-    texte = extraire_texte_ocr(chemin)
-    tclean = nettoyer(texte)
-
-    iban = extraire_iban_valide(tclean)
-    cb = cg = nc = cle = tit = dom = ""
-
-    # Décomposition éventuelle de l'IBAN
-    if iban:
-        cb, cg, nc, cle = decomposer_iban_fr(iban)
-
-    # Extraction par labels
-    lb_cb, lb_cg, lb_nc, lb_cle, lb_tit, lb_dom = extraire_par_libelles(tclean)
-    cb = cb or lb_cb
-    cg = cg or lb_cg
-    nc = nc or lb_nc
-    cle = cle or lb_cle
-    tit = lb_tit or extraire_titulaire(texte)
-    dom = lb_dom or extraire_domiciliation(texte)
-
-    # Calcul ou reconstruction si nécessaire
-    if not cle and all([cb, cg, nc]):
-        cle = calculer_cle_rib(cb, cg, nc)
-    if not iban and all([cb, cg, nc, cle]):
-        iban = construire_iban_fr(cb, cg, nc, cle)
-    bic = extraire_bic_valide(tclean)
-
-    def nz(v): return v if v else "MANQUANT"
-
-    rows.append({
-        "Fichier": fichier,
-        "Titulaire du compte": nz(tit),
-        "Code Banque": f"'{nz(cb)}",
-        "Code Guichet": f"'{nz(cg)}",
-        "N° de compte": f"'{nz(nc)}",
-        "Clé RIB": f"'{nz(cle)}",
-        "BIC / SWIFT": nz(bic),
-        "IBAN": nz(iban),
-        "Domiciliation": nz(dom)
-    })
-
-
-# ---------------------------------------------------------------------------
-# Export final en CSV (toutes les colonnes en texte)
-# ---------------------------------------------------------------------------
-
-df = pd.DataFrame(rows, dtype=str)
-df.to_csv(SORTIE_CSV, index=False, encoding="utf-8", quoting=csv.QUOTE_NONNUMERIC)
-print(f"Données exportées vers {SORTIE_CSV}")
+def main():
+    parser = argparse.ArgumentParser(description="Extraction des informations de RIB d'un dossier de PDF.")
+    parser.add_argument("dossier", nargs="?", default=DOSSIER_PDF,
+                        help="dossier des RIB à analyser : PDF, images PNG/JPEG/TIFF, archives ZIP (défaut : %(default)s)")
+    parser.add_argument("-r", "--recursif", action="store_true", help="parcourt aussi les sous-dossiers")
+    parser.add_argument("--inclure", action="append", default=[], metavar="MOTIF",
+                        help="ne retient que les documents dont le chemin relatif ou le nom correspond au motif glob "
+                             "(option répétable, ex. '2025-*/*' ou '*.pdf')")
+    parser.add_argument("--exclure", action="append", default=[], metavar="MOTIF",
+                        help="écarte les documents et dossiers correspondant au motif glob (option répétable)")
+    parser.add_argument("--sans-archives", action="store_true", help="ignore les archives ZIP")
+    parser.add_argument("-j", "--processus", type=int, default=NB_PROCESSUS,
+                        help="nombre de processus d'analyse (défaut : nombre de cœurs)")
+    parser.add_argument("--max-en-cours", type=int, default=None,
+                        help="nombre maximal de fichiers soumis simultanément (défaut : 2 par processus)")
+    parser.add_argument("--toutes-pages", action="store_true",
+                        help="lit toutes les pages même quand IBAN, BIC et titulaire sont déjà trouvés")
+    parser.add_argument("--zone-rib", action="store_true",
+                        help="OCR ciblé : repère le bloc RIB à basse résolution et n'OCRise que cette zone à 300 dpi")
+    parser.add_argument("--mise-en-page", action="store_true",
+                        help="lit aussi la position des mots (valeurs à droite ou sous leur libellé, grille RIB en colonnes)")
+    parser.add_argument("--dpi", default=",".join(map(str, ECHELLE_DPI)),
+                        help="résolutions d'OCR essayées dans l'ordre tant que le RIB n'est pas validé "
+                             "(défaut : %(default)s ; une seule valeur pour une résolution fixe)")
+    parser.add_argument("-o", "--sortie", default=None,
+                        help=f"fichier de résultats, .csv, .jsonl ou .parquet (défaut : {SORTIE_CSV})")
+    parser.add_argument("--format", choices=sorted(SORTIES),
+                        help="format de sortie (défaut : d'après l'extension du fichier de sortie)")
+    parser.add_argument("--flush", type=int, default=FLUSH_LIGNES,
+                        help=f"vide les résultats sur disque toutes les N lignes (défaut : %(default)s) "
+                             f"ou au plus tard toutes les {FLUSH_SECONDES:.0f} secondes")
+    parser.add_argument("--tranche", "--shard", type=lire_tranche, metavar="i/N",
+                        help="ne traite que la tranche i sur N du lot, répartie d'après l'empreinte du contenu "
+                             "(un lot lancé sur N machines) ; sortie par défaut : rib_infos.i-N.csv")
+    parser.add_argument("--fusionner", nargs="+", metavar="FICHIER",
+                        help="fusionne les sorties des tranches en une seule (-o), dans l'ordre d'un lot unique, puis quitte")
+    parser.add_argument("--cache", default=CHEMIN_CACHE_DEFAUT,
+                        help=f"base SQLite du cache OCR (défaut : {CHEMIN_CACHE_DEFAUT})")
+    parser.add_argument("--sans-cache", action="store_true", help="désactive le cache OCR")
+    parser.add_argument("--manifeste", default=CHEMIN_MANIFESTE_DEFAUT,
+                        help="base SQLite des fichiers déjà traités, repris sans être relus "
+                             f"(défaut : {CHEMIN_MANIFESTE_DEFAUT})")
+    parser.add_argument("--sans-manifeste", action="store_true",
+                        help="retraite tous les fichiers, sans lire ni mettre à jour le manifeste")
+    parser.add_argument("--retenter-erreurs", action="store_true",
+                        help="retraite les fichiers en erreur dans le manifeste (par défaut repris tels quels)")
+    parser.add_argument("--diagnostic", action="store_true",
+                        help="affiche le moteur OCR, sa version et les langues installées, puis quitte")
+    args = parser.parse_args()
+    if args.diagnostic:
+        for cle, valeur in diagnostic_ocr().items():
+            print(f"{cle} : {valeur}")
+        return
+    if args.fusionner:
+        chemin_sortie = args.sortie or SORTIE_CSV
+        nb_lignes = fusionner_tranches(args.fusionner, chemin_sortie, args.format, args.flush)
+        print(f"{len(args.fusionner)} tranches fusionnées vers {chemin_sortie} : {nb_lignes} lignes")
+        return
+    chemin_sortie = args.sortie or (sortie_tranche(SORTIE_CSV, *args.tranche) if args.tranche else SORTIE_CSV)
+    chemin_cache = None if args.sans_cache else args.cache
+
+    # Documents générés au fil du parcours, chaque dossier dans l'ordre alphabétique : l'ordre des
+    # lignes ne dépend pas du système de fichiers, et la liste complète n'est jamais construite
+    chemins = parcourir(args.dossier, args.recursif, args.inclure, args.exclure, archives=not args.sans_archives)
+
+    echelle_dpi = tuple(int(d) for d in args.dpi.split(","))
+
+    extracteur = ExtracteurRib(chemin_cache, arret_anticipe=not args.toutes_pages, zone_rib=args.zone_rib,
+                               echelle_dpi=echelle_dpi, mise_en_page=args.mise_en_page)
+
+    manifeste = None if args.sans_manifeste else Manifeste(args.manifeste, parametres_lecture(extracteur),
+                                                           retenter_erreurs=args.retenter_erreurs)
+    if args.tranche:
+        # Empreintes reprises du manifeste pour les fichiers inchangés : seuls les nouveaux sont relus
+        chemins = filtrer_tranche(chemins, *args.tranche, manifeste.empreinte if manifeste else empreinte_fichier)
+
+    nb_fichiers = 0
+    nb_repris = 0           # Fichiers inchangés repris du manifeste
+    nb_erreurs = 0          # Documents qui n'ont pas pu être analysés (ligne d'erreur)
+    crans_dpi = {}          # Nombre de pages OCR retenues à chaque résolution
+    succes_cache = 0
+    a_verifier = 0          # Fichiers dont au moins un champ est sous le seuil de confiance
+    # Chaque ligne est écrite dès que son fichier est analysé : mémoire constante, et les lignes
+    # déjà écrites sont conservées si le traitement est interrompu
+    with ouvrir_sortie(chemin_sortie, COLONNES_EXPORT, args.format, flush_lignes=args.flush) as sortie:
+        for resultat, repris in traiter_avec_reprise(extracteur, chemins, manifeste,
+                                                     args.processus, args.max_en_cours):
+            # CSV : codes préfixés d'une apostrophe, Excel conserve leurs zéros initiaux
+            sortie.ecrire(ligne_resultat(resultat, apostrophe=sortie.apostrophe))
+            nb_fichiers += 1
+            a_verifier += bool(resultat.a_verifier)
+            nb_erreurs += "erreur" in resultat.infos
+            if repris:
+                nb_repris += 1
+                continue
+            print(f"{resultat.fichier} : {resumer_lecture(resultat.infos)}")
+            for dpi in resultat.infos.get("dpi", []):
+                if dpi:
+                    crans_dpi[dpi] = crans_dpi.get(dpi, 0) + 1
+            succes_cache += resultat.infos.get("cache") == "succes"
+
+    print(f"Données exportées vers {chemin_sortie}")
+    if manifeste:
+        print(f"Fichiers repris du manifeste (inchangés) : {nb_repris}/{nb_fichiers}")
+    print(f"Fichiers à vérifier : {a_verifier}/{nb_fichiers} (au moins un champ sous le seuil de confiance)")
+    if nb_erreurs:
+        print(f"Fichiers en erreur : {nb_erreurs}/{nb_fichiers} (message dans la colonne À vérifier"
+              + ("" if args.retenter_erreurs or not manifeste else " ; --retenter-erreurs pour les retraiter") + ")")
+    if crans_dpi:
+        print("Pages OCR par résolution : " + ", ".join(f"{d} dpi : {n}" for d, n in sorted(crans_dpi.items())))
+    if chemin_cache:
+        stats = CacheOCR(chemin_cache).statistiques()
+        print(f"Cache OCR : {succes_cache}/{nb_fichiers - nb_repris} fichiers déjà connus, "
+              f"{stats['entrees']} documents, {stats['taille'] / 1e6:.1f} Mo")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+"""
+Configuration commune des tests : les modules de l'application (src/app) et le script de
+traitement par lot (src) sont importés comme le fait rib_extractor.py, sans installation.
+"""
+
+import os
+import sys
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RACINE, "src", "app"))
+sys.path.insert(0, os.path.join(RACINE, "src"))
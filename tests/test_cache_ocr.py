@@ -0,0 +1,45 @@
+"""Cache disque des pages (`CacheOCR`) : taille tenue en mémoire et éviction LRU."""
+
+from cache_ocr import CacheOCR
+
+
+def entree(n: int) -> dict:
+    """Entrée d'une page, d'environ `n` caractères de texte."""
+    return {"pages": ["x" * n], "sources": ["texte"], "dpi": [None], "tableaux": [[]]}
+
+
+def test_taille_tenue_a_jour(tmp_path):
+    cache = CacheOCR(str(tmp_path / "ocr.sqlite"), taille_max=10_000)
+    for k in range(5):
+        cache.ecrire(f"doc{k}", entree(100))
+    cache.ecrire("doc2", entree(1000))   # entrée remplacée : sa taille précédente est libérée
+    assert cache._taille == cache.statistiques()["taille"] == cache._taille_base()
+    cache.fermer()
+
+    # Réouverture : le total repart de la base
+    cache = CacheOCR(str(tmp_path / "ocr.sqlite"), taille_max=10_000)
+    assert cache._taille == cache.statistiques()["taille"]
+    assert cache.statistiques()["entrees"] == 5
+
+
+def test_eviction_lru(tmp_path):
+    taille = len('{"pages": ["' + "x" * 1000 + '"], "sources": ["texte"], "dpi": [null], "tableaux": [[]]}')
+    cache = CacheOCR(str(tmp_path / "ocr.sqlite"), taille_max=3 * taille)
+    for k in range(3):
+        cache.ecrire(f"doc{k}", entree(1000))
+    assert cache.lire("doc0") is not None   # doc0 redevient le plus récent : doc1 part en premier
+    cache.ecrire("doc3", entree(1000))
+    assert cache.lire("doc1") is None
+    assert all(cache.lire(f"doc{k}") is not None for k in (0, 2, 3))
+    assert cache._taille == cache._taille_base() == 3 * taille
+
+
+def test_ecritures_d_un_autre_processus(tmp_path):
+    # Deux connexions sur la même base : chacune ignore les écritures de l'autre dans son total,
+    # qui est recalculé avant d'évincer ; la base reste bornée
+    chemin = str(tmp_path / "ocr.sqlite")
+    a, b = CacheOCR(chemin, taille_max=5000), CacheOCR(chemin, taille_max=5000)
+    for k in range(20):
+        (a if k % 2 else b).ecrire(f"doc{k}", entree(1000))
+    assert a._taille_base() <= 5000
+    assert b.lire("doc19") is not None
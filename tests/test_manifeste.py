@@ -0,0 +1,171 @@
+"""Manifeste des lots : reprise des fichiers inchangés, invalidation, fichiers en erreur."""
+
+import os
+import json
+import zipfile
+
+import pytest
+
+from manifeste import Manifeste, empreinte_fichier
+from extracteur import Resultat, ExtracteurRib, VERSION_EXTRACTION, resultat_erreur
+from rib_extractor import traiter_avec_reprise, parametres_lecture
+
+
+@pytest.fixture
+def manifeste(tmp_path):
+    manifeste = Manifeste(str(tmp_path / "manifeste.sqlite"), "p1")
+    yield manifeste
+    manifeste.fermer()
+
+
+def ecrire(chemin, contenu: bytes, mtime_ns: int | None = None):
+    chemin.write_bytes(contenu)
+    if mtime_ns is not None:
+        os.utime(chemin, ns=(mtime_ns, mtime_ns))
+    return str(chemin)
+
+
+def test_fichier_inchange_repris(tmp_path, manifeste):
+    chemin = ecrire(tmp_path / "a.pdf", b"%PDF a")
+    assert manifeste.resultat(chemin) is None
+    manifeste.enregistrer(chemin, {"champs": {"iban": "X"}})
+    assert manifeste.resultat(chemin) == {"champs": {"iban": "X"}}
+    assert manifeste.statistiques() == {"fait": 1}
+
+
+def test_fichier_modifie_retraite(tmp_path, manifeste):
+    chemin = ecrire(tmp_path / "a.pdf", b"%PDF a", 10**18)
+    manifeste.enregistrer(chemin, {"n": 1})
+    # Même taille, autre contenu, autre date
+    ecrire(tmp_path / "a.pdf", b"%PDF b", 2 * 10**18)
+    assert manifeste.resultat(chemin) is None
+    # Autre taille, même date
+    ecrire(tmp_path / "a.pdf", b"%PDF aa", 10**18)
+    assert manifeste.resultat(chemin) is None
+
+
+def test_fichier_touche_repris(tmp_path, manifeste):
+    chemin = ecrire(tmp_path / "a.pdf", b"%PDF a", 10**18)
+    manifeste.enregistrer(chemin, {"n": 1})
+    ecrire(tmp_path / "a.pdf", b"%PDF a", 2 * 10**18)
+    assert manifeste.resultat(chemin) == {"n": 1}
+    # La nouvelle date est enregistrée : l'empreinte n'est plus recalculée
+    assert manifeste.empreinte(chemin) == empreinte_fichier(chemin)
+    mtime, = manifeste._conn.execute("SELECT mtime FROM fichiers").fetchone()
+    assert mtime == 2 * 10**18
+
+
+def test_autres_parametres(tmp_path, manifeste):
+    chemin = ecrire(tmp_path / "a.pdf", b"%PDF a")
+    manifeste.enregistrer(chemin, {"n": 1})
+    autre = Manifeste(manifeste.chemin, "p2")
+    try:
+        assert autre.resultat(chemin) is None
+    finally:
+        autre.fermer()
+
+
+def test_erreur_reprise_ou_retentee(tmp_path, manifeste):
+    chemin = ecrire(tmp_path / "a.pdf", b"%PDF a")
+    manifeste.enregistrer(chemin, {"infos": {"erreur": "ValueError: illisible"}}, statut="erreur")
+    assert manifeste.resultat(chemin) == {"infos": {"erreur": "ValueError: illisible"}}
+    assert manifeste.statistiques() == {"erreur": 1}
+    retente = Manifeste(manifeste.chemin, "p1", retenter_erreurs=True)
+    try:
+        assert retente.resultat(chemin) is None
+    finally:
+        retente.fermer()
+
+
+def test_fichier_disparu(tmp_path, manifeste):
+    chemin = str(tmp_path / "absent.pdf")
+    assert manifeste.resultat(chemin) is None
+    manifeste.enregistrer(chemin, {"n": 1})
+    assert manifeste.statistiques() == {}
+
+
+def test_membre_archive(tmp_path, manifeste):
+    archive = tmp_path / "lot.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("client/a.pdf", b"%PDF a")
+    membre = os.path.join(str(archive), "client", "a.pdf")
+    assert empreinte_fichier(membre) == empreinte_fichier(ecrire(tmp_path / "a.pdf", b"%PDF a"))
+    manifeste.enregistrer(membre, {"n": 1})
+    assert manifeste.resultat(membre) == {"n": 1}
+    # Archive réécrite avec un autre contenu : le membre est retraité
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("client/a.pdf", b"%PDF b")
+    os.utime(archive, ns=(10**18, 10**18))
+    assert manifeste.resultat(membre) is None
+
+
+def test_parametres_lecture():
+    parametres = json.loads(parametres_lecture(ExtracteurRib(None, mise_en_page=True)))
+    assert parametres["mise_en_page"] is True
+    assert parametres["version_extraction"] == VERSION_EXTRACTION
+    assert "annuaire" in parametres and "version" in parametres
+    assert "chemin_cache" not in parametres
+    assert parametres != json.loads(parametres_lecture(ExtracteurRib(None)))
+
+
+# ---------------------------------------------------------------------------
+# Reprise d'un lot complet (traiter_avec_reprise), avec un extracteur qui compte ses lectures
+# ---------------------------------------------------------------------------
+
+class ExtracteurCompteur:
+    """Extracteur de test : un document contenant b'erreur' échoue, les autres donnent une page."""
+
+    def __init__(self):
+        self.lus = []
+
+    def extraire_document(self, chemin, nom=None):
+        nom = nom or os.path.basename(chemin)
+        self.lus.append(nom)
+        with open(chemin, "rb") as f:
+            donnees = f.read()
+        if b"erreur" in donnees:
+            return resultat_erreur(nom, ValueError("illisible"))
+        return Resultat(nom, "", {"iban": donnees.decode()}, {}, [], {"nb_pages": 1, "sources": [], "dpi": []})
+
+    def extraire_lot(self, chemins, nb_processus=1, max_en_cours=None):
+        for chemin, nom in chemins:
+            yield self.extraire_document(chemin, nom)
+
+
+def lot(extracteur, manifeste, dossier):
+    chemins = [(str(dossier / nom), nom) for nom in sorted(os.listdir(dossier))]
+    return [(r.fichier, r.champs.get("iban"), repris) for r, repris in traiter_avec_reprise(extracteur, chemins, manifeste)]
+
+
+def test_reprise_lot(tmp_path, manifeste):
+    dossier = tmp_path / "rib"
+    dossier.mkdir()
+    for nom, contenu in (("a.pdf", b"A"), ("b.pdf", b"erreur"), ("c.pdf", b"C")):
+        ecrire(dossier / nom, contenu)
+
+    extracteur = ExtracteurCompteur()
+    premier = lot(extracteur, manifeste, dossier)
+    assert [(f, repris) for f, _, repris in premier] == [("a.pdf", False), ("b.pdf", False), ("c.pdf", False)]
+    assert manifeste.statistiques() == {"fait": 2, "erreur": 1}
+
+    # Relance : tout est repris dans l'ordre, y compris la ligne d'erreur, sans rien relire
+    extracteur.lus.clear()
+    assert lot(extracteur, manifeste, dossier) == [(f, iban, True) for f, iban, _ in premier]
+    assert extracteur.lus == []
+
+    # Un fichier modifié et un nouveau fichier : seuls eux sont relus, l'ordre est conservé
+    ecrire(dossier / "c.pdf", b"CC")
+    ecrire(dossier / "ab.pdf", b"AB")
+    resultats = lot(extracteur, manifeste, dossier)
+    assert [f for f, _, _ in resultats] == ["a.pdf", "ab.pdf", "b.pdf", "c.pdf"]
+    assert extracteur.lus == ["ab.pdf", "c.pdf"]
+    assert resultats[3] == ("c.pdf", "CC", False)
+
+    # Avec retenter_erreurs, seul le fichier en erreur est relu
+    retente = Manifeste(manifeste.chemin, manifeste.parametres, retenter_erreurs=True)
+    try:
+        extracteur.lus.clear()
+        lot(extracteur, retente, dossier)
+        assert extracteur.lus == ["b.pdf"]
+    finally:
+        retente.fermer()
@@ -0,0 +1,101 @@
+"""Calcul mod 97 en flux (tables de transitions) : clé d'IBAN et clé RIB."""
+
+import random
+import string
+
+import pytest
+from stdnum import iban as iban_lib
+
+from utils import (
+    reste_mod97, iban_fr_valide, rib_valide, calculer_cle_rib, construire_iban_fr, decomposer_iban_fr,
+    TRANSITIONS_CLE_RIB, VALEURS_CLE_RIB,
+)
+
+
+def reste_grand_entier(chaine: str) -> int:
+    """Référence : chaîne convertie en grand entier (A=10 … Z=35), puis modulo 97."""
+    return int("".join(str(int(c, 36)) for c in chaine)) % 97
+
+
+def cle_rib_grand_entier(cb: str, cg: str, nc: str) -> str:
+    """Référence : formule de la clé RIB, lettres du compte converties par VALEURS_CLE_RIB."""
+    compte = "".join(str(VALEURS_CLE_RIB[c]) for c in nc.upper())
+    return f"{97 - int(cb + cg + compte + '00') % 97:02d}"
+
+
+@pytest.mark.parametrize("cb, cg, nc, cle", [
+    ("30006", "00001", "12345678901", "89"),
+    ("30004", "00123", "00012345678", "43"),
+    ("20041", "01005", "05000130260", "52"),
+    ("10278", "06039", "00020154201", "97"),
+])
+def test_cle_rib(cb, cg, nc, cle):
+    assert calculer_cle_rib(cb, cg, nc) == cle
+    assert rib_valide(cb + cg + nc + cle)
+
+
+def test_cle_rib_compte_avec_lettres():
+    alea = random.Random(0)
+    for _ in range(500):
+        cb, cg = f"{alea.randrange(10**5):05d}", f"{alea.randrange(10**5):05d}"
+        nc = "".join(alea.choice(string.digits + string.ascii_uppercase) for _ in range(11))
+        cle = cle_rib_grand_entier(cb, cg, nc)
+        assert calculer_cle_rib(cb, cg, nc) == cle
+        assert rib_valide(cb + cg + nc + cle)
+        assert not rib_valide(cb + cg + nc + f"{(int(cle) + 1) % 100:02d}")
+
+
+def test_cle_rib_incalculable():
+    assert calculer_cle_rib("", "00001", "12345678901") == ""
+    assert calculer_cle_rib("3000A", "00001", "12345678901") == ""
+    assert not rib_valide("3000600001123456789018")   # 22 caractères
+
+
+def test_reste_comme_grand_entier():
+    alea = random.Random(1)
+    for _ in range(1000):
+        chaine = "".join(alea.choice(string.digits + string.ascii_uppercase) for _ in range(alea.randrange(1, 40)))
+        assert reste_mod97(chaine) == reste_grand_entier(chaine)
+    # Reste de départ : lecture d'une chaîne en deux morceaux
+    assert reste_mod97("FR76", reste_mod97("30006000011234567890189")) == 1
+
+
+def test_reste_caractere_invalide():
+    assert reste_mod97("3000-6") is None
+    assert reste_mod97("30006É") is None
+    assert reste_mod97("3000600001A", 0, TRANSITIONS_CLE_RIB) is not None
+
+
+def test_construire_iban():
+    assert construire_iban_fr("30006", "00001", "12345678901", "89") == "FR76 3000 6000 0112 3456 7890 189"
+    assert construire_iban_fr("30006", "00001", "12345678901", "") == ""
+
+
+def test_iban_comme_stdnum():
+    alea = random.Random(2)
+    ibans = []
+    for _ in range(300):
+        cb, cg = f"{alea.randrange(10**5):05d}", f"{alea.randrange(10**5):05d}"
+        nc = "".join(alea.choice(string.digits + "ABCXYZ") for _ in range(11))
+        iban = construire_iban_fr(cb, cg, nc, cle_rib_grand_entier(cb, cg, nc)).replace(" ", "")
+        # IBAN valide, puis le même avec un caractère altéré
+        position = alea.randrange(4, 27)
+        altere = iban[:position] + ("1" if iban[position] != "1" else "2") + iban[position + 1:]
+        ibans += [iban, altere]
+    assert [iban_fr_valide(i) for i in ibans] == [iban_lib.is_valid(i) for i in ibans]
+    assert sum(map(iban_fr_valide, ibans)) == 300
+
+
+def test_iban_structure():
+    assert iban_fr_valide("FR7630006000011234567890189")
+    assert not iban_fr_valide("FR763000600001123456789018")     # trop court
+    assert not iban_fr_valide("DE89370400440532013000")         # pas un IBAN français
+    assert not iban_fr_valide("fr7630006000011234567890189")    # attendu compact et en majuscules
+
+
+def test_decomposer_iban():
+    codes = ("30006", "00001", "12345678901", "89")
+    assert decomposer_iban_fr("FR7630006000011234567890189") == codes
+    assert decomposer_iban_fr("fr76 3000 6000 0112 3456 7890 189") == codes
+    assert decomposer_iban_fr("FR7630006000011234567890188") == ("", "", "", "")   # clé fausse
+    assert decomposer_iban_fr("") == ("", "", "", "")
@@ -0,0 +1,49 @@
+"""Mots OCR et leur confiance (`MotsOCR`) : pages à relire et réparation d'IBAN guidée par la confiance."""
+
+from utils import MotsOCR, Mot, reparer_iban_mots, reparer_iban_texte, CONFIANCE_SURE, SEUIL_RELECTURE
+
+IBAN = "FR7630006000011234567890189"
+# '5' du numéro de compte lu 'S' : une substitution de la table des confusions le répare
+GROUPES_MAL_LUS = ["IBAN", "FR76", "3000", "6000", "0112", "34S6", "7890", "189"]
+
+
+def ligne(groupes, confiances) -> list:
+    """Mots d'une ligne, de gauche à droite, avec leur confiance."""
+    return [Mot(g, 50 + 40 * i, 700, 80 + 40 * i, 710, c) for i, (g, c) in enumerate(zip(groupes, confiances))]
+
+
+def test_pages_a_relire():
+    pages = [
+        ligne(["Code", "banque", "30006"], [100, 100, 100]),
+        ligne(["C0de", "guichet", "OOO01"], [40, 70, 30]),
+        None,
+        ligne(["Clé", "RIB", "89"], [SEUIL_RELECTURE] * 3),
+    ]
+    mots = MotsOCR(pages)
+    assert mots.nb_pages == 4 and len(mots) == 9
+    # Page 2 sous le seuil ; page sans mots et page au seuil exact non relues
+    assert mots.pages_a_relire() == [2]
+    assert mots.pages_a_relire(seuil=100) == [2, 4]
+    assert [m.texte for m in mots.page(2)] == ["C0de", "guichet", "OOO01"]
+
+
+def test_reparation_du_caractere_peu_sur():
+    confiances = [CONFIANCE_SURE + 1] * 8
+    confiances[GROUPES_MAL_LUS.index("34S6")] = 40
+    mots = MotsOCR([ligne(["Relevé", "d'identité"], [90, 90]), ligne(GROUPES_MAL_LUS, confiances)])
+    assert reparer_iban_mots(mots) == IBAN
+
+
+def test_caractere_sur_jamais_remplace():
+    # Même lecture, mais tous les mots sont sûrs : la réparation par le texte seul la trouverait
+    mots = MotsOCR([ligne(GROUPES_MAL_LUS, [CONFIANCE_SURE] * 8)])
+    assert reparer_iban_mots(mots) == ""
+    assert reparer_iban_texte(" ".join(GROUPES_MAL_LUS)) == IBAN
+
+
+def test_reparations_differentes_sur_deux_pages():
+    # Deux IBAN différents réparés : aucune réparation n'est sûre
+    autre = ["FR76", "3000", "4000", "0312", "34S6", "7890", "143"]
+    confiances = [40] * 8
+    mots = MotsOCR([ligne(GROUPES_MAL_LUS, confiances), ligne(autre, confiances)])
+    assert reparer_iban_mots(mots) == ""
@@ -0,0 +1,116 @@
+"""Confrontation des sources d'un RIB (`reconcilier_rib`) : valeurs retenues et niveaux de confiance."""
+
+import pytest
+
+from utils import (
+    reconcilier_rib, champs_a_verifier, POIDS_SOURCES, BONUS_CLE_RIB, BONUS_ANNUAIRE, CONFIANCE_AMBIGUE,
+    CONFIANCE_BIC_COHERENT, SEUIL_CONFIANCE, CHAMPS_RIB,
+)
+from annuaire_banques import annuaire_banques
+
+IBAN = "FR76 3000 6000 0112 3456 7890 189"
+CODES = ("30006", "00001", "12345678901", "89")
+LIBELLES = "Code banque : 30006\nCode guichet : 00001\nN° de compte : 12345678901\nClé RIB : 89"
+NOMS_CODES = ("code_banque", "code_guichet", "numero_compte", "cle_rib")
+
+# Le code banque 30006 est dans l'annuaire livré : il reçoit en plus BONUS_ANNUAIRE
+pytestmark = pytest.mark.skipif(annuaire_banques() is None or not annuaire_banques().connu("30006"),
+                                reason="annuaire des banques absent")
+
+
+def verifier(champs, confiances, attendue, iban=IBAN):
+    """Codes et IBAN attendus, avec la confiance `attendue` (celle du code banque en plus du bonus annuaire)."""
+    assert tuple(champs[nom] for nom in NOMS_CODES) == CODES
+    assert champs["iban"] == iban
+    assert confiances["code_banque"] == pytest.approx(min(1.0, attendue + BONUS_ANNUAIRE))
+    for nom in ("code_guichet", "numero_compte", "cle_rib", "iban"):
+        assert confiances[nom] == pytest.approx(attendue)
+
+
+def test_iban_seul():
+    verifier(*reconcilier_rib(f"IBAN : {IBAN}"), POIDS_SOURCES["iban"] + BONUS_CLE_RIB)
+
+
+def test_iban_et_grille_concordants():
+    texte = f"Banque Guichet Compte Clé\n{' '.join(CODES)}\nIBAN : {IBAN}"
+    verifier(*reconcilier_rib(texte), 1.0)
+
+
+def test_libelles_cle_verifiee():
+    champs, confiances = reconcilier_rib(LIBELLES)
+    verifier(champs, confiances, POIDS_SOURCES["libelle"] + BONUS_CLE_RIB)
+    assert set(NOMS_CODES) <= set(champs_a_verifier(confiances))
+
+
+def test_cle_absente_calculee():
+    # La clé calculée ne vaut pas mieux que les codes dont elle découle (pas de bonus de clé)
+    champs, confiances = reconcilier_rib(LIBELLES.rsplit("\n", 1)[0])
+    verifier(champs, confiances, POIDS_SOURCES["libelle"])
+
+
+def test_iban_repare():
+    verifier(*reconcilier_rib("IBAN : FR76 3000 6000 0112 34S6 7890 189"),
+             POIDS_SOURCES["reparation"] + BONUS_CLE_RIB)
+
+
+def test_tableau():
+    verifier(*reconcilier_rib("", tableaux=[[CODES]]), POIDS_SOURCES["tableau"] + BONUS_CLE_RIB)
+
+
+def test_tableau_prefere_aux_libelles():
+    # Libellés qui lisent un autre compte (clé fausse) : la grille du tableau, vérifiée par la clé, l'emporte
+    texte = LIBELLES.replace("12345678901", "12345678907")
+    champs, confiances = reconcilier_rib(texte, tableaux=[[CODES]])
+    assert tuple(champs[nom] for nom in NOMS_CODES) == CODES
+    assert confiances["numero_compte"] == pytest.approx(POIDS_SOURCES["tableau"] + BONUS_CLE_RIB)
+    assert confiances["code_guichet"] == pytest.approx(1.0)
+
+
+def test_iban_l_emporte_sur_une_grille_fausse():
+    texte = f"30006 00001 12345678902 89\nIBAN : {IBAN}"
+    champs, _ = reconcilier_rib(texte)
+    assert champs["numero_compte"] == "12345678901"
+
+
+def test_deux_rib_differents():
+    texte = f"IBAN : {IBAN}\nIBAN : FR76 3000 4001 2300 0123 4567 843"
+    champs, confiances = reconcilier_rib(texte)
+    assert champs["iban"] == IBAN          # le premier, à égalité
+    for nom in (*NOMS_CODES, "iban"):
+        assert confiances[nom] <= CONFIANCE_AMBIGUE
+
+
+def test_bic_confronte_a_l_annuaire():
+    _, confiances = reconcilier_rib(f"IBAN : {IBAN}\nBIC : AGRIFRPPXXX")
+    assert confiances["bic"] >= CONFIANCE_BIC_COHERENT
+    # BIC d'une autre banque que celle de l'IBAN
+    champs, confiances = reconcilier_rib(f"IBAN : {IBAN}\nBIC : SOGEFRPPXXX")
+    assert champs["bic"] == "SOGEFRPPXXX"
+    assert confiances["bic"] <= CONFIANCE_AMBIGUE
+    assert "bic" in champs_a_verifier(confiances)
+
+
+def test_bic_sans_libelle():
+    # Tout BIC au bon format est retenu ; l'annuaire ne donne qu'un bonus de confiance
+    champs, confiances = reconcilier_rib("Agence de Lyon\nZZZZFRPP")
+    assert champs["bic"] == "ZZZZFRPP"
+    assert confiances["bic"] == 0.5
+    champs, confiances = reconcilier_rib("Agence de Lyon\nSOGEFRPP")
+    assert confiances["bic"] == 0.5 + BONUS_ANNUAIRE
+    # Celui d'une banque connue passe avant, même plus loin dans le texte
+    champs, _ = reconcilier_rib("Réf. ZZZZFRPP\nAgence SOGEFRPPXXX")
+    assert champs["bic"] == "SOGEFRPPXXX"
+
+def test_texte_vide():
+    champs, confiances = reconcilier_rib("")
+    assert set(champs) == set(confiances) == set(CHAMPS_RIB)
+    assert not any(champs.values())
+    assert not any(confiances.values())
+    assert champs_a_verifier(confiances) == list(CHAMPS_RIB)
+
+
+def test_confiances_bornees():
+    _, confiances = reconcilier_rib(f"Titulaire : M. JEAN DUPONT\n{' '.join(CODES)}\nIBAN : {IBAN}\nBIC : AGRIFRPPXXX")
+    assert all(0.0 <= c <= 1.0 for c in confiances.values())
+    assert not {"code_banque", "iban", "bic"} & set(champs_a_verifier(confiances))
+    assert SEUIL_CONFIANCE <= confiances["iban"]
@@ -0,0 +1,84 @@
+"""Réparation des IBAN mal lus par l'OCR : réparation unique retenue, cas ambigus rejetés."""
+
+from array import array
+
+import pytest
+
+from utils import (
+    reparer_iban_fr, reparer_iban_texte, iban_fr_valide, rib_valide, page_validee, champs_resolus,
+    extraire_iban_valide, MAX_CORRECTIONS_IBAN,
+)
+
+IBAN = "FR7630006000011234567890189"
+
+
+def valide(iban: str) -> bool:
+    return iban_fr_valide(iban) and rib_valide(iban[4:])
+
+
+def test_iban_juste_inchange():
+    assert reparer_iban_fr(IBAN) == IBAN
+
+
+@pytest.mark.parametrize("lu", [
+    "FR763OOO6000011234567890189",   # lettres à la place de chiffres du code banque
+    "FR7630006000011234S67890189",   # S lu pour 5 dans le numéro de compte
+    "FR76300060000112345678901B9",   # B lu pour 8 dans la clé RIB
+    "FR7630006000011234567B9O189",   # deux caractères du compte
+])
+def test_reparation_unique(lu):
+    assert reparer_iban_fr(lu) == IBAN
+
+
+def test_reparation_ambigue_rejetee():
+    # Deux réparations d'une seule substitution donnent chacune un IBAN valide (G -> 6 ou 5 -> S) :
+    # aucune n'est sûre
+    lu = "FR7616311404465524883G45406"
+    assert valide("FR7616311404465524883645406") and valide("FR7616311404465524883G4S406")
+    assert reparer_iban_fr(lu) == ""
+
+
+@pytest.mark.parametrize("lu", [
+    "FR7630006000011234567890",      # longueur
+    "DE7630006000011234567890189",   # pays
+    "FR7630006000011234-67890189",   # caractère non alphanumérique
+    "FR763000X000011234567890189",   # lettre sans chiffre confondable à une place numérique
+    "FR7699999000011234567890189",   # aucune substitution ne rend les deux clés justes
+])
+def test_irreparable(lu):
+    assert reparer_iban_fr(lu) == ""
+
+
+def test_trop_de_corrections():
+    lu = "FR76" + "O" * (MAX_CORRECTIONS_IBAN + 1) + IBAN[4 + MAX_CORRECTIONS_IBAN + 1:]
+    assert reparer_iban_fr(lu) == ""
+
+
+def test_confiance_sure_jamais_remplacee():
+    lu = "FR7630006000011234S67890189"
+    confiances = array("b", [90] * 27)
+    assert reparer_iban_fr(lu, confiances) == IBAN
+    confiances[lu.index("S")] = 99
+    assert reparer_iban_fr(lu, confiances) == ""
+
+
+def test_texte_une_seule_reparation():
+    assert reparer_iban_texte("IBAN : FR76 3000 6000 0112 34S6 7890 189") == IBAN
+    # Même IBAN mal lu deux fois de deux façons : une seule réparation
+    assert reparer_iban_texte("FR76 3000 6000 0112 34S6 7890 189\nFR76 3OOO 6000 0112 3456 7890 189") == IBAN
+
+
+def test_texte_deux_iban_differents_rejetes():
+    autre = "FR76 3000 4001 2300 0123 4567 B43"
+    assert reparer_iban_texte(autre) == "FR7630004001230001234567843"
+    assert reparer_iban_texte(f"FR76 3000 6000 0112 34S6 7890 189\n{autre}") == ""
+
+
+def test_iban_repare_ne_valide_pas_la_page():
+    # Une page n'est validée (arrêt de l'échelle de résolutions, arrêt anticipé) que sur un IBAN
+    # juste tel que lu : la réparation n'intervient qu'à la confrontation des sources
+    texte = "Titulaire : M. JEAN DUPONT\nIBAN : FR76 3000 4008 2800 O123 4567 841\nBIC : BNPAFRPPXXX"
+    assert extraire_iban_valide(texte) == ""
+    assert not page_validee(texte)
+    assert not champs_resolus(texte)
+    assert page_validee(texte.replace("O123", "0123"))
@@ -0,0 +1,118 @@
+"""Grille RIB des PDF natifs lue comme un tableau : `lire_tableau_rib` et `tableaux_rib` (pdfplumber)."""
+
+import io
+
+import pytest
+import pdfplumber
+
+from utils import lire_tableau_rib, tableaux_rib
+
+canvas = pytest.importorskip("reportlab.pdfgen.canvas")
+
+CODES = ("30006", "00001", "12345678901", "89")
+ENTETES = ("Code banque", "Code guichet", "N° de compte", "Clé RIB")
+
+
+def pdf(dessiner) -> bytes:
+    """PDF d'une page A4 dessinée par `dessiner(c)` (canevas reportlab, origine en bas à gauche)."""
+    tampon = io.BytesIO()
+    c = canvas.Canvas(tampon, pagesize=(595, 842))
+    c.setFont("Helvetica", 10)
+    dessiner(c)
+    c.showPage()
+    c.save()
+    return tampon.getvalue()
+
+
+def lire(donnees: bytes) -> tuple:
+    """(grilles lues par `tableaux_rib`, tableaux trouvés par `find_tables`) de la première page."""
+    with pdfplumber.open(io.BytesIO(donnees)) as doc:
+        page = doc.pages[0]
+        return tableaux_rib(page, page.extract_text() or ""), page.find_tables()
+
+
+def grille_a_filets(c, colonnes=(60, 160, 260, 400, 480), lignes=(700, 680, 660)):
+    """Grille horizontale entièrement tracée : en-têtes puis valeurs."""
+    for y in lignes:
+        c.line(colonnes[0], y, colonnes[-1], y)
+    for x in colonnes:
+        c.line(x, lignes[0], x, lignes[-1])
+    for x, entete, valeur in zip(colonnes, ENTETES, CODES):
+        c.drawString(x + 4, lignes[0] - 14, entete)
+        c.drawString(x + 4, lignes[1] - 14, valeur)
+
+
+def test_grille_a_filets():
+    grilles, tables = lire(pdf(grille_a_filets))
+    assert tables
+    assert grilles == [CODES]
+
+
+def test_grille_verticale_a_filets():
+    def dessiner(c):
+        for y in range(700, 599, -20):
+            c.line(60, y, 300, y)
+        for x in (60, 180, 300):
+            c.line(x, 700, x, 620)
+        for k, (entete, valeur) in enumerate(zip(ENTETES, CODES)):
+            c.drawString(64, 686 - 20 * k, entete)
+            c.drawString(184, 686 - 20 * k, valeur)
+    assert lire(pdf(dessiner))[0] == [CODES]
+
+
+def test_grille_sans_filets():
+    # Valeurs centrées sous leur libellé, plus étroites ou plus larges que lui : seules les
+    # colonnes tracées entre les cellules de l'en-tête les rattachent au bon champ
+    def dessiner(c):
+        for x, entete, valeur in zip((60, 170, 290, 430), ENTETES, CODES):
+            c.drawString(x, 700, entete)
+            c.drawCentredString(x + c.stringWidth(entete) / 2, 684, valeur)
+    grilles, tables = lire(pdf(dessiner))
+    assert not tables
+    assert grilles == [CODES]
+
+
+def test_grille_sans_filets_colonne_vide():
+    # Guichet absent de la ligne des valeurs : les autres codes restent dans leur colonne
+    def dessiner(c):
+        for x, entete in zip((60, 170, 290, 430), ENTETES):
+            c.drawString(x, 700, entete)
+        for x, valeur in zip((60, 290, 430), (CODES[0], CODES[2], CODES[3])):
+            c.drawString(x, 684, valeur)
+    assert lire(pdf(dessiner))[0] == [(CODES[0], "", CODES[2], CODES[3])]
+
+
+def test_valeurs_trop_loin_de_l_en_tete():
+    def dessiner(c):
+        for x, entete in zip((60, 170, 290, 430), ENTETES):
+            c.drawString(x, 700, entete)
+        for x, valeur in zip((60, 170, 290, 430), CODES):
+            c.drawString(x, 600, valeur)
+    assert lire(pdf(dessiner))[0] == []
+
+
+def test_page_sans_libelles_de_grille():
+    def dessiner(c):
+        c.drawString(60, 700, "Conditions générales")
+        c.drawString(60, 684, " ".join(CODES))
+    assert lire(pdf(dessiner))[0] == []
+
+
+# ---------------------------------------------------------------------------
+# Lecture d'un tableau déjà extrait (listes de cellules)
+# ---------------------------------------------------------------------------
+
+def test_lire_tableau_horizontal():
+    assert lire_tableau_rib([list(ENTETES), ["30006", "00001", "1234 5678 901", "89"]]) == CODES
+
+
+def test_lire_tableau_vertical():
+    assert lire_tableau_rib([[e, v] for e, v in zip(ENTETES, CODES)]) == CODES
+
+
+def test_lire_tableau_format_exact():
+    # Cellule au mauvais format (4 chiffres pour la banque) : le champ reste vide
+    assert lire_tableau_rib([list(ENTETES), ["3000", "00001", "12345678901", "89"]]) == ("", *CODES[1:])
+    # Moins de deux codes lus : pas une grille RIB
+    assert lire_tableau_rib([list(ENTETES), ["3000", "0001", "123", "89"]]) is None
+    assert lire_tableau_rib([["Titulaire", "M. DUPONT"], [None, ""]]) is None
@@ -0,0 +1,31 @@
+"""Index d'un texte (`balayer`) : correspondance des positions du texte compacté vers le texte."""
+
+from utils import balayer, candidats_iban, compacter_majuscules
+
+IBAN = "FR7630006000011234567890189"
+AUTRE = "FR7630004000031234567890143"
+
+
+def test_positions_compactes_vers_texte():
+    # Séparateurs, sauts de ligne et caractères non ASCII (retirés de `compact`) entre les caractères gardés
+    texte = "Clé  RIB :\t89\nDomicilié à  l'agence — n° 12\n\nIBAN : fr76 3000-6000 0112 3456 7890 189 €"
+    b = balayer(texte)
+    assert len(b.compact) == sum(c.isascii() and c.isalnum() for c in texte)
+    for k, c in enumerate(b.compact):
+        assert texte[b.position_originale(k)].upper() == c
+
+
+def test_position_iban_dans_le_texte():
+    texte = "Réf. é-2024\nIBAN : fr76 3000-6000 0112 3456 7890 189 €\nBIC : AGRIFRPP"
+    b = balayer(texte)
+    assert b.ibans == [IBAN]
+    position = b.positions_ibans[IBAN]
+    assert compacter_majuscules(texte[position.debut:position.fin]) == IBAN
+    assert texte[position.debut:position.fin].startswith("fr76") and texte[position.fin - 1] == "9"
+    assert position.ligne == 1
+
+
+def test_iban_du_libelle_prefere():
+    # L'IBAN sous le libellé passe avant celui lu plus haut dans le texte
+    texte = f"Émetteur {AUTRE}\nTitulaire : M. DUPONT\nIBAN :\n{IBAN}"
+    assert list(candidats_iban(texte)) == [IBAN, AUTRE]
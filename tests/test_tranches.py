@@ -0,0 +1,107 @@
+"""Lot réparti en tranches : attribution des documents (`filtrer_tranche`) et fusion des sorties."""
+
+import os
+import zipfile
+import argparse
+
+import pytest
+
+from parcours import parcourir
+from sorties import ouvrir_sortie, lire_sortie
+from extracteur import COLONNES_EXPORT, recoder_codes
+from rib_extractor import lire_tranche, filtrer_tranche, sortie_tranche, fusionner_tranches
+
+
+@pytest.fixture
+def depot(tmp_path):
+    """Arborescence de dépôt : sous-dossiers, noms qui se suivent ('a', 'a-b.pdf', 'a.pdf'), archive, doublon."""
+    racine = tmp_path / "depot"
+    fichiers = {
+        "a/z.pdf": b"RIB z", "a-b.pdf": b"RIB ab", "a.pdf": b"RIB a", "2025-01/client1/c.pdf": b"RIB c",
+        "2025-01/b.png": b"RIB b", "2025-01/copie.pdf": b"RIB a", "notes.txt": b"ignore",
+    }
+    for relatif, contenu in fichiers.items():
+        chemin = racine / relatif
+        chemin.parent.mkdir(parents=True, exist_ok=True)
+        chemin.write_bytes(contenu)
+    with zipfile.ZipFile(racine / "2025-02.zip", "w") as zf:
+        for nom in ("x/y.pdf", "d.pdf", "e.tif"):
+            zf.writestr(nom, f"RIB {nom}".encode())
+    return str(racine)
+
+
+def test_lire_tranche():
+    assert lire_tranche("2/4") == (2, 4)
+    for valeur in ("0/3", "5/4", "2", "a/b"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            lire_tranche(valeur)
+
+
+def test_sortie_tranche():
+    assert sortie_tranche("rib_infos.csv", 2, 4) == "rib_infos.2-4.csv"
+    assert sortie_tranche("sorties/lot.parquet", 1, 3) == "sorties/lot.1-3.parquet"
+
+
+def test_tranches_partition(depot):
+    documents = list(parcourir(depot, recursif=True))
+    assert len(documents) == 9
+    tranches = [list(filtrer_tranche(iter(documents), i, 3)) for i in (1, 2, 3)]
+    assert all(tranches)
+    # Chaque document dans exactement une tranche, dans l'ordre du parcours
+    assert sorted(d for t in tranches for d in t) == sorted(documents)
+    for tranche in tranches:
+        assert tranche == [d for d in documents if d in tranche]
+    # Un même contenu (doublon) tombe toujours dans la même tranche
+    tranche_de = {relatif: i for i, t in enumerate(tranches) for _, relatif in t}
+    assert tranche_de["a.pdf"] == tranche_de["2025-01/copie.pdf"]
+    # Même attribution d'une exécution à l'autre
+    assert tranches == [list(filtrer_tranche(iter(documents), i, 3)) for i in (1, 2, 3)]
+
+
+def test_tranche_document_illisible(depot):
+    absent = (os.path.join(depot, "disparu.pdf"), "disparu.pdf")
+    tranches = [list(filtrer_tranche(iter([absent]), i, 4)) for i in (1, 2, 3, 4)]
+    assert sum(map(len, tranches)) == 1
+
+
+def ligne(relatif: str, numero: int) -> dict:
+    """Ligne d'export d'un document, codes sans apostrophe (zéros initiaux à préserver)."""
+    valeurs = {c: "MANQUANT" for c in COLONNES_EXPORT}
+    valeurs.update({"Fichier": relatif, "Code Banque": f"{numero:05d}", "Code Guichet": "00001",
+                    "N° de compte": f"{numero:011d}", "Clé RIB": "07", "Confiance": f"{numero}%"})
+    return valeurs
+
+
+def ecrire(chemin: str, lignes: list):
+    with ouvrir_sortie(chemin, COLONNES_EXPORT) as sortie:
+        for valeurs in lignes:
+            sortie.ecrire(recoder_codes(valeurs, sortie.apostrophe))
+
+
+def test_fusion_formats_melanges(depot, tmp_path):
+    documents = list(parcourir(depot, recursif=True))
+    numeros = {relatif: k for k, (_, relatif) in enumerate(documents)}
+    ecrire(str(tmp_path / "unique.csv"), [ligne(relatif, numeros[relatif]) for _, relatif in documents])
+
+    # Trois tranches, chacune dans un format différent
+    entrees = []
+    for i, extension in ((1, ".csv"), (2, ".jsonl"), (3, ".parquet")):
+        chemin = str(tmp_path / f"rib_infos.{i}-3{extension}")
+        ecrire(chemin, [ligne(relatif, numeros[relatif]) for _, relatif in filtrer_tranche(iter(documents), i, 3)])
+        entrees.append(chemin)
+
+    # Fusion en CSV : identique octet pour octet au lot unique
+    assert fusionner_tranches(entrees[::-1], str(tmp_path / "fusion.csv")) == len(documents)
+    assert (tmp_path / "fusion.csv").read_bytes() == (tmp_path / "unique.csv").read_bytes()
+
+    # Fusion en Parquet : mêmes lignes, codes sans apostrophe
+    assert fusionner_tranches(entrees, str(tmp_path / "fusion.parquet")) == len(documents)
+    relues = list(lire_sortie(str(tmp_path / "fusion.parquet")))
+    assert relues == [ligne(relatif, numeros[relatif]) for _, relatif in documents]
+
+
+def test_fusion_tranche_vide(tmp_path):
+    ecrire(str(tmp_path / "t1.csv"), [ligne("a.pdf", 1), ligne("b/c.pdf", 2)])
+    ecrire(str(tmp_path / "t2.jsonl"), [])
+    assert fusionner_tranches([str(tmp_path / "t1.csv"), str(tmp_path / "t2.jsonl")], str(tmp_path / "f.jsonl")) == 2
+    assert [l["Fichier"] for l in lire_sortie(str(tmp_path / "f.jsonl"))] == ["a.pdf", "b/c.pdf"]